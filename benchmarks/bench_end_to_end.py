@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试
+启动本地 Figma API 替身（benchmarks/fake_figma_api.py），通过 MCP 工具入口逐个调用每个工具，
+报告首次调用与之后各次调用的延迟百分位、吞吐量、峰值 RSS、写入磁盘的字节数，以及替身收到的请求数和 429 数；
+每个工具在单独的子进程中运行，峰值 RSS 和缓存互不影响
+
+使用方法: python3 benchmarks/bench_end_to_end.py [--iterations 5] [--tools extract_figma_tree,search_nodes]
+         [--cold] [--nodes 5000] [--latency 20] [--cdn-latency 10] [--rate-limit 20] [--json 结果.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, add_config_arguments, config_from_args
+
+FILE_KEY = "bench"
+# 依次测试的工具
+TOOLS = [
+    "list_nodes_depth2",
+    "extract_figma_tree",
+    "download_figma_images",
+    "get_complete_node_data",
+    "extract_frame_nodes",
+    "search_nodes",
+    "diff_figma_tree",
+    "batch_export",
+]
+# 批量导出每次调用包含的文件数量
+BATCH_FILES = 4
+# 这些前缀的响应视为调用失败
+FAILURE_PREFIXES = ("Error", "Failed", "Unknown tool", "❌")
+
+
+def tool_arguments(tool: str, file_key: str, targets: List[str], images: int) -> Dict[str, Any]:
+    """每个工具一次典型调用的参数"""
+    node_ids = ",".join(targets[:2])
+    if tool == "list_nodes_depth2":
+        return {"file_key": file_key}
+    if tool == "extract_figma_tree":
+        return {"file_key": file_key, "node_ids": node_ids, "depth": 4}
+    if tool == "download_figma_images":
+        return {"file_key": file_key, "node_ids": ",".join(targets[:images]), "format": "png"}
+    if tool == "get_complete_node_data":
+        return {"file_key": file_key, "node_ids": node_ids}
+    if tool == "extract_frame_nodes":
+        return {"file_key": file_key, "max_depth": 2}
+    if tool == "search_nodes":
+        return {"file_key": file_key, "query": "Text", "limit": 50}
+    if tool == "diff_figma_tree":
+        return {"file_key": file_key, "node_ids": node_ids}
+    if tool == "batch_export":
+        return {"exports": [{"file_key": f"{file_key}-{index}", "node_ids": node_ids} for index in range(BATCH_FILES)]}
+    raise ValueError(f"未知的工具: {tool}")
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """最近秩百分位"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def directory_bytes(path: str, exclude: str = None) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        if exclude:
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != exclude]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files
+                     if os.path.exists(os.path.join(root, name)))
+    return total
+
+
+def peak_rss() -> Optional[int]:
+    """当前进程的峰值 RSS（字节），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def run_worker(tool: str, iterations: int, targets: List[str], images: int, cold: bool) -> Dict[str, Any]:
+    """在子进程中调用工具 iterations 次（当前目录即输出目录）"""
+    from figma_mcp_server import server
+
+    latencies = []
+    failures = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for iteration in range(iterations):
+            # 冷启动模式下每次调用不同的文件，缓存和快照都不会命中
+            file_key = f"{FILE_KEY}{iteration}" if cold else FILE_KEY
+            arguments = tool_arguments(tool, file_key, targets, images)
+            call_start = time.perf_counter()
+            response = await server.handle_call_tool(tool, arguments)
+            latencies.append(time.perf_counter() - call_start)
+            text = response[0].text if response else ""
+            if text.startswith(FAILURE_PREFIXES):
+                failures.append(text.splitlines()[0])
+        # 等待后台写入完成，计入总耗时
+        await server.get_figma_server().aclose()
+    return {
+        "latencies": latencies,
+        "elapsed": time.perf_counter() - start,
+        "failures": failures,
+        "peak_rss": peak_rss()
+    }
+
+
+def worker_main(args: argparse.Namespace) -> None:
+    os.chdir(args.work_dir)
+    result = asyncio.run(run_worker(args.worker, args.iterations, args.targets.split(","), args.images, args.cold))
+    print(json.dumps(result))
+
+
+def run_tool(tool: str, fake: FakeFigmaAPI, args: argparse.Namespace, targets: List[str]) -> Dict[str, Any]:
+    """在单独的子进程中测试一个工具，返回汇总"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_dir = os.path.join(work_dir, ".cache")
+        env = dict(
+            os.environ,
+            FIGMA_ACCESS_TOKEN="benchmark-token",
+            FIGMA_API_BASE_URL=fake.base_url,
+            FIGMA_CACHE_DIR=os.path.join(cache_dir, "responses"),
+            FIGMA_IMAGE_CACHE_DIR=os.path.join(cache_dir, "images"),
+            FIGMA_TREE_HISTORY_DIR=os.path.join(cache_dir, "snapshots"),
+            # 默认关闭客户端限速，只测量服务器本身；--client-rate 打开后可观察排队与 429 重试
+            FIGMA_RATE_LIMIT_PER_MINUTE=str(args.client_rate)
+        )
+        command = [sys.executable, os.path.abspath(__file__), "--worker", tool, "--work-dir", work_dir,
+                   "--iterations", str(args.iterations), "--targets", ",".join(targets),
+                   "--images", str(args.images)]
+        if args.cold:
+            command.append("--cold")
+
+        fake.reset_stats()
+        process = subprocess.run(command, env=env, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f"{tool} 运行失败:\n{process.stderr[-2000:]}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result["output_bytes"] = directory_bytes(work_dir, exclude=cache_dir)
+        result["cache_bytes"] = directory_bytes(cache_dir) if os.path.exists(cache_dir) else 0
+
+    stats = fake.stats
+    latencies = result["latencies"]
+    repeated = latencies[1:]
+    return {
+        "tool": tool,
+        "iterations": len(latencies),
+        "first": latencies[0],
+        "p50": percentile(repeated, 0.5),
+        "p90": percentile(repeated, 0.9),
+        "p99": percentile(repeated, 0.99),
+        "throughput": len(latencies) / result["elapsed"],
+        "peak_rss": result["peak_rss"],
+        "output_bytes": result["output_bytes"],
+        "cache_bytes": result["cache_bytes"],
+        "api_requests": sum(count for endpoint, count in stats["requests"].items() if endpoint != "cdn"),
+        "cdn_requests": stats["requests"].get("cdn", 0),
+        "throttled": stats["status"].get(429, 0),
+        "failures": result["failures"]
+    }
+
+
+def format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}"
+
+
+def format_mb(value: Optional[int]) -> str:
+    return "-" if value is None else f"{value / 1024 / 1024:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端基准测试（本地 Figma API 替身）")
+    parser.add_argument("--iterations", type=int, default=5, help="每个工具的调用次数（默认 5，第一次单独报告）")
+    parser.add_argument("--tools", default=",".join(TOOLS), help="要测试的工具，逗号分隔（默认全部）")
+    parser.add_argument("--cold", action="store_true", help="每次调用不同的文件，缓存、索引和快照都不命中")
+    parser.add_argument("--images", type=int, default=8, help="download_figma_images 每次渲染的节点数（默认 8）")
+    parser.add_argument("--client-rate", type=int, default=0,
+                        help="客户端每分钟请求上限 FIGMA_RATE_LIMIT_PER_MINUTE（默认 0 不限速）")
+    parser.add_argument("--json", help="把结果另存为 JSON 文件")
+    add_config_arguments(parser)
+    # 子进程参数
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--targets", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args)
+        return
+
+    tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+    unknown = [tool for tool in tools if tool not in TOOLS]
+    if unknown:
+        parser.error(f"未知的工具: {', '.join(unknown)}，可选: {', '.join(TOOLS)}")
+    args.iterations = max(2, args.iterations)
+
+    with FakeFigmaAPI(config_from_args(args)) as fake:
+        targets = fake.document(FILE_KEY).top_frame_ids(max(2, args.images))
+        print(f"替身: {args.nodes} 个节点/文件, 深度 {args.depth}, API延迟 {args.latency:g} ms, CDN延迟 {args.cdn_latency:g} ms,"
+              f" 速率限制 {args.rate_limit or '无'}, 失败率 {args.failure_rate:g}")
+        print(f"每个工具 {args.iterations} 次调用（{'每次不同文件' if args.cold else '同一文件，之后的调用可命中缓存'}）；"
+              f"延迟百分位不含第一次调用")
+        print(f"{'工具':<22} {'首次(ms)':>9} {'p50(ms)':>9} {'p90(ms)':>9} {'p99(ms)':>9} {'次/秒':>7}"
+              f" {'峰值RSS(MB)':>11} {'输出(MB)':>9} {'缓存(MB)':>9} {'API请求':>7} {'CDN':>5} {'429':>5}")
+        results = []
+        for tool in tools:
+            result = run_tool(tool, fake, args, targets)
+            results.append(result)
+            print(f"{tool:<22} {format_ms(result['first']):>9} {format_ms(result['p50']):>9} {format_ms(result['p90']):>9}"
+                  f" {format_ms(result['p99']):>9} {result['throughput']:>7.2f} {format_mb(result['peak_rss']):>11}"
+                  f" {format_mb(result['output_bytes']):>9} {format_mb(result['cache_bytes']):>9}"
+                  f" {result['api_requests']:>7} {result['cdn_requests']:>5} {result['throttled']:>5}")
+            for failure in result["failures"][:3]:
+                print(f"  ⚠️ 调用失败: {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"config": {key: value for key, value in vars(args).items()
+                                  if key not in ("worker", "work_dir", "targets", "json")},
+                       "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+图片并发下载基准测试
+启动本地 Figma API 替身（benchmarks/fake_figma_api.py，模拟 /v1/images 和图片 CDN），
+比较 FigmaImageExtractor.extract_images 在 1 到 32 个并发下载下的耗时
+
+使用方法: python3 benchmarks/bench_image_downloads.py [节点数] [CDN延迟毫秒]
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server.figma_api_client import FigmaAPIClient
+from figma_mcp_server.figma_image_extractor import FigmaImageExtractor
+
+WORKER_COUNTS = [1, 2, 4, 8, 16, 32]
+IMAGE_BYTES = 8 + 64 * 1024
+
+
+async def run_once(base_url: str, node_ids: str, workers: int) -> float:
+    """以指定并发数执行一次完整的图片导出，返回耗时（秒）"""
+    client = FigmaAPIClient("benchmark-token", base_url=base_url,
+                            max_connections=64, max_connections_per_host=64)
+    extractor = FigmaImageExtractor("benchmark-token", client, max_concurrent_downloads=workers)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await extractor.extract_images("bench", node_ids)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.aclose()
+    assert all(image["status"] == "success" for image in result["images"].values())
+    return elapsed
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    # 一个页面，页面下直接是 node_count 个 Frame
+    config = FakeFigmaConfig(nodes=node_count + 2, depth=2, pages=1, cdn_latency=latency, image_bytes=IMAGE_BYTES)
+    with FakeFigmaAPI(config) as fake:
+        node_ids = ",".join(fake.document("bench").top_frame_ids(node_count))
+
+        print(f"节点数: {node_count}, CDN延迟: {latency * 1000:.0f} ms")
+        print(f"{'并发数':>6} {'耗时(s)':>10} {'加速比':>8}")
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            baseline = None
+            for workers in WORKER_COUNTS:
+                elapsed = asyncio.run(run_once(fake.base_url, node_ids, workers))
+                baseline = baseline or elapsed
+                print(f"{workers:>6} {elapsed:>10.3f} {baseline / elapsed:>8.1f}x")
+            os.chdir("/")
+
+
+if __name__ == "__main__":
+    main()
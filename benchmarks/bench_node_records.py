@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+节点记录基准测试
+在合成的 Figma 节点树上，比较原先每个节点一个完整字典（大部分值为 None）
+与稀疏的 __slots__ 节点记录：构建耗时、内存占用以及写出的 JSON 大小，
+并列出按 fields 投影后的输出大小
+
+使用方法: python3 benchmarks/bench_node_records.py [节点数]
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figma_mcp_server.figma_frame_extractor import FigmaFrameExtractor
+from figma_mcp_server.figma_node_record import FRAME_NODE_FIELDS, TREE_NODE_FIELDS, TreeNodeRecord, json_default
+from figma_mcp_server.figma_tree_extractor import FigmaTreeExtractor
+from figma_mcp_server.figma_tree_walker import map_tree, walk_nodes
+
+NODE_TYPES = ["FRAME", "TEXT", "RECTANGLE", "GROUP", "INSTANCE", "VECTOR"]
+NODE_COUNTS = [10_000, 50_000]
+# 按属性投影的常见请求
+PROJECTIONS = [["absoluteBoundingBox"], ["characters"], ["absoluteBoundingBox", "fills", "layoutMode"]]
+
+
+def build_node(index: int) -> Dict[str, Any]:
+    """按类型生成带有典型属性的节点（与 Figma 一样，不适用的属性不出现）"""
+    node_type = NODE_TYPES[index % len(NODE_TYPES)]
+    node = {
+        "id": f"1:{index}",
+        "name": f"{node_type.title()} {index}",
+        "type": node_type,
+        "absoluteBoundingBox": {"x": index % 800, "y": index % 600, "width": 120, "height": 40},
+        "constraints": {"vertical": "TOP", "horizontal": "LEFT"},
+        "blendMode": "PASS_THROUGH",
+        "children": []
+    }
+    if node_type in ("FRAME", "RECTANGLE", "INSTANCE"):
+        node["fills"] = [{"type": "SOLID", "color": {"r": 1, "g": 1, "b": 1, "a": 1}}]
+        node["strokes"] = []
+        node["strokeWeight"] = 1
+        node["strokeAlign"] = "INSIDE"
+        node["effects"] = []
+    if node_type == "FRAME":
+        node["layoutMode"] = "VERTICAL"
+        node["itemSpacing"] = 8
+        node["paddingLeft"] = node["paddingRight"] = node["paddingTop"] = node["paddingBottom"] = 16
+        node["cornerRadius"] = 8
+    elif node_type == "TEXT":
+        node["characters"] = f"Label {index}"
+        node["style"] = {"fontFamily": "Inter", "fontSize": 14}
+        node["fills"] = [{"type": "SOLID", "color": {"r": 0, "g": 0, "b": 0, "a": 1}}]
+    elif node_type == "INSTANCE":
+        node["componentId"] = f"9:{index % 50}"
+        node["componentProperties"] = {"State": {"type": "VARIANT", "value": "Default"}}
+    return node
+
+
+def build_tree(node_count: int, fanout: int = 6) -> Dict[str, Any]:
+    """按层构建约 node_count 个节点的合成树"""
+    root = build_node(0)
+    root["type"] = "FRAME"
+    frontier = [root]
+    created = 1
+    while created < node_count:
+        next_frontier = []
+        for parent in frontier:
+            for _ in range(fanout):
+                if created >= node_count:
+                    break
+                node = build_node(created)
+                parent["children"].append(node)
+                next_frontier.append(node)
+                created += 1
+        frontier = next_frontier
+    return root
+
+
+def dense_tree_info(node: Dict[str, Any], depth: int) -> Dict[str, Any]:
+    """原先 FigmaTreeExtractor.create_node_info 的完整字典（作为对照）"""
+    info = {key: node.get(key) for key in TREE_NODE_FIELDS}
+    info["depth"] = depth
+    info["children"] = []
+    return info
+
+
+def dense_frame_info(node: Dict[str, Any]) -> Dict[str, Any]:
+    """原先 FigmaFrameExtractor.create_node_info 的完整字典（作为对照）"""
+    info = {key: node.get(key) for key in FRAME_NODE_FIELDS}
+    info["children"] = []
+    return info
+
+
+def strip_empty(value: Any) -> Any:
+    """去掉字典中的 None 值和空的子节点列表"""
+    if isinstance(value, dict):
+        return {key: strip_empty(item) for key, item in value.items()
+                if item is not None and not (key == "children" and not item)}
+    if isinstance(value, list):
+        return [strip_empty(item) for item in value]
+    return value
+
+
+def measure(build: Callable[[], Any]) -> Dict[str, Any]:
+    """构建耗时、构建结果占用的内存，以及按保存格式（indent=2）写出的 JSON 大小"""
+    gc.collect()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    size = len(json.dumps(result, indent=2, ensure_ascii=False, default=json_default).encode("utf-8"))
+    return {"time": elapsed, "memory": memory, "size": size}
+
+
+def report(case: str, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    print(f"{case:<14} {old['time'] * 1000:>8.1f} / {new['time'] * 1000:<8.1f}"
+          f" {old['memory'] / 1024 / 1024:>7.1f} / {new['memory'] / 1024 / 1024:<7.1f}"
+          f" {old['size'] / 1024 / 1024:>7.1f} / {new['size'] / 1024 / 1024:<7.1f}"
+          f" {old['memory'] / new['memory']:>6.2f}x {old['size'] / new['size']:>6.2f}x")
+
+
+def main():
+    node_counts = [int(sys.argv[1])] if len(sys.argv) > 1 else NODE_COUNTS
+    trees = FigmaTreeExtractor("benchmark-token")
+    frames = FigmaFrameExtractor("benchmark-token")
+
+    print("每列为 原先完整字典 / 稀疏节点记录；内存为构建结果本身的占用")
+    print(f"{'场景':<12} {'耗时(ms)':>19} {'内存(MB)':>17} {'JSON(MB)':>17} {'内存比':>7} {'体积比':>7}")
+    for node_count in node_counts:
+        tree = build_tree(node_count)
+        max_depth = 100
+        print(f"\n== {node_count} 个节点 ==")
+
+        # 两种结构写出的内容只差 None 值和空的子节点列表
+        dense = json.loads(json.dumps(map_tree(tree, dense_tree_info, max_depth=max_depth)))
+        sparse = json.loads(json.dumps(trees.analyze_node_structure(tree, 0, max_depth), default=json_default))
+        assert strip_empty(dense) == sparse
+
+        report("树结构提取",
+               measure(lambda: map_tree(tree, dense_tree_info, max_depth=max_depth)),
+               measure(lambda: trees.analyze_node_structure(tree, 0, max_depth)))
+        report("Frame提取",
+               measure(lambda: [dense_frame_info(node) for node, _, _ in walk_nodes(tree, node_types=["FRAME"])]),
+               measure(lambda: frames.extract_node_info(tree, 0, max_depth)))
+
+        full = measure(lambda: trees.analyze_node_structure(tree, 0, max_depth))
+        for fields in PROJECTIONS:
+            projection = TreeNodeRecord.project_fields(fields)
+            projected = measure(lambda: trees.analyze_node_structure(tree, 0, max_depth, fields=projection))
+            print(f"  fields={','.join(fields):<38} 内存 {projected['memory'] / 1024 / 1024:6.1f} MB"
+                  f"  JSON {projected['size'] / 1024 / 1024:6.1f} MB（全部属性的 {projected['size'] / full['size']:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+输出文件序列化基准测试
+用树结构提取的结果（合成的节点树），比较各序列化后端与压缩方式的写入耗时、
+磁盘占用以及读回耗时；未安装的可选依赖（orjson、msgpack、zstandard）会被跳过
+
+使用方法: python3 benchmarks/bench_serializers.py [节点数]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_node_records import build_tree
+from figma_mcp_server.figma_serializer import COMPRESSIONS, FORMAT_MSGPACK, FORMATS, FigmaSerializer, is_available, load_file
+from figma_mcp_server.figma_tree_analysis import TreeAnalysis
+from figma_mcp_server.figma_tree_extractor import FigmaTreeExtractor
+
+ROUNDS = 3
+
+
+def build_result(node_count: int) -> Dict[str, Any]:
+    """与 extract_tree 结构相同的结果"""
+    extractor = FigmaTreeExtractor("benchmark-token")
+    tree = build_tree(node_count)
+    analysis = TreeAnalysis()
+    tree_structure = extractor.analyze_node_structure(tree, 0, 100, analysis=analysis)
+    return {
+        "file_key": "benchmark",
+        "file_name": "Benchmark",
+        "target_nodes": tree["id"],
+        "nodes": {
+            tree["id"]: {
+                "name": tree["name"],
+                "type": tree["type"],
+                "total_nodes": analysis.total_nodes,
+                "node_counts": analysis.node_counts,
+                "tree_structure": tree_structure
+            }
+        },
+        "analysis": {**analysis.to_dict(), "max_depth": 100}
+    }
+
+
+def best_of(func) -> float:
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    result = build_result(node_count)
+    output_dir = tempfile.mkdtemp(prefix="figma-serializer-bench-")
+
+    print(f"节点数: {node_count}, 取 {ROUNDS} 轮最快耗时")
+    print(f"{'格式':<8} {'缩进':<4} {'压缩':<6} {'写入(ms)':>10} {'大小(MB)':>10} {'读回(ms)':>10} {'相对默认':>10}")
+    baseline = None
+    for format in FORMATS:
+        for pretty in ((True, False) if format != FORMAT_MSGPACK else (False,)):
+            for compression in COMPRESSIONS:
+                label = f"{format:<8} {'是' if pretty else '否':<4} {compression:<6}"
+                if not (is_available(format) and is_available(compression)):
+                    print(f"{label} {'未安装':>10}")
+                    continue
+
+                serializer = FigmaSerializer(format, compression, pretty)
+                path = os.path.join(output_dir, serializer.filename("tree.json"))
+                write = best_of(lambda: serializer.write(result, path))
+                size = os.path.getsize(path)
+                read = best_of(lambda: load_file(path))
+                if baseline is None:
+                    baseline = write
+                print(f"{label} {write * 1000:>10.1f} {size / 1024 / 1024:>10.2f} {read * 1000:>10.1f} {baseline / write:>9.2f}x")
+                os.remove(path)
+    os.rmdir(output_dir)
+
+
+if __name__ == "__main__":
+    main()
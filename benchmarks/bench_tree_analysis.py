@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+树结构统计基准测试
+比较 extract_tree 原先的做法（截取树结构后，统计类型数量遍历一次、
+六种重要类型各遍历一次，共 7 次）与一次遍历构建 TreeAnalysis 的耗时
+
+使用方法: python3 benchmarks/bench_tree_analysis.py [节点数]
+"""
+
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figma_mcp_server.figma_tree_analysis import TreeAnalysis
+from figma_mcp_server.figma_tree_extractor import FigmaTreeExtractor
+
+NODE_TYPES = ["FRAME", "TEXT", "RECTANGLE", "GROUP", "INSTANCE", "VECTOR", "ELLIPSE", "COMPONENT"]
+IMPORTANT_TYPES = ["FRAME", "TEXT", "RECTANGLE", "ELLIPSE", "INSTANCE", "COMPONENT"]
+NODE_COUNTS = [10_000, 50_000, 100_000]
+ROUNDS = 3
+
+
+def build_frame(node_count: int, fanout: int = 6) -> Dict[str, Any]:
+    """构建约 node_count 个节点的合成 Frame"""
+    root = {"id": "1:0", "name": "Frame", "type": "FRAME", "children": []}
+    frontier = [root]
+    created = 1
+    while created < node_count:
+        next_frontier = []
+        for parent in frontier:
+            for _ in range(fanout):
+                if created >= node_count:
+                    break
+                node = {"id": f"1:{created}", "name": f"Node {created}",
+                        "type": NODE_TYPES[created % len(NODE_TYPES)], "children": [],
+                        "absoluteBoundingBox": {"x": 0, "y": 0, "width": 10, "height": 10}}
+                parent["children"].append(node)
+                next_frontier.append(node)
+                created += 1
+        frontier = next_frontier
+    return root
+
+
+def count_recursive(node: Dict[str, Any], counts: Dict[str, int]) -> None:
+    """原先 count_nodes_by_type 的递归统计（作为对照）"""
+    node_type = node.get("type", "UNKNOWN")
+    counts[node_type] = counts.get(node_type, 0) + 1
+    for child in node.get("children", []):
+        count_recursive(child, counts)
+
+
+def search_recursive(node: Dict[str, Any], target_type: str, results: List[Dict[str, Any]]) -> None:
+    """原先 find_nodes_by_type 的递归查找（作为对照）"""
+    if node.get("type") == target_type:
+        results.append({"id": node.get("id"), "name": node.get("name"), "depth": node.get("depth", 0)})
+    for child in node.get("children", []):
+        search_recursive(child, target_type, results)
+
+
+def multi_pass(extractor: FigmaTreeExtractor, frame: Dict[str, Any], max_depth: int) -> Any:
+    """原先 extract_tree 的做法：查找全部重要节点，再取前5个显示"""
+    tree_structure = extractor.analyze_node_structure(frame, depth=0, max_depth=max_depth)
+    counts: Dict[str, int] = {}
+    count_recursive(tree_structure, counts)
+    shown = {}
+    for node_type in IMPORTANT_TYPES:
+        if node_type in counts:
+            all_nodes: List[Dict[str, Any]] = []
+            search_recursive(tree_structure, node_type, all_nodes)
+            shown[node_type] = (len(all_nodes), all_nodes[:5])
+    return counts, shown
+
+
+def single_pass(extractor: FigmaTreeExtractor, frame: Dict[str, Any], max_depth: int) -> Any:
+    """现在 extract_tree 的做法：截取树结构时同时统计，数量直接读取，只为显示的节点构建信息"""
+    analysis = TreeAnalysis()
+    extractor.analyze_node_structure(frame, depth=0, max_depth=max_depth, analysis=analysis)
+    shown = {
+        node_type: (analysis.node_counts[node_type], analysis.find(node_type, limit=5))
+        for node_type in IMPORTANT_TYPES if node_type in analysis.node_counts
+    }
+    return analysis.node_counts, shown
+
+
+def best_of(func) -> float:
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    node_counts = [int(sys.argv[1])] if len(sys.argv) > 1 else NODE_COUNTS
+    extractor = FigmaTreeExtractor("benchmark-token")
+    max_depth = 100
+
+    print(f"取 {ROUNDS} 轮最快耗时（包含截取树结构本身）")
+    print(f"{'节点数':>8} {'7 次遍历(ms)':>14} {'单次遍历(ms)':>14} {'加速比':>8}")
+    for node_count in node_counts:
+        frame = build_frame(node_count)
+        # 两种做法的结果必须一致
+        assert multi_pass(extractor, frame, max_depth) == single_pass(extractor, frame, max_depth)
+        old = best_of(lambda: multi_pass(extractor, frame, max_depth))
+        new = best_of(lambda: single_pass(extractor, frame, max_depth))
+        print(f"{node_count:>8} {old * 1000:>14.1f} {new * 1000:>14.1f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+节点树遍历基准测试
+在约 10 万个节点的合成树（宽树与深树）上，比较原先递归 + extend 的实现
+与基于显式栈的 walk_nodes，统计耗时与内存峰值
+
+使用方法: python3 benchmarks/bench_tree_walkers.py [节点数]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figma_mcp_server.figma_frame_extractor import FigmaFrameExtractor
+from figma_mcp_server.figma_node_lister import FigmaNodeLister
+from figma_mcp_server.figma_tree_walker import walk_nodes
+
+NODE_TYPES = ["FRAME", "TEXT", "RECTANGLE", "GROUP", "INSTANCE"]
+ROUNDS = 3
+
+
+def build_tree(node_count: int, fanout: int) -> Dict[str, Any]:
+    """按层构建约 node_count 个节点的合成树，fanout 为1时得到一条链"""
+    root = {"id": "0:0", "name": "Document", "type": "DOCUMENT", "children": []}
+    frontier = [root]
+    created = 1
+    while created < node_count:
+        next_frontier = []
+        for parent in frontier:
+            for _ in range(fanout):
+                if created >= node_count:
+                    break
+                node = {"id": f"1:{created}", "name": f"Node {created}",
+                        "type": NODE_TYPES[created % len(NODE_TYPES)], "children": []}
+                parent["children"].append(node)
+                next_frontier.append(node)
+                created += 1
+        frontier = next_frontier
+    return root
+
+
+def recursive_list(node: Dict[str, Any], depth: int, max_depth: int, node_types: List[str],
+                   parent_id: str = None) -> List[Dict[str, Any]]:
+    """原先 FigmaNodeLister.extract_nodes_info 的递归 + extend 实现（作为对照）"""
+    nodes_info = []
+    if depth >= max_depth:
+        return nodes_info
+    node_type = node.get("type", "")
+    if not node_types or node_type in node_types:
+        nodes_info.append({"id": node.get("id"), "name": node.get("name"), "type": node_type,
+                           "depth": depth, "parent_id": parent_id})
+    for child in node.get("children", []):
+        nodes_info.extend(recursive_list(child, depth + 1, max_depth, node_types, node.get("id")))
+    return nodes_info
+
+
+def recursive_frames(extractor: FigmaFrameExtractor, node: Dict[str, Any], depth: int,
+                     max_depth: int) -> List[Dict[str, Any]]:
+    """原先 FigmaFrameExtractor.extract_node_info 的递归 + extend 实现（作为对照）"""
+    nodes_info = []
+    node_info = extractor.create_node_info(node)
+    if node.get("type") == "FRAME":
+        nodes_info.append(node_info)
+    if depth >= max_depth:
+        return nodes_info
+    for child in node.get("children", []):
+        nodes_info.extend(recursive_frames(extractor, child, depth + 1, max_depth))
+    return nodes_info
+
+
+def measure(func: Callable[[], Any]) -> str:
+    """返回 "耗时 ms / 内存峰值 MB"，失败时返回异常名称"""
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        try:
+            func()
+        except RecursionError:
+            return "RecursionError"
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return f"{best * 1000:8.1f} ms / {peak / 1024 / 1024:6.1f} MB"
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lister = FigmaNodeLister("benchmark-token")
+    frames = FigmaFrameExtractor("benchmark-token")
+    unlimited = node_count + 1
+
+    shapes = [("宽树 fanout=8", 8), ("窄树 fanout=2", 2), ("深链 fanout=1", 1)]
+    cases = [
+        ("列出全部节点", lambda tree: recursive_list(tree, 0, unlimited, []),
+         lambda tree: lister.extract_nodes_info(tree, 0, unlimited, [])),
+        ("按类型过滤", lambda tree: recursive_list(tree, 0, unlimited, ["FRAME"]),
+         lambda tree: lister.extract_nodes_info(tree, 0, unlimited, ["FRAME"])),
+        ("提取Frame", lambda tree: recursive_frames(frames, tree, 0, unlimited),
+         lambda tree: frames.extract_node_info(tree, 0, unlimited)),
+        ("仅遍历", None, lambda tree: sum(1 for _ in walk_nodes(tree))),
+    ]
+
+    print(f"节点数: {node_count}, 取 {ROUNDS} 轮最快耗时")
+    for shape_name, fanout in shapes:
+        tree = build_tree(node_count, fanout)
+        print(f"\n== {shape_name} ==")
+        print(f"{'场景':<10} {'递归 + extend':>28} {'walk_nodes':>28}")
+        for case_name, old, new in cases:
+            old_result = measure(lambda: old(tree)) if old else "-"
+            print(f"{case_name:<10} {old_result:>28} {measure(lambda: new(tree)):>28}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+本地 Figma API 替身
+在本机提供 /v1/files/:key、/v1/files/:key/nodes、/v1/images/:key 和图片 CDN，
+返回按文件键确定生成的合成文档（节点数量、深度、页面数可配置），
+可以注入延迟、429（按访问令牌计数的速率限制，带 Retry-After）和失败；
+基准测试在进程内启动它，也可以单独运行后把 FIGMA_API_BASE_URL 指向它
+
+使用方法: python3 benchmarks/fake_figma_api.py [--port 8765] [--nodes 5000] [--depth 6] [--latency 50] ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# 中间层（都有子节点）与最深一层节点的类型
+CONTAINER_TYPES = ["FRAME", "GROUP", "INSTANCE", "COMPONENT"]
+LEAF_TYPES = ["TEXT", "RECTANGLE", "VECTOR", "TEXT", "ELLIPSE", "INSTANCE"]
+
+# 缓存的已编码响应数量（大文档每次都重新编码会让替身本身成为瓶颈）
+MAX_ENCODED_RESPONSES = 64
+
+
+class FakeFigmaConfig:
+    def __init__(self, nodes: int = 2000, depth: int = 6, pages: int = 2, api_latency: float = 0.0,
+                 cdn_latency: float = 0.0, image_bytes: int = 64 * 1024, rate_limit: int = 0,
+                 rate_window: float = 1.0, retry_after: float = 1.0, failure_rate: float = 0.0,
+                 fail_ids: List[str] = None, seed: int = 0):
+        """
+        替身配置
+
+        Args:
+            nodes: 每个文件的节点总数（包括文档和页面节点）
+            depth: 文档最大深度（文档为0，页面为1）
+            pages: 每个文件的页面数
+            api_latency: /v1/ 接口的延迟（秒）
+            cdn_latency: 图片 CDN 的延迟（秒）
+            image_bytes: 每张图片的大小（字节）
+            rate_limit: 每个访问令牌在 rate_window 秒内允许的 /v1/ 请求数，超出返回 429，0 表示不限制
+            rate_window: 速率限制的时间窗口（秒）
+            retry_after: 429 响应的 Retry-After（秒）
+            failure_rate: /v1/ 请求随机返回 500 的概率
+            fail_ids: 请求中包含这些节点ID时总是返回 500
+            seed: 随机失败的种子
+        """
+        self.nodes = max(2 + pages, nodes)
+        self.depth = max(2, depth)
+        self.pages = max(1, pages)
+        self.api_latency = api_latency
+        self.cdn_latency = cdn_latency
+        self.image_bytes = image_bytes
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self.fail_ids = set(fail_ids or ())
+        self.seed = seed
+
+
+class SyntheticDocument:
+    def __init__(self, file_key: str, config: FakeFigmaConfig):
+        """
+        按层生成的合成文档，同一文件键与配置总是生成相同的节点
+
+        节点ID：文档 0:0，页面 0:<页码>，其余节点 <页码>:<序号>
+        """
+        self.file_key = file_key
+        self.version = 1
+        self.document = self._build(config)
+        # 节点ID -> 节点
+        self.index: Dict[str, Dict[str, Any]] = {}
+        stack = [self.document]
+        while stack:
+            node = stack.pop()
+            self.index[node["id"]] = node
+            stack.extend(node.get("children", ()))
+
+    @staticmethod
+    def _fanout(config: FakeFigmaConfig) -> int:
+        """每个页面下要达到剩余节点数所需的最小分支数"""
+        remaining = (config.nodes - 1 - config.pages) / config.pages
+        levels = config.depth - 1
+        fanout = 1
+        while sum(fanout ** level for level in range(1, levels + 1)) < remaining:
+            fanout += 1
+        return fanout
+
+    def _build(self, config: FakeFigmaConfig) -> Dict[str, Any]:
+        document = {"id": "0:0", "name": "Document", "type": "DOCUMENT", "children": []}
+        pages = []
+        for page_index in range(1, config.pages + 1):
+            page = {"id": f"0:{page_index}", "name": f"Page {page_index}", "type": "CANVAS",
+                    "backgroundColor": {"r": 0.96, "g": 0.96, "b": 0.96, "a": 1}, "children": []}
+            document["children"].append(page)
+            pages.append(page)
+
+        fanout = self._fanout(config)
+        created = 1 + config.pages
+        sequence = 0
+        # 按层填充（各页面轮流），保证节点数准确且每层分布均匀
+        frontier = [(page, page_index) for page_index, page in enumerate(pages, 1)]
+        for depth in range(2, config.depth + 1):
+            next_frontier = []
+            leaf_level = depth == config.depth
+            for _ in range(fanout):
+                for parent, page_index in frontier:
+                    if created >= config.nodes:
+                        break
+                    sequence += 1
+                    node = self._node(f"{page_index}:{sequence}", sequence, depth, leaf_level)
+                    parent.setdefault("children", []).append(node)
+                    if not leaf_level:
+                        next_frontier.append((node, page_index))
+                    created += 1
+            frontier = next_frontier
+            if created >= config.nodes or not frontier:
+                break
+        return document
+
+    @staticmethod
+    def _node(node_id: str, index: int, depth: int, leaf_level: bool) -> Dict[str, Any]:
+        """带有该类型典型属性的节点（与 Figma 一样，不适用的属性不出现）"""
+        types = LEAF_TYPES if leaf_level else CONTAINER_TYPES
+        node_type = "FRAME" if depth == 2 else types[index % len(types)]
+        node = {
+            "id": node_id,
+            "name": f"{node_type.title()} {index}",
+            "type": node_type,
+            "visible": True,
+            "absoluteBoundingBox": {"x": index % 1440, "y": (index * 7) % 1024, "width": 120 + index % 200,
+                                    "height": 40 + index % 80},
+            "constraints": {"vertical": "TOP", "horizontal": "LEFT"},
+            "blendMode": "PASS_THROUGH"
+        }
+        if node_type in CONTAINER_TYPES or node_type in ("RECTANGLE", "ELLIPSE", "VECTOR"):
+            node["fills"] = [{"type": "SOLID", "color": {"r": 1, "g": 1, "b": 1, "a": 1}}]
+            node["strokes"] = []
+            node["strokeWeight"] = 1
+            node["effects"] = []
+        if node_type in ("FRAME", "COMPONENT"):
+            node["layoutMode"] = "VERTICAL" if index % 2 else "HORIZONTAL"
+            node["itemSpacing"] = 8
+            node["paddingLeft"] = node["paddingRight"] = node["paddingTop"] = node["paddingBottom"] = 16
+            node["cornerRadius"] = 8
+        elif node_type == "TEXT":
+            node["characters"] = f"Label {index}"
+            node["style"] = {"fontFamily": "Inter", "fontSize": 14, "fontWeight": 400}
+            node["fills"] = [{"type": "SOLID", "color": {"r": 0, "g": 0, "b": 0, "a": 1}}]
+        elif node_type == "INSTANCE":
+            node["componentId"] = f"99:{index % 50}"
+            node["componentProperties"] = {"State": {"type": "VARIANT", "value": "Default"}}
+        return node
+
+    def top_frame_ids(self, count: int = None) -> List[str]:
+        """各页面下的顶层 Frame（按页面轮流取），导出和渲染常用的目标节点"""
+        columns = [[child["id"] for child in page.get("children", ())] for page in self.document["children"]]
+        ids = [column[row] for row in range(max(map(len, columns), default=0))
+               for column in columns if row < len(column)]
+        return ids if count is None else ids[:count]
+
+    def touch(self, count: int = 1) -> List[str]:
+        """修改若干个节点的名称并增加版本号（模拟设计变更），返回修改的节点ID"""
+        node_ids = [node_id for node_id in self.index if node_id.count(":") == 1 and not node_id.startswith("0:")]
+        step = max(1, len(node_ids) // max(1, count))
+        changed = node_ids[::step][:count]
+        self.version += 1
+        for node_id in changed:
+            self.index[node_id]["name"] = f"{self.index[node_id]['name'].split(' v')[0]} v{self.version}"
+        return changed
+
+
+def prune(node: Dict[str, Any], depth: Optional[int]) -> Dict[str, Any]:
+    """按 depth 参数截断子节点（depth=1 只返回直接子节点）"""
+    if depth is None or "children" not in node:
+        return node
+    pruned = {key: value for key, value in node.items() if key != "children"}
+    if depth > 0:
+        pruned["children"] = [prune(child, depth - 1) for child in node["children"]]
+    return pruned
+
+
+class FakeFigmaAPI:
+    def __init__(self, config: FakeFigmaConfig = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化替身（调用 start 后开始监听）
+
+        Args:
+            config: 替身配置，为None时使用默认配置
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+        """
+        self.config = config or FakeFigmaConfig()
+        self.host = host
+        self.port = port
+        self.documents: Dict[str, SyntheticDocument] = {}
+        self._encoded: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._random = random.Random(self.config.seed)
+        # 访问令牌 -> 时间窗口内的请求时间
+        self._windows: Dict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeFigmaAPI":
+        """在后台线程中开始监听"""
+        api = self
+
+        class Handler(FakeFigmaHandler):
+            fake = api
+
+        self._httpd = FakeFigmaServer((self.host, self.port), Handler)
+        self.port = self._httpd.server_port
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeFigmaAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def document(self, file_key: str) -> SyntheticDocument:
+        """文件键对应的合成文档（第一次访问时生成）"""
+        with self._lock:
+            document = self.documents.get(file_key)
+            if document is None:
+                document = self.documents[file_key] = SyntheticDocument(file_key, self.config)
+            return document
+
+    def touch(self, file_key: str, count: int = 1) -> List[str]:
+        """修改文件中的若干节点并增加版本号"""
+        document = self.document(file_key)
+        with self._lock:
+            return document.touch(count)
+
+    def reset_stats(self) -> None:
+        self.stats: Dict[str, Any] = {"requests": defaultdict(int), "status": defaultdict(int), "bytes_sent": 0}
+
+    # ---- 请求处理（在处理线程中调用） ----
+
+    def count_request(self, endpoint: str) -> None:
+        with self._lock:
+            self.stats["requests"][endpoint] += 1
+
+    def count_response(self, status: int, size: int) -> None:
+        with self._lock:
+            self.stats["status"][status] += 1
+            self.stats["bytes_sent"] += size
+
+    def admit(self, token: Optional[str], node_ids: List[str]) -> Optional[Tuple[int, Dict[str, str]]]:
+        """按配置决定 /v1/ 请求是否被拒绝，返回 (状态码, 响应头)，None 表示放行"""
+        if not token:
+            return 403, {}
+        config = self.config
+        with self._lock:
+            if config.rate_limit:
+                window = self._windows[token]
+                now = time.monotonic()
+                while window and now - window[0] >= config.rate_window:
+                    window.popleft()
+                if len(window) >= config.rate_limit:
+                    return 429, {"Retry-After": f"{config.retry_after:g}"}
+                window.append(now)
+            if config.fail_ids.intersection(node_ids):
+                return 500, {}
+            if config.failure_rate and self._random.random() < config.failure_rate:
+                return 500, {}
+        return None
+
+    def encoded(self, key: Tuple, build) -> bytes:
+        """已编码的响应（按文件、版本、节点和深度缓存）"""
+        with self._lock:
+            body = self._encoded.get(key)
+            if body is not None:
+                self._encoded.move_to_end(key)
+                return body
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._encoded[key] = body
+            while len(self._encoded) > MAX_ENCODED_RESPONSES:
+                self._encoded.popitem(last=False)
+        return body
+
+    def files_body(self, file_key: str, params: Dict[str, str]) -> bytes:
+        document = self.document(file_key)
+        depth = int(params["depth"]) if "depth" in params else None
+        return self.encoded(("files", file_key, document.version, depth), lambda: {
+            "name": f"Fake {file_key}",
+            "lastModified": "2024-01-01T00:00:00Z",
+            "version": str(document.version),
+            "document": prune(document.document, depth),
+            "components": {},
+            "styles": {}
+        })
+
+    def nodes_body(self, file_key: str, params: Dict[str, str]) -> bytes:
+        document = self.document(file_key)
+        depth = int(params["depth"]) if "depth" in params else None
+        node_ids = params.get("ids", "")
+        return self.encoded(("nodes", file_key, document.version, depth, node_ids), lambda: {
+            "name": f"Fake {file_key}",
+            "lastModified": "2024-01-01T00:00:00Z",
+            "version": str(document.version),
+            "nodes": {
+                node_id: ({"document": prune(document.index[node_id], depth), "components": {}, "styles": {}}
+                          if node_id in document.index else None)
+                for node_id in node_ids.split(",") if node_id
+            }
+        })
+
+    def images_body(self, file_key: str, params: Dict[str, str], host: str) -> bytes:
+        document = self.document(file_key)
+        image_format = params.get("format", "png")
+        # 与 Figma 一样，不存在的节点返回 null
+        images = {
+            node_id: (f"http://{host}/cdn/{file_key}/{document.version}/{node_id}.{image_format}"
+                      if node_id in document.index else None)
+            for node_id in params.get("ids", "").split(",") if node_id
+        }
+        return json.dumps({"err": None, "images": images}).encode("utf-8")
+
+    def image_body(self) -> bytes:
+        return b"\x89PNG\r\n\x1a\n" + b"\0" * max(0, self.config.image_bytes - 8)
+
+
+class FakeFigmaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FakeFigmaHandler(BaseHTTPRequestHandler):
+    """Figma REST API 与图片 CDN 的最小替身（支持 keep-alive）"""
+    protocol_version = "HTTP/1.1"
+    fake: FakeFigmaAPI = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        fake = self.fake
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if parts[0] == "cdn":
+            fake.count_request("cdn")
+            if fake.config.cdn_latency:
+                time.sleep(fake.config.cdn_latency)
+            self.respond(200, fake.image_body(), "image/png")
+            return
+
+        if parts[0] != "v1" or len(parts) < 3:
+            self.respond(404, b"{}")
+            return
+        endpoint = "nodes" if parts[1] == "files" and len(parts) == 4 and parts[3] == "nodes" else parts[1]
+        fake.count_request(endpoint)
+        if fake.config.api_latency:
+            time.sleep(fake.config.api_latency)
+
+        rejected = fake.admit(self.headers.get("X-Figma-Token"), params.get("ids", "").split(","))
+        if rejected is not None:
+            status, headers = rejected
+            self.respond(status, json.dumps({"status": status, "err": "fake error"}).encode("utf-8"), headers=headers)
+            return
+
+        file_key = parts[2]
+        if endpoint == "files" and len(parts) == 3:
+            body = fake.files_body(file_key, params)
+        elif endpoint == "nodes":
+            body = fake.nodes_body(file_key, params)
+        elif endpoint == "images" and len(parts) == 3:
+            body = fake.images_body(file_key, params, self.headers["Host"])
+        else:
+            self.respond(404, b"{}")
+            return
+        self.respond(200, body)
+
+    def respond(self, status: int, body: bytes, content_type: str = "application/json",
+                headers: Dict[str, str] = None) -> None:
+        self.fake.count_response(status, len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """替身配置的命令行参数（基准测试共用）"""
+    parser.add_argument("--nodes", type=int, default=2000, help="每个文件的节点数（默认 2000）")
+    parser.add_argument("--depth", type=int, default=6, help="文档深度（默认 6）")
+    parser.add_argument("--pages", type=int, default=2, help="每个文件的页面数（默认 2）")
+    parser.add_argument("--latency", type=float, default=0, help="/v1/ 接口延迟，毫秒（默认 0）")
+    parser.add_argument("--cdn-latency", type=float, default=0, help="图片 CDN 延迟，毫秒（默认 0）")
+    parser.add_argument("--image-kb", type=float, default=64, help="每张图片的大小，KB（默认 64）")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每个令牌每秒允许的 /v1/ 请求数，超出返回 429（默认不限制）")
+    parser.add_argument("--failure-rate", type=float, default=0, help="/v1/ 请求随机返回 500 的概率（默认 0）")
+    parser.add_argument("--fail-ids", default="", help="请求中包含这些节点ID（逗号分隔）时返回 500")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeFigmaConfig:
+    return FakeFigmaConfig(
+        nodes=args.nodes,
+        depth=args.depth,
+        pages=args.pages,
+        api_latency=args.latency / 1000,
+        cdn_latency=args.cdn_latency / 1000,
+        image_bytes=int(args.image_kb * 1024),
+        rate_limit=args.rate_limit,
+        failure_rate=args.failure_rate,
+        fail_ids=[node_id for node_id in args.fail_ids.split(",") if node_id]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Figma API 替身")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口（默认 8765）")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    fake = FakeFigmaAPI(config_from_args(args), args.host, args.port).start()
+    document = fake.document("demo")
+    print(f"Figma API 替身已启动: {fake.base_url}")
+    print(f"每个文件 {len(document.index)} 个节点，任意文件键均可使用；顶层 Frame 例如: {','.join(document.top_frame_ids(4))}")
+    print(f"  export FIGMA_API_BASE_URL={fake.base_url}")
+    print("  export FIGMA_ACCESS_TOKEN=fake-token")
+    print("按 Ctrl+C 停止")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+        print("\n已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,15 @@
 Figma MCP Server CLI
 """
 
+import argparse
 import asyncio
 import os
 import sys
-from .server import main as server_main
+from .figma_batch_export import BatchExportJob, BatchExportResult, load_jobs
+from .server import main as server_main, get_figma_server, format_batch_report
 
-def main():
-    """CLI入口点"""
-    # 检查环境变量
+def check_token():
+    """检查访问令牌，未设置时退出"""
     if not os.getenv("FIGMA_ACCESS_TOKEN"):
         print("错误: 请设置 FIGMA_ACCESS_TOKEN 环境变量")
         print("设置方法:")
@@ -19,12 +20,90 @@ def main():
         else:
             print("  export FIGMA_ACCESS_TOKEN='your_token_here'")
         sys.exit(1)
-    
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数：不带子命令时启动 MCP 服务器"""
+    parser = argparse.ArgumentParser(prog="figma-mcp-tools", description="Figma MCP 服务器与批量导出工具")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("serve", help="启动 MCP 服务器（默认）")
+
+    export = subparsers.add_parser(
+        "export",
+        help="批量导出多个文件的完整节点数据",
+        description="批量导出多个文件的完整节点数据（与 get_complete_node_data 相同的输出），"
+                    "所有文件共用同一个速率限制、连接池和图片下载并发数"
+    )
+    export.add_argument("targets", nargs="*", metavar="FILE_KEY=NODE_IDS",
+                        help="要导出的文件和节点，例如 abc123=1:2,1:3")
+    export.add_argument("--jobs", metavar="FILE",
+                        help="导出描述文件：JSON 数组，或每行一个 {\"file_key\", \"node_ids\", ...} 对象")
+    export.add_argument("--format", default="png", help="图片格式: png, jpg, svg, pdf（默认 png）")
+    export.add_argument("--scale", type=float, default=1.0, help="图片缩放比例: 0.01-4（默认 1）")
+    export.add_argument("--depth", type=int, default=4, help="树结构深度（默认 4）")
+    export.add_argument("--incremental", action="store_true", help="只重新渲染子树有变化的节点")
+    export.add_argument("--concurrency", type=int,
+                        help="同时导出的文件数量（默认使用 FIGMA_BATCH_CONCURRENCY，未设置时为 4）")
+    export.add_argument("--durable", action="store_true", help="每个文件的节点数据和清单写入磁盘后才算完成")
+    return parser
+
+async def run_export(jobs, max_concurrent_files: int = None) -> int:
+    """执行批量导出，返回退出码（有文件失败时为1）"""
+    figma_server = get_figma_server()
+
+    def on_progress(result: BatchExportResult, completed: int, total: int) -> None:
+        icon = {"success": "✅", "partial": "⚠️", "failed": "❌"}[result.status]
+        print(f"\n{icon} [{completed}/{total}] {result.job.file_key} 导出{'完成' if result.status == 'success' else '部分完成' if result.status == 'partial' else '失败'}"
+              f"（{result.elapsed:.1f} 秒，{result.images} 个图片）", flush=True)
+
+    try:
+        report = await figma_server.batch_exporter.run(jobs, max_concurrent_files, on_progress)
+        report_path = figma_server.file_saver.save_batch_report(report.to_dict())["report_path"]
+    finally:
+        # 关闭连接池，并等待所有后台写入完成
+        await figma_server.aclose()
+
+    print()
+    print(format_batch_report(report, report_path))
+    return 1 if report.count("failed") else 0
+
+def main():
+    """CLI入口点"""
+    args = build_parser().parse_args()
+
+    # 检查环境变量
+    check_token()
+
+    if args.command == "export":
+        defaults = {
+            "image_format": args.format,
+            "image_scale": args.scale,
+            "tree_depth": args.depth,
+            "incremental": args.incremental,
+            "durable": args.durable
+        }
+        try:
+            jobs = [BatchExportJob.parse(target, defaults) for target in args.targets]
+            if args.jobs:
+                jobs.extend(load_jobs(args.jobs, defaults))
+        except (OSError, ValueError) as e:
+            print(f"错误: {e}")
+            sys.exit(2)
+        if not jobs:
+            print("错误: 请提供要导出的文件（FILE_KEY=NODE_IDS 或 --jobs 文件）")
+            sys.exit(2)
+
+        print(f"批量导出 {len(jobs)} 个文件...")
+        try:
+            sys.exit(asyncio.run(run_export(jobs, args.concurrency)))
+        except KeyboardInterrupt:
+            print("\n导出已取消")
+            sys.exit(130)
+
     print("启动 Figma MCP 服务器...")
     print(f"FIGMA_ACCESS_TOKEN: {'*' * 10}{os.getenv('FIGMA_ACCESS_TOKEN')[-4:]}")
     print("按 Ctrl+C 停止服务器")
     print()
-    
+
     try:
         asyncio.run(server_main())
     except KeyboardInterrupt:
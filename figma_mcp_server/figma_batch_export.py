@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Figma 批量导出
+一次导出多个文件（每个文件一组节点）的完整数据：同时进行的文件数量有上限，
+所有文件共用服务器的 API 客户端（同一个速率限制、连接池和单主机并发上限）与图片下载并发数，
+逐个报告每个文件的结果，最后汇总耗时和吞吐量
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .figma_query_planner import FigmaQuery
+
+# 默认同时导出的文件数量
+DEFAULT_MAX_CONCURRENT_FILES = 4
+
+# 导出结果状态
+STATUS_SUCCESS = "success"
+STATUS_PARTIAL = "partial"
+STATUS_FAILED = "failed"
+
+
+class BatchExportJob:
+    def __init__(self, file_key: str, node_ids: str, image_format: str = "png", image_scale: float = 1.0,
+                 tree_depth: int = 4, incremental: bool = False, durable: bool = False):
+        """
+        批量导出中的一个文件
+
+        Args:
+            file_key: Figma文件键
+            node_ids: 节点ID，多个用逗号分隔
+            image_format: 图片格式
+            image_scale: 图片缩放比例
+            tree_depth: 树结构深度
+            incremental: 是否只重新渲染子树有变化的节点
+            durable: 是否等待节点数据和清单写入磁盘后才算完成
+        """
+        self.file_key = file_key
+        self.node_ids = node_ids
+        self.image_format = image_format
+        self.image_scale = image_scale
+        self.tree_depth = tree_depth
+        self.incremental = incremental
+        self.durable = durable
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any], defaults: Dict[str, Any] = None) -> "BatchExportJob":
+        """
+        从导出描述创建（未给出的选项使用 defaults）
+
+        Raises:
+            ValueError: 缺少 file_key 或 node_ids
+        """
+        options = dict(defaults or {})
+        options.update({key: value for key, value in spec.items() if value is not None})
+        file_key = str(options.get("file_key") or "").strip()
+        node_ids = options.get("node_ids")
+        if isinstance(node_ids, (list, tuple)):
+            node_ids = ",".join(str(node_id) for node_id in node_ids)
+        node_ids = ",".join(FigmaQuery.parse_ids(node_ids or ""))
+        if not file_key or not node_ids:
+            raise ValueError(f"导出描述需要 file_key 和 node_ids: {json.dumps(spec, ensure_ascii=False)}")
+        return cls(
+            file_key,
+            node_ids,
+            image_format=options.get("image_format", "png"),
+            image_scale=options.get("image_scale", 1.0),
+            tree_depth=options.get("tree_depth", 4),
+            incremental=bool(options.get("incremental", False)),
+            durable=bool(options.get("durable", False))
+        )
+
+    @classmethod
+    def parse(cls, text: str, defaults: Dict[str, Any] = None) -> "BatchExportJob":
+        """
+        从命令行形式 FILE_KEY=NODE_IDS 创建，例如 abc123=1:2,1:3
+
+        Raises:
+            ValueError: 格式无效
+        """
+        file_key, separator, node_ids = text.partition("=")
+        if not separator:
+            raise ValueError(f"无效的导出描述: {text}，应为 FILE_KEY=NODE_IDS")
+        return cls.from_dict({"file_key": file_key, "node_ids": node_ids}, defaults)
+
+    @property
+    def target_key(self) -> Tuple[str, str]:
+        """决定输出文件夹的部分（文件键和第一个节点ID）：相同的两个导出会写入同一个文件夹"""
+        return self.file_key, self.node_ids.split(",")[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file_key": self.file_key,
+            "node_ids": self.node_ids,
+            "image_format": self.image_format,
+            "image_scale": self.image_scale,
+            "tree_depth": self.tree_depth,
+            "incremental": self.incremental,
+            "durable": self.durable
+        }
+
+
+def load_jobs(file_path: str, defaults: Dict[str, Any] = None) -> List[BatchExportJob]:
+    """
+    读取导出描述文件：JSON 数组（或带 exports 数组的对象），或每行一个 JSON 对象
+
+    Raises:
+        ValueError: 文件内容无效
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"无法解析导出描述文件 {file_path}: {e}") from e
+    if isinstance(data, dict):
+        defaults = {**(defaults or {}), **{key: value for key, value in data.items() if key != "exports"}}
+        data = data.get("exports", [])
+    if not isinstance(data, list):
+        raise ValueError(f"导出描述文件 {file_path} 应为数组")
+    return [BatchExportJob.from_dict(spec, defaults) for spec in data]
+
+
+class BatchExportResult:
+    def __init__(self, job: BatchExportJob, index: int):
+        """
+        一个文件的导出结果
+
+        Args:
+            job: 导出的文件
+            index: 在批量导出中的序号（从1开始）
+        """
+        self.job = job
+        self.index = index
+        self.status = STATUS_FAILED
+        self.elapsed = 0.0
+        self.target_dir: Optional[str] = None
+        self.version = ""
+        self.nodes = 0
+        self.images = 0
+        self.cached_images = 0
+        self.failed_images = 0
+        self.image_bytes = 0
+        # 阶段 -> 错误信息
+        self.errors: Dict[str, str] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.job.to_dict(),
+            "status": self.status,
+            "elapsed": round(self.elapsed, 3),
+            "target_dir": self.target_dir,
+            "version": self.version,
+            "nodes": self.nodes,
+            "images": self.images,
+            "cached_images": self.cached_images,
+            "failed_images": self.failed_images,
+            "image_bytes": self.image_bytes,
+            "errors": self.errors
+        }
+
+
+class BatchExportReport:
+    def __init__(self, results: List[BatchExportResult], elapsed: float, max_concurrent_files: int,
+                 api_stats: Dict[str, Any] = None):
+        """
+        批量导出的汇总
+
+        Args:
+            results: 每个文件的结果（按输入顺序）
+            elapsed: 批量导出总耗时（秒）
+            max_concurrent_files: 同时导出的文件数量上限
+            api_stats: 导出结束时共享 API 客户端的统计（排队、等待时间、429 次数、缓存命中等，自进程启动起累计）
+        """
+        self.results = results
+        self.elapsed = elapsed
+        self.max_concurrent_files = max_concurrent_files
+        self.api_stats = api_stats
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    def totals(self) -> Dict[str, Any]:
+        """总量与吞吐量（按批量导出的总耗时计算）"""
+        elapsed = max(self.elapsed, 1e-9)
+        images = sum(result.images for result in self.results)
+        image_bytes = sum(result.image_bytes for result in self.results)
+        return {
+            "files": len(self.results),
+            "succeeded": self.count(STATUS_SUCCESS),
+            "partial": self.count(STATUS_PARTIAL),
+            "failed": self.count(STATUS_FAILED),
+            "nodes": sum(result.nodes for result in self.results),
+            "images": images,
+            "cached_images": sum(result.cached_images for result in self.results),
+            "failed_images": sum(result.failed_images for result in self.results),
+            "image_bytes": image_bytes,
+            "elapsed": round(self.elapsed, 3),
+            # 各文件耗时之和，与总耗时之比即为实际的并发程度
+            "file_seconds": round(sum(result.elapsed for result in self.results), 3),
+            "files_per_minute": round(len(self.results) * 60 / elapsed, 2),
+            "images_per_second": round(images / elapsed, 2),
+            "megabytes_per_second": round(image_bytes / 1024 / 1024 / elapsed, 3),
+            "max_concurrent_files": self.max_concurrent_files
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"totals": self.totals(), "api": self.api_stats, "results": [result.to_dict() for result in self.results]}
+
+
+# 导出单个文件的协程：返回导出摘要（target_dir、version、nodes、images、cached_images、
+# failed_images、image_bytes、errors），没有 target_dir 或抛出异常时该文件导出失败
+ExportFunction = Callable[[BatchExportJob], Awaitable[Dict[str, Any]]]
+ProgressCallback = Callable[[BatchExportResult, int, int], None]
+StatsFunction = Callable[[], Dict[str, Any]]
+
+
+class FigmaBatchExporter:
+    def __init__(self, export_file: ExportFunction, max_concurrent_files: int = DEFAULT_MAX_CONCURRENT_FILES,
+                 api_stats: StatsFunction = None):
+        """
+        初始化批量导出器
+
+        Args:
+            export_file: 导出单个文件的协程（共用服务器的客户端、速率限制和下载并发数）
+            max_concurrent_files: 同时导出的文件数量
+            api_stats: 返回共享 API 客户端统计的函数，结果写入汇总；为None时不记录
+        """
+        self.export_file = export_file
+        self.max_concurrent_files = max(1, max_concurrent_files)
+        self.api_stats = api_stats
+
+    @classmethod
+    def from_env(cls, export_file: ExportFunction, api_stats: StatsFunction = None) -> "FigmaBatchExporter":
+        """
+        根据环境变量创建批量导出器
+
+        支持的环境变量:
+            FIGMA_BATCH_CONCURRENCY
+        """
+        return cls(export_file, int(os.getenv("FIGMA_BATCH_CONCURRENCY", DEFAULT_MAX_CONCURRENT_FILES)), api_stats)
+
+    async def run(self, jobs: List[BatchExportJob], max_concurrent_files: int = None,
+                  on_progress: ProgressCallback = None) -> BatchExportReport:
+        """
+        导出所有文件，单个文件失败不影响其他文件；
+        与前面的导出写入同一个文件夹（同一文件、同一个首节点）的导出不执行，直接记为失败
+
+        Args:
+            jobs: 要导出的文件
+            max_concurrent_files: 同时导出的文件数量，为None时使用初始化时的设置
+            on_progress: 每个文件完成时的回调 (结果, 已完成数量, 总数)
+
+        Returns:
+            批量导出汇总，结果按输入顺序排列
+        """
+        limit = max(1, max_concurrent_files or self.max_concurrent_files)
+        semaphore = asyncio.Semaphore(limit)
+        results = [BatchExportResult(job, index) for index, job in enumerate(jobs, 1)]
+        first_index: Dict[Tuple[str, str], int] = {}
+        for result in results:
+            index = first_index.setdefault(result.job.target_key, result.index)
+            if index != result.index:
+                result.errors["Export"] = f"与第 {index} 个导出的输出文件夹相同（同一文件、同一个首节点），已跳过"
+        completed = 0
+        start = time.perf_counter()
+
+        async def export_one(result: BatchExportResult) -> None:
+            nonlocal completed
+            # 重复的导出在开始前就已记为失败
+            if not result.errors:
+                async with semaphore:
+                    file_start = time.perf_counter()
+                    try:
+                        summary = await self.export_file(result.job)
+                    except Exception as e:
+                        result.errors["Export"] = str(e) or type(e).__name__
+                    else:
+                        for key in ("target_dir", "version", "nodes", "images", "cached_images", "failed_images",
+                                    "image_bytes"):
+                            if summary.get(key) is not None:
+                                setattr(result, key, summary[key])
+                        result.errors.update(summary.get("errors") or {})
+                        if result.target_dir is None:
+                            result.status = STATUS_FAILED
+                        elif result.errors or result.failed_images:
+                            result.status = STATUS_PARTIAL
+                        else:
+                            result.status = STATUS_SUCCESS
+                    result.elapsed = time.perf_counter() - file_start
+            completed += 1
+            if on_progress:
+                on_progress(result, completed, len(results))
+
+        await asyncio.gather(*(export_one(result) for result in results))
+        return BatchExportReport(results, time.perf_counter() - start, limit,
+                                 self.api_stats() if self.api_stats else None)
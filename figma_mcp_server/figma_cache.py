@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Figma 响应磁盘缓存
+按 file_key、接口、请求参数和文档版本缓存 /v1/files 与 /v1/files/:key/nodes 的 JSON 响应
+带容量上限、LRU 淘汰和命中统计
+
+元数据由锁保护，读写缓存文件的方法可以放在线程中执行；
+写入条目只把索引标记为待保存，由 flush 统一写入磁盘
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认缓存配置
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "figma-mcp-tools", "responses")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 10.0
+
+INDEX_FILENAME = "index.json"
+# put 之后两次写入索引的最小间隔（秒）
+INDEX_SAVE_INTERVAL = 5.0
+
+
+class FigmaResponseCache:
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，如果为None则使用 ~/.cache/figma-mcp-tools/responses
+            max_bytes: 缓存总大小上限（字节），超出后按 LRU 淘汰
+            ttl: 未指定版本时，缓存条目不经版本校验被直接复用的最长时间（秒）
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        # entry_key -> 元数据，按最近使用顺序排列（最久未使用的在最前）
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # 请求键 -> 最新版本的 entry_key
+        self._latest: Dict[str, str] = {}
+        self._total_bytes = 0
+        # 保护上面的元数据；_index_lock 保证索引按快照顺序写入
+        self._lock = threading.RLock()
+        self._index_lock = threading.Lock()
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def from_env(cls) -> Optional["FigmaResponseCache"]:
+        """
+        根据环境变量创建缓存，FIGMA_CACHE_MAX_MB=0 时禁用缓存
+
+        支持的环境变量:
+            FIGMA_CACHE_DIR, FIGMA_CACHE_MAX_MB, FIGMA_CACHE_TTL
+        """
+        max_mb = float(os.getenv("FIGMA_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024)))
+        if max_mb <= 0:
+            return None
+        return cls(
+            os.getenv("FIGMA_CACHE_DIR"),
+            max_bytes=int(max_mb * 1024 * 1024),
+            ttl=float(os.getenv("FIGMA_CACHE_TTL", DEFAULT_TTL))
+        )
+
+    @staticmethod
+    def make_key(file_key: str, endpoint: str, params: Dict[str, Any] = None) -> str:
+        """生成与参数顺序无关的请求键"""
+        normalized = sorted((str(k), str(v)) for k, v in (params or {}).items() if k != "version")
+        raw = json.dumps([file_key, endpoint, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_key(self, request_key: str, version: str) -> str:
+        return hashlib.sha256(f"{request_key}:{version}".encode("utf-8")).hexdigest()
+
+    def _path(self, entry_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{entry_key}.json")
+
+    def get_path(self, file_key: str, endpoint: str, params: Dict[str, Any] = None,
+                 version: str = None) -> Optional[str]:
+        """
+        查找缓存文件路径（计入命中统计），供流式解析直接读取
+
+        Args:
+            file_key: Figma文件键
+            endpoint: 接口名称（files / nodes）
+            params: 请求参数
+            version: 文档版本；为None时返回 ttl 内最新版本的缓存
+
+        Returns:
+            缓存的原始 JSON 文件路径，未命中返回None
+        """
+        request_key = self.make_key(file_key, endpoint, params)
+        with self._lock:
+            if version:
+                entry_key = self._entry_key(request_key, version)
+            else:
+                entry_key = self._latest.get(request_key)
+
+            entry = self._entries.get(entry_key) if entry_key else None
+            if entry is None or (not version and not self.is_fresh(entry)):
+                self.misses += 1
+                return None
+
+            path = self._path(entry_key)
+            if not os.path.exists(path):
+                self._remove(entry_key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return path
+
+    def get(self, file_key: str, endpoint: str, params: Dict[str, Any] = None,
+            version: str = None) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存（阻塞的文件操作，可放在线程中执行）
+
+        Args:
+            file_key: Figma文件键
+            endpoint: 接口名称（files / nodes）
+            params: 请求参数
+            version: 文档版本；为None时返回 ttl 内最新版本的缓存
+
+        Returns:
+            缓存的 JSON 数据，未命中返回None
+        """
+        path = self.get_path(file_key, endpoint, params, version)
+        if path is None:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            # 文件损坏：撤销本次命中
+            with self._lock:
+                self._remove(os.path.splitext(os.path.basename(path))[0])
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def peek(self, file_key: str, endpoint: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        查看请求最新缓存条目的元数据（不读取内容、不计入命中统计）
+
+        Returns:
+            包含 version 和 stored_at 的元数据，没有缓存时返回None
+        """
+        with self._lock:
+            entry_key = self._latest.get(self.make_key(file_key, endpoint, params))
+            return self._entries.get(entry_key) if entry_key else None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """条目是否仍在 ttl 内，可以不经校验直接复用"""
+        return time.time() - entry["stored_at"] <= self.ttl
+
+    def revalidate(self, file_key: str, endpoint: str, params: Dict[str, Any], version: str) -> bool:
+        """
+        确认某个版本的缓存仍是最新的：重置其 ttl 并将其标记为该请求的最新条目
+
+        Returns:
+            该版本是否存在于缓存中
+        """
+        request_key = self.make_key(file_key, endpoint, params)
+        entry_key = self._entry_key(request_key, version)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return False
+            entry["stored_at"] = time.time()
+            self._latest[request_key] = entry_key
+            self._index_dirty = True
+            self.revalidations += 1
+            return True
+
+    def put(self, file_key: str, endpoint: str, params: Dict[str, Any], content: bytes, version: str) -> None:
+        """
+        写入缓存（阻塞的文件操作，可放在线程中执行）
+
+        Args:
+            file_key: Figma文件键
+            endpoint: 接口名称（files / nodes）
+            params: 请求参数
+            content: 原始响应体
+            version: 响应中的文档版本
+        """
+        if not version or len(content) > self.max_bytes:
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            logger.warning(f"Failed to write cache entry: {e}")
+            return
+
+        if self.put_file(file_key, endpoint, params, temp_path, version) is None:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+        self.flush(INDEX_SAVE_INTERVAL)
+
+    def put_file(self, file_key: str, endpoint: str, params: Dict[str, Any], path: str,
+                 version: str) -> Optional[str]:
+        """
+        把已经写在磁盘上的响应文件移入缓存（文件会被移动）；索引只标记为待保存，由 flush 写入
+
+        Args:
+            file_key: Figma文件键
+            endpoint: 接口名称（files / nodes）
+            params: 请求参数
+            path: 原始响应文件，最好位于缓存目录中以便原子重命名
+            version: 响应中的文档版本
+
+        Returns:
+            缓存中的文件路径，未缓存时返回None（原文件保持不变）
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if not version or size > self.max_bytes:
+            return None
+
+        request_key = self.make_key(file_key, endpoint, params)
+        entry_key = self._entry_key(request_key, version)
+        with self._lock:
+            self._remove(entry_key)
+
+            cache_path = self._path(entry_key)
+            try:
+                os.replace(path, cache_path)
+            except OSError as e:
+                logger.warning(f"Failed to write cache entry: {e}")
+                return None
+
+            self._entries[entry_key] = {
+                "request_key": request_key,
+                "file_key": file_key,
+                "endpoint": endpoint,
+                "version": version,
+                "size": size,
+                "stored_at": time.time()
+            }
+            self._latest[request_key] = entry_key
+            self._total_bytes += size
+            self._evict()
+            self._index_dirty = True
+        return cache_path
+
+    def _remove(self, entry_key: str) -> None:
+        """删除单个缓存条目（调用方持有锁）"""
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry["size"]
+        if self._latest.get(entry["request_key"]) == entry_key:
+            del self._latest[entry["request_key"]]
+        with contextlib.suppress(OSError):
+            os.remove(self._path(entry_key))
+
+    def _evict(self) -> None:
+        """按 LRU 顺序淘汰，直到总大小不超过上限（调用方持有锁）"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            entry_key = next(iter(self._entries))
+            self._remove(entry_key)
+            self.evictions += 1
+
+    def _load_index(self) -> None:
+        """从磁盘加载索引（按最近使用顺序保存）"""
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for entry_key, entry in entries:
+            if not os.path.exists(self._path(entry_key)):
+                continue
+            self._entries[entry_key] = entry
+            self._total_bytes += entry["size"]
+            latest_key = self._latest.get(entry["request_key"])
+            if latest_key is None or self._entries[latest_key]["stored_at"] <= entry["stored_at"]:
+                self._latest[entry["request_key"]] = entry_key
+        self._evict()
+
+    def flush(self, min_interval: float = 0.0) -> None:
+        """
+        把待保存的索引写入磁盘（阻塞的文件操作，可放在线程中执行）
+
+        Args:
+            min_interval: 距上次写入不足该时间（秒）时跳过，留给之后的 flush
+        """
+        with self._index_lock:
+            with self._lock:
+                if not self._index_dirty or time.monotonic() - self._index_saved_at < min_interval:
+                    return
+                content = json.dumps(list(self._entries.items()))
+                self._index_dirty = False
+                self._index_saved_at = time.monotonic()
+            if not self._save_index(content):
+                with self._lock:
+                    self._index_dirty = True
+
+    def _save_index(self, content: str) -> bool:
+        """原子写入索引，返回是否成功"""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, os.path.join(self.cache_dir, INDEX_FILENAME))
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            logger.warning(f"Failed to write cache index: {e}")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
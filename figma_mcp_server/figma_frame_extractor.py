@@ -5,93 +5,90 @@ Figma Frame ID 提取器类
 返回详细的节点信息
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from .figma_api_client import FigmaAPIClient
+from .figma_node_record import FRAME_NODE_FIELDS, IDENTITY_FIELDS, FrameNodeRecord
+from .figma_query_planner import FigmaQuery
+from .figma_stream_parser import scan_document_file
+from .figma_tree_walker import walk_nodes
 from .file_saver import FigmaFileSaver
 
 class FigmaFrameExtractor:
-    def __init__(self, access_token: str = None):
-        """初始化提取器"""
+    def __init__(self, access_token: str = None, client: FigmaAPIClient = None, streaming: bool = False,
+                 file_saver: FigmaFileSaver = None):
+        """
+        初始化提取器
+        
+        Args:
+            access_token: Figma 访问令牌
+            client: 共享的 API 客户端
+            streaming: 是否使用流式解析（适合超大文件，内存只与输出节点数量有关）
+            file_saver: 共享的文件保存器
+        """
         self.access_token = access_token or os.getenv("FIGMA_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("需要提供 access_token 或设置环境变量 FIGMA_ACCESS_TOKEN")
-        self.file_saver = FigmaFileSaver()
+        self.client = client or FigmaAPIClient(self.access_token)
+        self.streaming = streaming
+        self.file_saver = file_saver or FigmaFileSaver()
     
-    def get_figma_file(self, file_key: str) -> Dict[str, Any]:
-        """获取Figma文件信息"""
-        url = f"https://api.figma.com/v1/files/{file_key}"
-        headers = {"X-Figma-Token": self.access_token}
-        
+    def build_query(self, file_key: str, max_depth: int = None) -> FigmaQuery:
+        """声明数据需求：从文档根节点开始，Frame 最深出现在 max_depth 层"""
+        return FigmaQuery(file_key, depth=max_depth)
+    
+    async def get_figma_file(self, file_key: str, max_depth: int = None) -> Dict[str, Any]:
+        """获取Figma文件信息（只获取到 max_depth 层）"""
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self.client.execute(self.build_query(file_key, max_depth))
+        except httpx.HTTPError as e:
             print(f"请求错误: {e}")
             return None
     
-    def extract_node_info(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 2) -> List[Dict[str, Any]]:
-        """递归提取节点信息"""
-        nodes_info = []
+    def create_node_info(self, node: Dict[str, Any], fields: Tuple[str, ...] = None) -> FrameNodeRecord:
+        """
+        提取单个节点的详细信息（只保留存在的属性，见 FRAME_NODE_FIELDS）
         
-        # 提取当前节点信息
-        node_info = {
-            "id": node.get("id"),
-            "name": node.get("name"),
-            "type": node.get("type"),
-            "absoluteBoundingBox": node.get("absoluteBoundingBox"),
-            "constraints": node.get("constraints"),
-            "fills": node.get("fills"),
-            "strokes": node.get("strokes"),
-            "effects": node.get("effects"),
-            "characters": node.get("characters"),  # 文本内容
-            "style": node.get("style"),  # 文本样式
-            "componentId": node.get("componentId"),  # 组件ID
-            "componentProperties": node.get("componentProperties"),  # 组件属性
-            "interactions": node.get("interactions"),  # 交互
-            "transitionNodeID": node.get("transitionNodeID"),  # 过渡节点
-            "transitionDuration": node.get("transitionDuration"),  # 过渡时长
-            "transitionEasing": node.get("transitionEasing"),  # 过渡缓动
-            "layoutMode": node.get("layoutMode"),  # 布局模式
-            "primaryAxisSizingMode": node.get("primaryAxisSizingMode"),  # 主轴尺寸模式
-            "counterAxisSizingMode": node.get("counterAxisSizingMode"),  # 交叉轴尺寸模式
-            "primaryAxisAlignItems": node.get("primaryAxisAlignItems"),  # 主轴对齐
-            "counterAxisAlignItems": node.get("counterAxisAlignItems"),  # 交叉轴对齐
-            "paddingLeft": node.get("paddingLeft"),  # 左内边距
-            "paddingRight": node.get("paddingRight"),  # 右内边距
-            "paddingTop": node.get("paddingTop"),  # 上内边距
-            "paddingBottom": node.get("paddingBottom"),  # 下内边距
-            "itemSpacing": node.get("itemSpacing"),  # 项目间距
-            "cornerRadius": node.get("cornerRadius"),  # 圆角半径
-            "strokeWeight": node.get("strokeWeight"),  # 描边宽度
-            "strokeAlign": node.get("strokeAlign"),  # 描边对齐
-            "opacity": node.get("opacity"),  # 透明度
-            "blendMode": node.get("blendMode"),  # 混合模式
-            "isMask": node.get("isMask"),  # 是否为蒙版
-            "effects": node.get("effects"),  # 效果
-            "styles": node.get("styles"),  # 样式
-            "boundVariables": node.get("boundVariables"),  # 绑定变量
-            "overrides": node.get("overrides"),  # 覆盖
-            "children": []  # 子节点（将在下面填充）
-        }
-        
-        # 如果当前节点是FRAME类型，添加到列表
-        if node.get("type") == "FRAME":
-            nodes_info.append(node_info)
+        Args:
+            node: Figma 节点
+            fields: 只复制这些属性（由 FrameNodeRecord.project_fields 得到），为None表示全部
+        """
+        return FrameNodeRecord(node, fields)
+    
+    def extract_node_info(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 2,
+                          fields: Tuple[str, ...] = None) -> List[FrameNodeRecord]:
+        """提取 max_depth 层内（包含）所有FRAME节点的信息，fields 为每个节点复制的属性"""
+        return [
+            self.create_node_info(frame, fields)
+            for frame, _, _ in walk_nodes(node, max_depth, ["FRAME"], start_depth=depth)
+        ]
+    
+    async def scan_frames(self, file_key: str, max_depth: int = 2,
+                          fields: Tuple[str, ...] = None) -> Optional[Tuple[Dict[str, Any], List[FrameNodeRecord]]]:
+        """
+        流式提取Frame节点：响应写入磁盘后逐个 token 解析，只构建 max_depth 层内 FRAME 节点需要的属性
+        （指定 fields 时只构建这些属性）
         
-        # 如果达到最大深度，停止递归
-        if depth >= max_depth:
-            return nodes_info
+        Returns:
+            (文件元数据, Frame节点信息列表)，失败时返回None
+        """
+        try:
+            async with self.client.open_json_file(self.build_query(file_key, max_depth)) as path:
+                metadata, records, found_root = await asyncio.to_thread(
+                    scan_document_file, path, max_depth, ["FRAME"], fields or FRAME_NODE_FIELDS
+                )
+        except httpx.HTTPError as e:
+            print(f"请求错误: {e}")
+            return None
         
-        # 递归处理子节点
-        children = node.get("children", [])
-        for child in children:
-            child_nodes_info = self.extract_node_info(child, depth + 1, max_depth)
-            nodes_info.extend(child_nodes_info)
+        if not found_root:
+            print("未找到文档数据")
+            return None
         
-        return nodes_info
+        return metadata, [self.create_node_info(record, fields) for record in records]
     
     def create_page_info(self, file_data: Dict[str, Any], document: Dict[str, Any]) -> Dict[str, Any]:
         """创建页面信息"""
@@ -145,25 +142,45 @@ class FigmaFrameExtractor:
         
         return design_info
     
-    def extract_frames(self, file_key: str, max_depth: int = 2) -> Dict[str, Any]:
-        """提取Frame节点信息"""
-        print(f"正在获取文件 {file_key} 的信息...")
-        
-        # 获取文件信息
-        file_data = self.get_figma_file(file_key)
-        if not file_data:
-            return None
+    async def extract_frames(self, file_key: str, max_depth: int = 2, fields: Iterable[str] = None) -> Dict[str, Any]:
+        """
+        提取Frame节点信息
         
-        # 获取文档根节点
-        document = file_data.get("document", {})
-        if not document:
-            print("未找到文档数据")
-            return None
+        Args:
+            file_key: Figma文件键
+            max_depth: Frame 所在的最大深度
+            fields: 每个Frame输出的节点属性（id/name/type 始终保留）。指定时每个页面只包含
+                pageInfo 和这些属性（properties），不再生成尺寸、设计、注释等派生信息；为None或空表示完整输出
         
-        print(f"文件名称: {file_data.get('name', 'Unknown')}")
+        Raises:
+            ValueError: fields 包含不支持的属性
+        """
+        projection = FrameNodeRecord.project_fields(fields)
+        print(f"正在获取文件 {file_key} 的信息...")
         
-        # 提取节点信息
-        nodes_info = self.extract_node_info(document, depth=0, max_depth=max_depth)
+        if self.streaming:
+            # 流式解析：不构建完整文档
+            scanned = await self.scan_frames(file_key, max_depth, projection)
+            if not scanned:
+                return None
+            file_data, nodes_info = scanned
+            print(f"文件名称: {file_data.get('name', 'Unknown')}")
+        else:
+            # 获取文件信息
+            file_data = await self.get_figma_file(file_key, max_depth)
+            if not file_data:
+                return None
+            
+            # 获取文档根节点
+            document = file_data.get("document", {})
+            if not document:
+                print("未找到文档数据")
+                return None
+            
+            print(f"文件名称: {file_data.get('name', 'Unknown')}")
+            
+            # 提取节点信息
+            nodes_info = self.extract_node_info(document, depth=0, max_depth=max_depth, fields=projection)
         
         # 输出结果
         if nodes_info:
@@ -177,10 +194,21 @@ class FigmaFrameExtractor:
                 "version": file_data.get("version", ""),
                 "pages": []
             }
+            if projection:
+                result["fields"] = list(projection)
             
             for i, node_info in enumerate(nodes_info, 1):
                 print(f"{i}. {node_info['name']} ({node_info['id']})")
                 
+                if projection:
+                    # 投影输出：只包含请求的属性
+                    page_data = self.create_page_info(file_data, node_info)
+                    page_data["properties"] = {
+                        key: value for key, value in node_info.items() if key not in IDENTITY_FIELDS
+                    }
+                    result["pages"].append(page_data)
+                    continue
+                
                 # 为每个frame创建详细页面信息
                 page_data = {}
                 page_data.update(self.create_page_info(file_data, node_info))
@@ -228,7 +256,7 @@ def main():
     
     try:
         extractor = FigmaFrameExtractor()
-        result = extractor.extract_frames(file_key)
+        result = asyncio.run(extractor.extract_frames(file_key))
         
         if result:
             # 使用文件保存器保存Frame信息
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Figma 渲染图片磁盘缓存
+按 (file_key, 文档版本, 节点ID, 格式, 缩放比例) 缓存已经下载的渲染图片，
+命中时既不需要 /v1/images 渲染请求，也不需要从 CDN 下载；
+与响应缓存共用容量上限、LRU 淘汰、索引和命中统计
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+from .figma_cache import FigmaResponseCache
+
+# 默认缓存配置
+DEFAULT_IMAGE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "figma-mcp-tools", "images")
+DEFAULT_IMAGE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 缓存条目使用的接口名称
+IMAGE_ENDPOINT = "images"
+
+
+class FigmaImageCache(FigmaResponseCache):
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES):
+        """
+        初始化图片缓存（条目总是带版本，不需要 ttl）
+
+        Args:
+            cache_dir: 缓存目录，如果为None则使用 ~/.cache/figma-mcp-tools/images
+            max_bytes: 缓存总大小上限（字节），超出后按 LRU 淘汰
+        """
+        super().__init__(cache_dir or DEFAULT_IMAGE_CACHE_DIR, max_bytes=max_bytes, ttl=0)
+
+    @classmethod
+    def from_env(cls) -> Optional["FigmaImageCache"]:
+        """
+        根据环境变量创建图片缓存，FIGMA_IMAGE_CACHE_MAX_MB=0 时禁用缓存
+
+        支持的环境变量:
+            FIGMA_IMAGE_CACHE_DIR, FIGMA_IMAGE_CACHE_MAX_MB
+        """
+        max_mb = float(os.getenv("FIGMA_IMAGE_CACHE_MAX_MB", DEFAULT_IMAGE_CACHE_MAX_BYTES / (1024 * 1024)))
+        if max_mb <= 0:
+            return None
+        return cls(os.getenv("FIGMA_IMAGE_CACHE_DIR"), max_bytes=int(max_mb * 1024 * 1024))
+
+    @staticmethod
+    def image_params(node_id: str, format: str, scale: float) -> Dict[str, Any]:
+        """缓存键中的渲染参数（缩放比例统一为浮点数，1 与 1.0 视为相同）"""
+        return {"ids": node_id, "format": format.lower(), "scale": float(scale)}
+
+    def _path(self, entry_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{entry_key}.img")
+
+    def lookup(self, file_key: str, version: str, node_id: str, format: str, scale: float) -> Optional[str]:
+        """
+        查找缓存的图片（计入命中统计）
+
+        Returns:
+            缓存中的图片路径，未命中返回None
+        """
+        return self.get_path(file_key, IMAGE_ENDPOINT, self.image_params(node_id, format, scale), version=version)
+
+    def prepare_copy(self, path: str) -> str:
+        """
+        把下载好的图片复制为缓存目录中的临时文件（阻塞的文件操作，可放在线程中执行）
+
+        Returns:
+            临时文件路径，交给 store 移入缓存
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, temp_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+        return temp_path
+
+    def store(self, file_key: str, version: str, node_id: str, format: str, scale: float,
+              temp_path: str) -> Optional[str]:
+        """
+        把 prepare_copy 得到的临时文件移入缓存，未缓存时删除临时文件（阻塞的文件操作，可放在线程中执行；
+        索引只标记为待保存，调用方在一批图片存入后调用 flush）
+
+        Returns:
+            缓存中的图片路径，未缓存（无版本或超过容量上限）时返回None
+        """
+        cache_path = self.put_file(file_key, IMAGE_ENDPOINT, self.image_params(node_id, format, scale),
+                                   temp_path, version)
+        if cache_path is None:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+        return cache_path
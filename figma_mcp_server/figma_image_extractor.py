@@ -5,24 +5,42 @@ Figma 图片获取器类
 获取指定节点的图片
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import os
-from typing import Dict, Any
+import shutil
+from typing import Dict, Any, Optional
+from .figma_api_client import FigmaAPIClient
+from .figma_image_cache import FigmaImageCache
+from .figma_query_planner import FigmaQuery
 from .file_saver import FigmaFileSaver
 
+# 默认同时下载的图片数量
+DEFAULT_MAX_CONCURRENT_DOWNLOADS = 8
+
 class FigmaImageExtractor:
-    def __init__(self, access_token: str = None):
-        """初始化提取器"""
+    def __init__(self, access_token: str = None, client: FigmaAPIClient = None,
+                 max_concurrent_downloads: int = DEFAULT_MAX_CONCURRENT_DOWNLOADS, file_saver: FigmaFileSaver = None,
+                 image_cache: FigmaImageCache = None):
+        """初始化提取器（client 与 file_saver 可由服务器共享；image_cache 为None时不缓存渲染图片）"""
         self.access_token = access_token or os.getenv("FIGMA_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("需要提供 access_token 或设置环境变量 FIGMA_ACCESS_TOKEN")
-        self.file_saver = FigmaFileSaver()
+        self.client = client or FigmaAPIClient(self.access_token)
+        self.max_concurrent_downloads = max(1, max_concurrent_downloads)
+        # 同一个提取器的所有调用（包括批量导出中同时进行的文件）共用下载并发数
+        self.download_slots = asyncio.Semaphore(self.max_concurrent_downloads)
+        self.file_saver = file_saver or FigmaFileSaver()
+        self.image_cache = image_cache
+    
+    def build_query(self, file_key: str, node_ids: str, params: Dict[str, Any] = None) -> FigmaQuery:
+        """声明数据需求：渲染目标节点的图片"""
+        return FigmaQuery(file_key, node_ids=FigmaQuery.parse_ids(node_ids), render=True, params=params)
     
-    def get_figma_images(self, file_key: str, node_ids: str, **kwargs) -> Dict[str, Any]:
+    async def get_figma_images(self, file_key: str, node_ids: str, **kwargs) -> Dict[str, Any]:
         """获取Figma图片"""
-        url = f"https://api.figma.com/v1/images/{file_key}"
-        params = {"ids": node_ids}
+        params = {}
         
         # 添加可选参数
         if "format" in kwargs:
@@ -44,54 +62,83 @@ class FigmaImageExtractor:
         if "use_absolute_bounds" in kwargs:
             params["use_absolute_bounds"] = kwargs["use_absolute_bounds"]
         
-        headers = {"X-Figma-Token": self.access_token}
-        
         try:
-            response = requests.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self.client.execute(self.build_query(file_key, node_ids, params))
+        except httpx.HTTPError as e:
             print(f"请求错误: {e}")
             return None
     
-    def download_image(self, url: str, filename: str) -> bool:
+    async def download_image(self, url: str, filename: str) -> bool:
         """下载图片"""
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            
+            await self.client.download(url, filename)
             return True
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"下载图片失败: {e}")
             return False
     
-    def extract_images(self, file_key: str, node_ids: str, format: str = "png", scale: float = 1.0, output_dir: str = None) -> Dict[str, Any]:
-        """提取图片"""
+    async def extract_images(self, file_key: str, node_ids: str, format: str = "png", scale: float = 1.0, output_dir: str = None,
+                             max_concurrent_downloads: int = None) -> Dict[str, Any]:
+        """
+        提取图片（并发下载，并发数受 max_concurrent_downloads 限制；图片缓存命中的节点不再渲染和下载）
+        
+        Args:
+            file_key: Figma文件键
+            node_ids: 目标节点ID，逗号分隔
+            format: 图片格式
+            scale: 缩放比例
+            output_dir: 图片直接写入该目录（由调用方记录图片信息）；为None时写入 images_{file_key}/ 并保存 images_info.json（路径在结果的 info_path 中）
+            max_concurrent_downloads: 本次调用单独的下载并发数，为None时与其他调用共用初始化时设置的并发数
+        """
         print(f"正在获取文件 {file_key} 的图片...")
         print(f"目标节点: {node_ids}")
         print(f"图片格式: {format}")
         print(f"缩放比例: {scale}")
         
-        # 获取图片信息
-        images_data = self.get_figma_images(
-            file_key, 
-            node_ids, 
-            format=format,
-            scale=scale
-        )
+        # 查找图片缓存：缓存按文档版本区分，渲染请求也固定到该版本，保证缓存内容与版本一致
+        target_ids = FigmaQuery.parse_ids(node_ids)
+        version = await self.client.get_file_version(file_key) if self.image_cache else None
+        cached: Dict[str, str] = {}
         
-        if not images_data:
-            return None
+        def lookup_cached() -> None:
+            for node_id in target_ids:
+                cache_path = self.image_cache.lookup(file_key, version, node_id, format, scale)
+                if cache_path:
+                    cached[node_id] = cache_path
+        
+        if version:
+            # 查找会读取缓存文件状态，所有节点在一个线程中查完
+            await asyncio.to_thread(lookup_cached)
+            print(f"图片缓存命中: {len(cached)}/{len(target_ids)}")
+        
+        # 获取未命中节点的图片信息
+        render_ids = [node_id for node_id in target_ids if node_id not in cached]
+        if render_ids:
+            images_data = await self.get_figma_images(
+                file_key, 
+                ",".join(render_ids), 
+                format=format,
+                scale=scale,
+                **({"version": version} if version else {})
+            )
+            
+            if not images_data:
+                return None
+        else:
+            images_data = {"images": {}}
         
         print(f"文件名称: {images_data.get('name', 'Unknown')}")
         print(f"最后修改: {images_data.get('lastModified', 'Unknown')}")
-        print(f"版本: {images_data.get('version', 'Unknown')}")
+        print(f"版本: {images_data.get('version') or version or 'Unknown'}")
+        
+        if images_data.get("failed_ids"):
+            print(f"⚠️ 以下节点所在批次渲染请求失败: {', '.join(images_data['failed_ids'])}")
         
-        # 处理图片
-        images = images_data.get("images", {})
+        # 处理图片（按目标节点顺序合并缓存命中与新渲染的图片）
+        rendered = images_data.get("images", {})
+        images = {node_id: cached.get(node_id) or rendered.get(node_id)
+                  for node_id in target_ids if node_id in cached or node_id in rendered}
+        images.update((node_id, url) for node_id, url in rendered.items() if node_id not in images)
         
         if not images:
             print("未找到任何图片")
@@ -104,57 +151,113 @@ class FigmaImageExtractor:
             "file_key": file_key,
             "file_name": images_data.get("name", ""),
             "last_modified": images_data.get("lastModified", ""),
-            "version": images_data.get("version", ""),
+            "version": images_data.get("version") or version or "",
             "target_nodes": node_ids,
             "format": format,
             "scale": scale,
             "images": {}
         }
         
-        success_count = 0
-        
-        # 使用文件保存器创建输出目录并保存图片信息
-        save_result = self.file_saver.save_images_info(file_key, result)
-        output_dir = save_result["output_dir"]
-        info_path = save_result["info_path"]
-        
-        for node_id, image_url in images.items():
-            if image_url:
-                # 生成文件名
-                filename = os.path.join(output_dir, f"{node_id}.{format}")
-                
-                print(f"\n下载图片: {node_id}")
-                print(f"  URL: {image_url}")
-                print(f"  保存到: {filename}")
-                
-                # 下载图片
-                if self.download_image(image_url, filename):
-                    print(f"  ✅ 下载成功")
-                    success_count += 1
-                    
-                    # 获取文件大小
-                    file_size = self.file_saver.get_file_size(filename)
-                    print(f"  文件大小: {file_size:.1f} KB")
-                else:
-                    print(f"  ❌ 下载失败")
-                
-                result["images"][node_id] = {
-                    "url": image_url,
-                    "filename": filename,
-                    "status": "success" if os.path.exists(filename) else "failed"
-                }
-            else:
+        # 创建输出目录，图片信息在下载完成后保存（包含每个图片的下载结果）
+        save_info = output_dir is None
+        if save_info:
+            output_dir = self.file_saver.create_output_dir(f"images_{file_key}")
+        # 图片直接下载到目录中，目录必须先存在
+        await self.file_saver.make_dirs(output_dir)
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrent_downloads)) if max_concurrent_downloads else self.download_slots
+        
+        async def copy_cached(node_id: str, cache_path: str) -> Optional[Dict[str, Any]]:
+            filename = os.path.join(output_dir, f"{node_id}.{format}")
+            try:
+                async with semaphore:
+                    await asyncio.to_thread(shutil.copyfile, cache_path, filename)
+            except OSError as e:
+                # 缓存文件在查找之后被淘汰或删除，返回None让该节点重新渲染和下载
+                print(f"⚠️ 读取缓存图片失败，重新渲染: {node_id} ({e})")
+                return None
+            print(f"♻️ 缓存命中: {node_id} -> {filename} ({self.file_saver.get_file_size(filename):.1f} KB)")
+            return {"url": None, "filename": filename, "status": "success", "cached": True}
+        
+        def store_in_cache(node_id: str, filename: str) -> None:
+            temp_path = self.image_cache.prepare_copy(filename)
+            self.image_cache.store(file_key, version, node_id, format, scale, temp_path)
+        
+        async def cache_download(node_id: str, filename: str) -> None:
+            # 复制和移入缓存都是阻塞的文件操作，索引在所有图片下载完成后统一保存
+            try:
+                await asyncio.to_thread(store_in_cache, node_id, filename)
+            except OSError as e:
+                print(f"⚠️ 写入图片缓存失败: {node_id} ({e})")
+        
+        async def download_one(node_id: str, image_url: str) -> Dict[str, Any]:
+            if node_id in cached:
+                return await copy_cached(node_id, image_url)
+            if not image_url:
                 print(f"\n节点 {node_id}: 无法生成图片")
-                result["images"][node_id] = {
+                return {
                     "url": None,
                     "filename": None,
                     "status": "failed"
                 }
+            
+            # 生成文件名
+            filename = os.path.join(output_dir, f"{node_id}.{format}")
+            
+            # 下载图片
+            async with semaphore:
+                success = await self.download_image(image_url, filename)
+            
+            if success:
+                # 获取文件大小
+                file_size = self.file_saver.get_file_size(filename)
+                print(f"✅ 下载成功: {node_id} -> {filename} ({file_size:.1f} KB)")
+                if version:
+                    await cache_download(node_id, filename)
+            else:
+                print(f"❌ 下载失败: {node_id} ({image_url})")
+            
+            return {
+                "url": image_url,
+                "filename": filename,
+                "status": "success" if success and os.path.exists(filename) else "failed"
+            }
+        
+        # gather 按输入顺序返回，保证 result["images"] 的顺序稳定
+        statuses = await asyncio.gather(*(download_one(node_id, image_url) for node_id, image_url in images.items()))
+        for node_id, status in zip(images.keys(), statuses):
+            result["images"][node_id] = status
+        
+        # 缓存文件已失效的节点一起重新渲染和下载
+        evicted = [node_id for node_id, status in result["images"].items() if status is None]
+        if evicted:
+            for node_id in evicted:
+                del cached[node_id]
+            retry_data = await self.get_figma_images(
+                file_key,
+                ",".join(evicted),
+                format=format,
+                scale=scale,
+                **({"version": version} if version else {})
+            )
+            retry_urls = (retry_data or {}).get("images", {})
+            retried = await asyncio.gather(*(download_one(node_id, retry_urls.get(node_id)) for node_id in evicted))
+            result["images"].update(zip(evicted, retried))
+        if version:
+            await asyncio.to_thread(self.image_cache.flush)
+        
+        success_count = sum(1 for status in result["images"].values() if status["status"] == "success")
         
         print(f"\n=== 下载完成 ===")
         print(f"成功下载: {success_count}/{len(images)} 个图片")
         print(f"图片保存在: {output_dir}/")
-        print(f"图片信息保存在: {info_path}")
+        
+        if save_info:
+            # 使用文件保存器保存图片信息（后台写入时立即返回）
+            info_path = self.file_saver.save_images_info(file_key, result)["info_path"]
+            print(f"图片信息保存在: {info_path}")
+            # 已提交保存的结果不能再修改，返回带信息文件路径的副本（durable 调用只等待这个文件）
+            return {**result, "info_path": info_path}
         
         return result
 
@@ -200,7 +303,7 @@ def main():
     
     try:
         extractor = FigmaImageExtractor()
-        result = extractor.extract_images(file_key, node_ids, image_format, scale)
+        result = asyncio.run(extractor.extract_images(file_key, node_ids, image_format, scale))
         
         if not result:
             sys.exit(1)
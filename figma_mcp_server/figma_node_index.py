@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Figma 节点索引
+由已获取的文档一次性构建，之后按 id、父节点、路径、类型和名称查询都不需要重新遍历：
+节点按先序编号，子树对应一段连续的编号区间，
+类型与名称三元组的倒排表都是有序编号列表，可以用二分查找限定到某个子树
+"""
+
+import asyncio
+import heapq
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .figma_api_client import FigmaAPIClient
+from .figma_query_planner import FigmaQuery
+from .figma_stream_parser import scan_document_file
+from .figma_tree_walker import walk_nodes
+
+# 搜索匹配方式
+MATCH_CONTAINS = "contains"
+MATCH_PREFIX = "prefix"
+MATCH_EXACT = "exact"
+MATCH_MODES = (MATCH_CONTAINS, MATCH_PREFIX, MATCH_EXACT)
+
+# 路径中节点名称的分隔符
+PATH_SEPARATOR = " / "
+
+
+def _trigrams(text: str) -> Iterable[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FigmaNodeIndex:
+    def __init__(self, file_key: str, version: str = None, depth: int = None):
+        """
+        空索引，通过 add 按先序加入节点，或使用 from_document / from_records 构建
+
+        Args:
+            file_key: Figma文件键
+            version: 构建索引时的文档版本
+            depth: 构建索引时获取的树深度，为None表示完整文档
+        """
+        self.file_key = file_key
+        self.version = version
+        self.depth = depth
+        self.built_at = time.time()
+        # 以下列表均以先序编号为下标
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.types: List[str] = []
+        self.depths: List[int] = []
+        self.parents: List[int] = []
+        # 子树最后一个节点的先序编号，子树为 [编号, ends[编号]]
+        self.ends: List[int] = []
+        self._positions: Dict[str, int] = {}
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_trigram: Dict[str, List[int]] = {}
+        # (小写名称, 先序编号)，按名称排序后用于前缀查询
+        self._sorted_names: List[Tuple[str, int]] = []
+        self._lower_names: List[str] = []
+        self._open: List[int] = []
+
+    @classmethod
+    def from_document(cls, file_key: str, document: Dict[str, Any], version: str = None,
+                      depth: int = None) -> "FigmaNodeIndex":
+        """从文档根节点构建索引"""
+        index = cls(file_key, version, depth)
+        for node, node_depth, parent in walk_nodes(document):
+            index.add(node.get("id"), node.get("name"), node.get("type"), node_depth,
+                      parent.get("id") if parent is not None else None)
+        return index.finish()
+
+    @classmethod
+    def from_records(cls, file_key: str, records: Iterable[Dict[str, Any]], version: str = None,
+                     depth: int = None) -> "FigmaNodeIndex":
+        """从先序排列的节点记录（流式解析的输出）构建索引"""
+        index = cls(file_key, version, depth)
+        for record in records:
+            index.add(record.get("id"), record.get("name"), record.get("type"), record["depth"], record["parent_id"])
+        return index.finish()
+
+    def add(self, node_id: str, name: str, node_type: str, depth: int, parent_id: str = None) -> None:
+        """按先序加入一个节点（父节点必须已经加入）"""
+        position = len(self.ids)
+        # 深度不大于当前节点的已打开节点，其子树到此结束
+        while self._open and self.depths[self._open[-1]] >= depth:
+            self.ends[self._open.pop()] = position - 1
+        self._open.append(position)
+
+        name = name or ""
+        node_type = node_type or ""
+        self.ids.append(node_id)
+        self.names.append(name)
+        self.types.append(node_type)
+        self.depths.append(depth)
+        self.parents.append(self._positions.get(parent_id, -1) if parent_id is not None else -1)
+        self.ends.append(position)
+        self._positions[node_id] = position
+        self._by_type.setdefault(node_type, []).append(position)
+
+        lower_name = name.lower()
+        self._lower_names.append(lower_name)
+        self._sorted_names.append((lower_name, position))
+        for trigram in _trigrams(lower_name):
+            self._by_trigram.setdefault(trigram, []).append(position)
+
+    def finish(self) -> "FigmaNodeIndex":
+        """结束构建：关闭所有子树并排序名称表，返回自身"""
+        last = len(self.ids) - 1
+        for position in self._open:
+            self.ends[position] = last
+        self._open = []
+        self._sorted_names.sort()
+        self.built_at = time.time()
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._positions
+
+    def node_types(self) -> Dict[str, int]:
+        """各类型节点数量"""
+        return {node_type: len(positions) for node_type, positions in self._by_type.items()}
+
+    def _record(self, position: int) -> Dict[str, Any]:
+        parent = self.parents[position]
+        return {
+            "id": self.ids[position],
+            "name": self.names[position],
+            "type": self.types[position],
+            "depth": self.depths[position],
+            "parent_id": self.ids[parent] if parent >= 0 else None,
+            "path": self._path(position)
+        }
+
+    def _path(self, position: int) -> str:
+        names = []
+        while position >= 0:
+            names.append(self.names[position])
+            position = self.parents[position]
+        return PATH_SEPARATOR.join(reversed(names))
+
+    def get(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """按 id 查找节点"""
+        position = self._positions.get(node_id)
+        return self._record(position) if position is not None else None
+
+    def parent(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """查找父节点"""
+        position = self._positions.get(node_id)
+        if position is None or self.parents[position] < 0:
+            return None
+        return self._record(self.parents[position])
+
+    def path(self, node_id: str) -> Optional[str]:
+        """从文档根节点到该节点的名称路径"""
+        position = self._positions.get(node_id)
+        return self._path(position) if position is not None else None
+
+    def search(self, query: str = "", match: str = MATCH_CONTAINS, node_types: Iterable[str] = None,
+               under: str = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        搜索节点（名称不区分大小写）
+
+        从最短的候选编号列表（某个类型、某个名称三元组或前缀范围）出发按文档顺序检查，
+        找够 limit 个结果即停止，不遍历整棵树
+
+        Args:
+            query: 名称查询，为空表示不按名称过滤
+            match: 名称匹配方式：contains（包含）、prefix（前缀）、exact（完全一致）
+            node_types: 只返回这些类型的节点
+            under: 只返回该节点（例如某个页面）的后代
+            limit: 最多返回的节点数量，为None表示不限
+
+        Returns:
+            (按文档顺序排列的节点列表, 是否还有更多结果)
+
+        Raises:
+            ValueError: match 无效
+            KeyError: under 指定的节点不在索引中
+        """
+        if match not in MATCH_MODES:
+            raise ValueError(f"无效的匹配方式: {match}，可选: {', '.join(MATCH_MODES)}")
+
+        # 限定到子树对应的先序编号区间
+        low, high = 0, len(self.ids) - 1
+        if under:
+            if under not in self._positions:
+                raise KeyError(under)
+            root = self._positions[under]
+            low, high = root + 1, self.ends[root]
+
+        query = (query or "").lower()
+        types = set(node_types) if node_types else None
+        candidates = self._candidates(query, match, types, low, high)
+
+        lower_names = self._lower_names
+        node_type_list = self.types
+        matched = []
+        wanted = None if limit is None else max(0, limit)
+        for position in candidates:
+            if types is not None and node_type_list[position] not in types:
+                continue
+            if query:
+                name = lower_names[position]
+                if match == MATCH_CONTAINS:
+                    if query not in name:
+                        continue
+                elif match == MATCH_PREFIX:
+                    if not name.startswith(query):
+                        continue
+                elif name != query:
+                    continue
+            if wanted is not None and len(matched) >= wanted:
+                return [self._record(p) for p in matched], True
+            matched.append(position)
+        return [self._record(p) for p in matched], False
+
+    def _candidates(self, query: str, match: str, types: Optional[set], low: int, high: int) -> Iterable[int]:
+        """选出 [low, high] 内最短的有序候选编号序列，只保证是结果的超集"""
+        if low > high:
+            return ()
+
+        # 每个来源为 (有序编号列表, 起始下标, 结束下标)，避免复制列表
+        sources = []
+        if types is not None:
+            type_sources = [self._bounded(self._by_type.get(node_type, []), low, high) for node_type in types]
+            if len(type_sources) == 1:
+                sources.append(type_sources[0])
+            else:
+                # 多个类型：按文档顺序惰性合并，长度为各类型之和
+                size = sum(end - start for _, start, end in type_sources)
+                sources.append((heapq.merge(*(self._iter_range(*source) for source in type_sources)), 0, size))
+        if query and len(query) >= 3:
+            # 前缀与完全一致的名称同样包含查询的每个三元组
+            for trigram in _trigrams(query):
+                sources.append(self._bounded(self._by_trigram.get(trigram, []), low, high))
+        elif query and match in (MATCH_PREFIX, MATCH_EXACT):
+            # 名称表按名称排序，需要重新按文档顺序排序，只在它是最短来源时才使用
+            start = bisect_left(self._sorted_names, (query, -1))
+            end = bisect_left(self._sorted_names, (query + "\uffff", -1))
+            if all(end - start < source_end - source_start for _, source_start, source_end in sources) \
+                    and end - start < high - low + 1:
+                positions = sorted(p for _, p in self._sorted_names[start:end] if low <= p <= high)
+                sources.append((positions, 0, len(positions)))
+
+        if not sources:
+            return range(low, high + 1)
+        positions, start, end = min(sources, key=lambda source: source[2] - source[1])
+        if not isinstance(positions, list):
+            return positions
+        return self._iter_range(positions, start, end)
+
+    @staticmethod
+    def _iter_range(positions: List[int], start: int, end: int) -> Iterator[int]:
+        return (positions[i] for i in range(start, end))
+
+    @staticmethod
+    def _bounded(positions: List[int], low: int, high: int) -> Tuple[List[int], int, int]:
+        """有序编号列表中位于 [low, high] 的下标范围"""
+        return positions, bisect_left(positions, low), bisect_right(positions, high)
+
+    def stats(self) -> Dict[str, Any]:
+        """索引概况"""
+        return {
+            "file_key": self.file_key,
+            "version": self.version,
+            "depth": self.depth,
+            "nodes": len(self.ids),
+            "types": len(self._by_type),
+            "trigrams": len(self._by_trigram),
+            "built_at": self.built_at
+        }
+
+
+async def load_node_index(client: FigmaAPIClient, file_key: str, depth: int = None,
+                          streaming: bool = False) -> Optional[FigmaNodeIndex]:
+    """
+    获取文档并构建索引（经过客户端的缓存与请求合并）
+
+    Args:
+        client: 共享的 API 客户端
+        file_key: Figma文件键
+        depth: 获取的树深度，为None表示完整文档
+        streaming: 是否流式解析（不构建完整文档，内存只与节点数量有关）
+
+    Returns:
+        构建好的索引，未找到文档时返回None
+
+    Raises:
+        httpx.HTTPError: 网络错误或非 2xx 响应
+    """
+    query = FigmaQuery(file_key, depth=depth)
+    if streaming:
+        async with client.open_json_file(query) as path:
+            metadata, records, found_root = await asyncio.to_thread(
+                scan_document_file, path, depth, None, ("id", "name", "type")
+            )
+        if not found_root:
+            return None
+        return await asyncio.to_thread(FigmaNodeIndex.from_records, file_key, records, metadata.get("version"), depth)
+
+    file_data = await client.execute(query)
+    if not file_data or not file_data.get("document"):
+        return None
+    return await asyncio.to_thread(FigmaNodeIndex.from_document, file_key, file_data["document"],
+                                   file_data.get("version"), depth)
@@ -5,93 +5,127 @@ Figma 节点列表工具
 深度限制为2，避免输出过多信息
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from .figma_api_client import FigmaAPIClient
+from .figma_query_planner import FigmaQuery
+from .figma_stream_parser import scan_document_file
+from .figma_tree_walker import walk_nodes
 from .file_saver import FigmaFileSaver
 
 class FigmaNodeLister:
-    def __init__(self, access_token: str = None):
-        """初始化列表工具"""
+    def __init__(self, access_token: str = None, client: FigmaAPIClient = None, streaming: bool = False,
+                 file_saver: FigmaFileSaver = None):
+        """
+        初始化列表工具
+        
+        Args:
+            access_token: Figma 访问令牌
+            client: 共享的 API 客户端
+            streaming: 是否使用流式解析（适合超大文件，内存只与输出节点数量有关）
+            file_saver: 共享的文件保存器
+        """
         self.access_token = access_token or os.getenv("FIGMA_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("需要提供 access_token 或设置环境变量 FIGMA_ACCESS_TOKEN")
-        self.file_saver = FigmaFileSaver()
+        self.client = client or FigmaAPIClient(self.access_token)
+        self.streaming = streaming
+        self.file_saver = file_saver or FigmaFileSaver()
     
-    def get_figma_file(self, file_key: str) -> Dict[str, Any]:
-        """获取Figma文件信息"""
-        url = f"https://api.figma.com/v1/files/{file_key}"
-        headers = {"X-Figma-Token": self.access_token}
-        
+    def build_query(self, file_key: str, max_depth: int = None) -> FigmaQuery:
+        """声明数据需求：列表只包含深度小于 max_depth 的节点"""
+        return FigmaQuery(file_key, depth=max_depth - 1 if max_depth is not None else None)
+    
+    async def get_figma_file(self, file_key: str, max_depth: int = None) -> Dict[str, Any]:
+        """获取Figma文件信息（只获取列表需要的层级）"""
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self.client.execute(self.build_query(file_key, max_depth))
+        except httpx.HTTPError as e:
             print(f"请求错误: {e}")
             return None
     
-    def extract_nodes_info(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 2, 
-                          node_types: List[str] = None) -> List[Dict[str, Any]]:
-        """递归提取节点信息"""
-        nodes_info = []
+    async def scan_figma_file(self, file_key: str, max_depth: int = 2,
+                              node_types: List[str] = None) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        流式获取节点列表：响应写入磁盘后逐个 token 解析，超出深度的子树直接跳过
         
-        # 如果达到最大深度，停止递归
-        if depth >= max_depth:
-            return nodes_info
+        Returns:
+            (文件元数据, 节点信息列表)，失败时返回None
+        """
+        try:
+            async with self.client.open_json_file(self.build_query(file_key, max_depth)) as path:
+                metadata, records, found_root = await asyncio.to_thread(
+                    scan_document_file, path, max_depth - 1, node_types, ("id", "name", "type")
+                )
+        except httpx.HTTPError as e:
+            print(f"请求错误: {e}")
+            return None
         
-        # 提取当前节点信息
-        node_type = node.get("type", "")
+        if not found_root:
+            print("未找到文档数据")
+            return None
         
-        # 如果指定了节点类型过滤，检查当前节点类型
-        if node_types and node_type not in node_types:
-            pass  # 跳过不匹配的节点类型
-        else:
-            node_info = {
-                "id": node.get("id"),
-                "name": node.get("name"),
-                "type": node_type,
-                "depth": depth,
-                "parent_id": getattr(self, '_current_parent_id', None)
+        nodes_info = [
+            {
+                "id": record.get("id"),
+                "name": record.get("name"),
+                "type": record.get("type", ""),
+                "depth": record["depth"],
+                "parent_id": record["parent_id"]
             }
-            nodes_info.append(node_info)
-        
-        # 递归处理子节点
-        children = node.get("children", [])
-        for child in children:
-            # 设置当前节点为父节点
-            self._current_parent_id = node.get("id")
-            child_nodes_info = self.extract_nodes_info(child, depth + 1, max_depth, node_types)
-            nodes_info.extend(child_nodes_info)
-        
-        return nodes_info
+            for record in records
+        ]
+        return metadata, nodes_info
     
-    def list_nodes(self, file_key: str, node_types: str = "", max_depth: int = 2) -> Dict[str, Any]:
+    def extract_nodes_info(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 2, 
+                          node_types: List[str] = None) -> List[Dict[str, Any]]:
+        """提取深度小于 max_depth 的节点信息（不匹配 node_types 的节点不列出，但其子节点仍会被遍历）"""
+        return [
+            {
+                "id": current.get("id"),
+                "name": current.get("name"),
+                "type": current.get("type", ""),
+                "depth": current_depth,
+                "parent_id": parent.get("id") if parent is not None else None
+            }
+            for current, current_depth, parent in walk_nodes(node, max_depth - 1, node_types, start_depth=depth)
+        ]
+    
+    async def list_nodes(self, file_key: str, node_types: str = "", max_depth: int = 2) -> Dict[str, Any]:
         """列出所有节点信息"""
         print(f"正在获取文件 {file_key} 的节点信息...")
         
-        # 获取文件信息
-        file_data = self.get_figma_file(file_key)
-        if not file_data:
-            return None
-        
-        # 获取文档根节点
-        document = file_data.get("document", {})
-        if not document:
-            print("未找到文档数据")
-            return None
-        
-        print(f"文件名称: {file_data.get('name', 'Unknown')}")
-        
         # 解析节点类型过滤
         filter_types = []
         if node_types.strip():
             filter_types = [t.strip() for t in node_types.split(",")]
             print(f"过滤节点类型: {filter_types}")
         
-        # 提取节点信息
-        nodes_info = self.extract_nodes_info(document, depth=0, max_depth=max_depth, node_types=filter_types)
+        if self.streaming:
+            # 流式解析：不构建完整文档
+            scanned = await self.scan_figma_file(file_key, max_depth, filter_types)
+            if not scanned:
+                return None
+            file_data, nodes_info = scanned
+        else:
+            # 获取文件信息
+            file_data = await self.get_figma_file(file_key, max_depth)
+            if not file_data:
+                return None
+            
+            # 获取文档根节点
+            document = file_data.get("document", {})
+            if not document:
+                print("未找到文档数据")
+                return None
+            
+            # 提取节点信息
+            nodes_info = self.extract_nodes_info(document, depth=0, max_depth=max_depth, node_types=filter_types)
+        
+        print(f"文件名称: {file_data.get('name', 'Unknown')}")
         
         # 按类型分组
         nodes_by_type = {}
@@ -148,7 +182,7 @@ def main():
     
     try:
         lister = FigmaNodeLister()
-        result = lister.list_nodes(file_key, node_types, max_depth)
+        result = asyncio.run(lister.list_nodes(file_key, node_types, max_depth))
         
         if result:
             # 使用文件保存器保存节点列表
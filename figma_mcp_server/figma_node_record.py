@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Figma 节点记录
+提取器输出的每个节点只保存 Figma 实际返回的属性：属性名由各记录类共享（__slots__），
+实例不再各自持有一个包含几十个键、其中大部分为 None 的字典；
+序列化时也只写出存在的属性
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 投影时始终保留的节点属性
+IDENTITY_FIELDS = ("id", "name", "type")
+
+# 树结构提取保留的节点属性（按输出顺序）
+TREE_NODE_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "depth",
+    "absoluteBoundingBox",
+    "characters",  # 文本内容
+    "fills",  # 填充
+    "strokes",  # 描边
+    "effects",  # 效果
+    "componentId",  # 组件ID
+    "componentProperties",  # 组件属性
+    "interactions",  # 交互
+    "layoutMode",  # 布局模式
+    "cornerRadius",  # 圆角
+    "strokeWeight",  # 描边宽度
+    "opacity",  # 透明度
+    "blendMode",  # 混合模式
+    "children",  # 子节点
+)
+
+# Frame 提取保留的节点属性（按输出顺序）
+FRAME_NODE_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "absoluteBoundingBox",
+    "constraints",
+    "fills",
+    "strokes",
+    "effects",
+    "characters",  # 文本内容
+    "style",  # 文本样式
+    "componentId",  # 组件ID
+    "componentProperties",  # 组件属性
+    "interactions",  # 交互
+    "transitionNodeID",  # 过渡节点
+    "transitionDuration",  # 过渡时长
+    "transitionEasing",  # 过渡缓动
+    "layoutMode",  # 布局模式
+    "primaryAxisSizingMode",  # 主轴尺寸模式
+    "counterAxisSizingMode",  # 交叉轴尺寸模式
+    "primaryAxisAlignItems",  # 主轴对齐
+    "counterAxisAlignItems",  # 交叉轴对齐
+    "paddingLeft",  # 左内边距
+    "paddingRight",  # 右内边距
+    "paddingTop",  # 上内边距
+    "paddingBottom",  # 下内边距
+    "itemSpacing",  # 项目间距
+    "cornerRadius",  # 圆角半径
+    "strokeWeight",  # 描边宽度
+    "strokeAlign",  # 描边对齐
+    "opacity",  # 透明度
+    "blendMode",  # 混合模式
+    "isMask",  # 是否为蒙版
+    "styles",  # 样式
+    "boundVariables",  # 绑定变量
+    "overrides",  # 覆盖
+)
+
+
+class NodeRecord:
+    """
+    稀疏的节点记录，支持字典式读取（record["id"]、record.get("fills", [])）
+
+    未设置的属性不占用额外对象，也不会出现在 to_dict 和 JSON 输出中；
+    子类通过 FIELDS 声明属性及输出顺序，SOURCE_FIELDS 为其中直接从 Figma 节点复制的属性
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    SOURCE_FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, node: Dict[str, Any], fields: Tuple[str, ...] = None):
+        """
+        从 Figma 节点复制属性，只保留存在（不为 None）的值
+
+        Args:
+            node: Figma API 返回的节点（或流式解析得到的节点记录）
+            fields: 要复制的属性（由 project_fields 得到）；为None表示 SOURCE_FIELDS 中的全部属性
+        """
+        for key in fields or self.SOURCE_FIELDS:
+            value = node.get(key)
+            if value is not None:
+                setattr(self, key, value)
+
+    @classmethod
+    def project_fields(cls, fields: Iterable[str] = None) -> Optional[Tuple[str, ...]]:
+        """
+        把调用方请求的属性转换为复制列表（id/name/type 始终保留，按 FIELDS 顺序排列）
+
+        Args:
+            fields: 请求的属性；为None或空表示全部属性
+
+        Returns:
+            要复制的属性，全部属性时返回None
+
+        Raises:
+            ValueError: 包含不支持的属性
+        """
+        requested = set(fields or ())
+        if not requested:
+            return None
+        unknown = requested - set(cls.SOURCE_FIELDS)
+        if unknown:
+            raise ValueError(
+                f"不支持的节点属性: {', '.join(sorted(unknown))}，可选: {', '.join(cls.SOURCE_FIELDS)}"
+            )
+        requested.update(IDENTITY_FIELDS)
+        return tuple(key for key in cls.SOURCE_FIELDS if key in requested)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS and hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def keys(self) -> Iterator[str]:
+        """存在的属性名（按 FIELDS 顺序）"""
+        return (key for key in self.FIELDS if hasattr(self, key))
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self.FIELDS:
+            value = getattr(self, key, None)
+            if value is not None:
+                yield key, value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """只包含存在属性的字典（子节点仍是记录，不递归转换）"""
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, NodeRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class TreeNodeRecord(NodeRecord):
+    """树结构提取的节点记录，空的子节点列表不会输出"""
+
+    __slots__ = TREE_NODE_FIELDS
+    FIELDS = TREE_NODE_FIELDS
+    SOURCE_FIELDS = tuple(key for key in TREE_NODE_FIELDS if key not in ("depth", "children"))
+
+    def __init__(self, node: Dict[str, Any], depth: int, fields: Tuple[str, ...] = None):
+        super().__init__(node, fields)
+        self.depth = depth
+        self.children: List["TreeNodeRecord"] = []
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key, value in super().items():
+            if key != "children" or value:
+                yield key, value
+
+
+class FrameNodeRecord(NodeRecord):
+    """Frame 提取的节点记录"""
+
+    __slots__ = FRAME_NODE_FIELDS
+    FIELDS = FRAME_NODE_FIELDS
+    SOURCE_FIELDS = FRAME_NODE_FIELDS
+
+
+def json_default(value: Any) -> Any:
+    """
+    json.dump 的 default 回调：把节点记录转换为稀疏字典（子节点由编码器继续处理）
+
+    Raises:
+        TypeError: 不是节点记录
+    """
+    if isinstance(value, NodeRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Figma 查询规划器
+各工具只声明自己需要的数据（哪些节点、多深的子树、是否需要渲染图片），
+由规划器决定最省的 API 请求：选择 /v1/files 或 /v1/files/:key/nodes、设置 depth、
+并把过长的节点ID列表拆分成多个请求
+"""
+
+from typing import List, Dict, Any, Optional
+from urllib.parse import quote
+
+# 单个请求中最多包含的节点ID数量
+DEFAULT_MAX_IDS_PER_REQUEST = 50
+# ids 查询参数编码后的最大长度，避免超出 URL 长度限制
+DEFAULT_MAX_IDS_LENGTH = 2000
+
+
+class FigmaQuery:
+    def __init__(self, file_key: str, node_ids: List[str] = None, depth: int = None,
+                 render: bool = False, params: Dict[str, Any] = None):
+        """
+        工具声明的数据需求
+
+        Args:
+            file_key: Figma文件键
+            node_ids: 需要的节点ID，为None表示从文档根节点开始
+            depth: 需要读取的树深度（相对于文档根节点或每个目标节点），为None表示完整子树
+            render: 是否需要渲染图片（/v1/images）
+            params: 额外的 API 参数，例如图片的 format、scale
+        """
+        self.file_key = file_key
+        self.node_ids = node_ids
+        self.depth = depth
+        self.render = render
+        self.params = params or {}
+
+    @staticmethod
+    def parse_ids(node_ids: str) -> List[str]:
+        """解析逗号分隔的节点ID，去除空白和重复项并保持顺序"""
+        seen = {}
+        for node_id in node_ids.split(","):
+            node_id = node_id.strip()
+            if node_id:
+                seen.setdefault(node_id, None)
+        return list(seen)
+
+
+class FigmaRequest:
+    def __init__(self, endpoint: str, path: str, params: Dict[str, Any], node_ids: List[str] = None):
+        """
+        规划出的单个 API 请求
+
+        Args:
+            endpoint: 接口名称（files / nodes / images）
+            path: API 路径
+            params: 查询参数
+            node_ids: 该请求覆盖的节点ID
+        """
+        self.endpoint = endpoint
+        self.path = path
+        self.params = params
+        self.node_ids = node_ids or []
+
+    def __repr__(self) -> str:
+        return f"FigmaRequest({self.endpoint}, {self.path}, {self.params})"
+
+
+class FigmaQueryPlanner:
+    def __init__(self, max_ids_per_request: int = DEFAULT_MAX_IDS_PER_REQUEST,
+                 max_ids_length: int = DEFAULT_MAX_IDS_LENGTH):
+        """
+        初始化规划器
+
+        Args:
+            max_ids_per_request: 单个请求最多包含的节点ID数量
+            max_ids_length: ids 参数编码后的最大长度
+        """
+        self.max_ids_per_request = max(1, max_ids_per_request)
+        self.max_ids_length = max_ids_length
+
+    def split_ids(self, node_ids: List[str]) -> List[List[str]]:
+        """按数量和编码后长度把节点ID拆分成多个批次"""
+        batches = []
+        batch: List[str] = []
+        length = 0
+        for node_id in node_ids:
+            # 每个ID之间的逗号编码后为 %2C
+            id_length = len(quote(node_id, safe="")) + 3
+            if batch and (len(batch) >= self.max_ids_per_request or length + id_length > self.max_ids_length):
+                batches.append(batch)
+                batch = []
+                length = 0
+            batch.append(node_id)
+            length += id_length
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def plan(self, query: FigmaQuery) -> List[FigmaRequest]:
+        """
+        把数据需求转换为 API 请求列表
+
+        Args:
+            query: 工具声明的数据需求
+
+        Returns:
+            需要执行的请求，结果可用 merge 合并
+        """
+        file_key = query.file_key
+
+        if query.render:
+            return [
+                FigmaRequest("images", f"/v1/images/{file_key}", {"ids": ",".join(batch), **query.params}, batch)
+                for batch in self.split_ids(query.node_ids or [])
+            ]
+
+        params = dict(query.params)
+        if query.depth is not None:
+            # Figma 的 depth 参数与需要的树深度一致，且必须为正整数
+            params["depth"] = max(1, query.depth)
+
+        if query.node_ids:
+            return [
+                FigmaRequest("nodes", f"/v1/files/{file_key}/nodes", {"ids": ",".join(batch), **params}, batch)
+                for batch in self.split_ids(query.node_ids)
+            ]
+
+        return [FigmaRequest("files", f"/v1/files/{file_key}", params)]
+
+    @staticmethod
+    def merge(query: FigmaQuery, responses: List[Any],
+              requests: List[FigmaRequest] = None) -> Optional[Dict[str, Any]]:
+        """
+        合并多个批次的响应，保持与单个请求相同的结构
+
+        失败的批次（响应为异常）不影响其他批次：其节点ID在 nodes / images 中记为None
+        （与 Figma 对无法获取的节点的返回一致），并列入 failed_ids
+
+        Args:
+            query: 工具声明的数据需求
+            responses: 各批次的响应或异常，与 requests 一一对应
+            requests: 规划出的请求，用于确定失败批次覆盖的节点ID
+
+        Returns:
+            合并后的响应，全部失败时返回None
+        """
+        succeeded = [response for response in responses if response and not isinstance(response, BaseException)]
+        if not succeeded:
+            return None
+        if len(responses) == 1:
+            return succeeded[0]
+
+        merged = dict(succeeded[0])
+        key = "images" if query.render else "nodes"
+        merged[key] = {}
+        failed_ids = []
+        for index, response in enumerate(responses):
+            if isinstance(response, BaseException):
+                batch_ids = requests[index].node_ids if requests else []
+                failed_ids.extend(batch_ids)
+                for node_id in batch_ids:
+                    merged[key].setdefault(node_id, None)
+                if query.render and not merged.get("err"):
+                    merged["err"] = str(response)
+                continue
+            if not response:
+                continue
+            merged[key].update(response.get(key) or {})
+            if query.render and response.get("err") and not merged.get("err"):
+                merged["err"] = response["err"]
+        if failed_ids:
+            merged["failed_ids"] = failed_ids
+        return merged
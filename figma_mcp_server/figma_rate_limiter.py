@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Figma API 速率限制调度器
+每个访问令牌一个令牌桶，请求在桶中排队而不是直接失败；
+收到 429 时按 Retry-After 暂停该令牌的所有请求并降低速率，之后逐步恢复，
+使持续吞吐量稳定在限额之下
+"""
+
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认速率配置
+DEFAULT_REQUESTS_PER_MINUTE = 120.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_RETRIES = 5
+
+# 没有 Retry-After 时的退避时间（秒）：1, 2, 4 ... 最多 60
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+# 收到 429 后速率乘以该系数，且不低于配置速率的 MIN_RATE_FACTOR 倍
+THROTTLE_FACTOR = 0.8
+MIN_RATE_FACTOR = 0.1
+# 每放行一个请求，速率向配置值恢复的比例
+RECOVERY_STEP = 0.01
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        """
+        令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，为0表示不限速（只处理 Retry-After 暂停）
+            capacity: 桶容量，即允许的突发请求数
+        """
+        self.configured_rate = rate
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        # 等待中的请求按到达顺序依次取令牌
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    async def acquire(self) -> None:
+        """取一个令牌，没有令牌或处于暂停期时排队等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if not self.rate:
+                    return
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.rate = min(self.configured_rate, self.rate + self.configured_rate * RECOVERY_STEP)
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, delay: float) -> None:
+        """暂停 delay 秒，暂停结束后从空桶开始并降低速率，避免再次突发"""
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+        if self.configured_rate:
+            self.rate = max(self.configured_rate * MIN_RATE_FACTOR, self.rate * THROTTLE_FACTOR)
+
+
+class FigmaRateLimiter:
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE, burst: int = DEFAULT_BURST,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        """
+        初始化调度器
+
+        Args:
+            requests_per_minute: 每个访问令牌每分钟的请求数，为0表示不主动限速
+            burst: 允许的突发请求数
+            max_retries: 单个请求遇到 429 后的最大重试次数
+        """
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queued: Dict[str, int] = {}
+        self.requests = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def from_env(cls) -> "FigmaRateLimiter":
+        """
+        根据环境变量创建调度器
+
+        支持的环境变量:
+            FIGMA_RATE_LIMIT_PER_MINUTE, FIGMA_RATE_LIMIT_BURST, FIGMA_RATE_LIMIT_MAX_RETRIES
+        """
+        return cls(
+            requests_per_minute=float(os.getenv("FIGMA_RATE_LIMIT_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)),
+            burst=int(os.getenv("FIGMA_RATE_LIMIT_BURST", DEFAULT_BURST)),
+            max_retries=int(os.getenv("FIGMA_RATE_LIMIT_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        )
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.requests_per_minute / 60.0, self.burst)
+            self._buckets[key] = bucket
+        return bucket
+
+    def queue_depth(self, key: str = None) -> int:
+        """当前排队等待的请求数，key 为None时返回所有令牌的总和"""
+        if key is not None:
+            return self._queued.get(key, 0)
+        return sum(self._queued.values())
+
+    async def acquire(self, key: str) -> float:
+        """
+        为访问令牌 key 排队取得一个请求配额
+
+        Returns:
+            排队等待的时间（秒）
+        """
+        self._queued[key] = self._queued.get(key, 0) + 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        start = time.monotonic()
+        try:
+            await self._bucket(key).acquire()
+        finally:
+            self._queued[key] -= 1
+
+        waited = time.monotonic() - start
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited >= 1.0:
+            logger.info(f"Figma request waited {waited:.1f}s for rate limit ({self.queue_depth(key)} still queued)")
+        return waited
+
+    def throttle(self, key: str, retry_after: Optional[str], attempt: int) -> float:
+        """
+        记录一次 429 响应并暂停该访问令牌的请求
+
+        Args:
+            key: 访问令牌
+            retry_after: 响应中的 Retry-After 头（秒数或 HTTP 日期）
+            attempt: 当前请求已重试的次数，用于没有 Retry-After 时的指数退避
+
+        Returns:
+            暂停的时间（秒）
+        """
+        delay = self.parse_retry_after(retry_after)
+        if delay is None:
+            delay = min(MAX_BACKOFF, DEFAULT_BACKOFF * 2 ** attempt)
+        self.throttled += 1
+        self._bucket(key).pause(delay)
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析 Retry-After 头，无法解析时返回None"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度统计信息"""
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "total_wait": self.total_wait,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait
+        }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+分页结果集
+工具第一次调用时把完整结果（按稳定顺序排列的列表）保存在服务端，
+之后按游标逐页返回，不再重新获取文件或格式化全部结果；
+结果集带数量上限（LRU 淘汰）和过期时间
+"""
+
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 默认配置
+DEFAULT_MAX_RESULT_SETS = 32
+DEFAULT_RESULT_SET_TTL = 600.0
+DEFAULT_PAGE_SIZE = 200
+
+
+class ResultSet:
+    def __init__(self, result_id: str, items: List[Any], metadata: Dict[str, Any] = None):
+        """
+        一个已保存的结果集
+
+        Args:
+            result_id: 结果集ID（游标的一部分）
+            items: 按稳定顺序排列的全部结果
+            metadata: 生成结果时的参数和摘要（文件键、过滤条件、保存路径等）
+        """
+        self.result_id = result_id
+        self.items = items
+        self.metadata = metadata or {}
+        self.last_used = time.time()
+
+    @property
+    def total(self) -> int:
+        return len(self.items)
+
+    def cursor(self, offset: int) -> str:
+        """指向 offset 处的游标"""
+        return f"{self.result_id}:{offset}"
+
+
+class FigmaResultPages:
+    def __init__(self, max_result_sets: int = DEFAULT_MAX_RESULT_SETS, ttl: float = DEFAULT_RESULT_SET_TTL):
+        """
+        初始化结果集存储
+
+        Args:
+            max_result_sets: 最多保留的结果集数量，超出后淘汰最久未使用的
+            ttl: 结果集最后一次被读取后保留的时间（秒）
+        """
+        self.max_result_sets = max(1, max_result_sets)
+        self.ttl = ttl
+        # result_id -> 结果集，按最近使用顺序排列（最久未使用的在最前）
+        self._result_sets: "OrderedDict[str, ResultSet]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "FigmaResultPages":
+        """
+        根据环境变量创建结果集存储
+
+        支持的环境变量:
+            FIGMA_RESULT_SETS_MAX, FIGMA_RESULT_SETS_TTL
+        """
+        return cls(
+            max_result_sets=int(os.getenv("FIGMA_RESULT_SETS_MAX", DEFAULT_MAX_RESULT_SETS)),
+            ttl=float(os.getenv("FIGMA_RESULT_SETS_TTL", DEFAULT_RESULT_SET_TTL))
+        )
+
+    def store(self, items: List[Any], metadata: Dict[str, Any] = None) -> ResultSet:
+        """保存完整结果，返回新的结果集"""
+        self._expire()
+        result_set = ResultSet(uuid.uuid4().hex[:12], items, metadata)
+        self._result_sets[result_set.result_id] = result_set
+        while len(self._result_sets) > self.max_result_sets:
+            self._result_sets.popitem(last=False)
+        return result_set
+
+    def resolve(self, cursor: str) -> Tuple[ResultSet, int]:
+        """
+        解析游标
+
+        Returns:
+            (结果集, 起始位置)
+
+        Raises:
+            ValueError: 游标格式无效
+            KeyError: 结果集不存在或已过期
+        """
+        result_id, separator, offset = (cursor or "").strip().rpartition(":")
+        if not separator or not result_id or not offset.isdigit():
+            raise ValueError(f"无效的游标: {cursor}")
+
+        self._expire()
+        result_set = self._result_sets.get(result_id)
+        if result_set is None:
+            raise KeyError(cursor)
+        result_set.last_used = time.time()
+        self._result_sets.move_to_end(result_id)
+        return result_set, int(offset)
+
+    def page(self, result_set: ResultSet, offset: int = 0,
+             limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Any], Optional[str]]:
+        """
+        取出一页结果
+
+        Args:
+            result_set: 结果集
+            offset: 起始位置
+            limit: 每页数量，不大于0时取剩余的全部结果
+
+        Returns:
+            (本页结果, 下一页的游标，没有更多结果时为None)
+        """
+        end = result_set.total if limit is None or limit <= 0 else min(offset + limit, result_set.total)
+        next_cursor = result_set.cursor(end) if end < result_set.total else None
+        return result_set.items[offset:end], next_cursor
+
+    def _expire(self) -> None:
+        """丢弃过期的结果集"""
+        deadline = time.time() - self.ttl
+        while self._result_sets:
+            result_id, result_set = next(iter(self._result_sets.items()))
+            if result_set.last_used >= deadline:
+                break
+            del self._result_sets[result_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """当前保留的结果集概况"""
+        return {
+            "result_sets": len(self._result_sets),
+            "items": sum(result_set.total for result_set in self._result_sets.values()),
+            "max_result_sets": self.max_result_sets,
+            "ttl": self.ttl
+        }
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Figma 输出文件序列化
+保存结果时可选的序列化后端（标准库 json、orjson、msgpack）与压缩方式（gzip、zstd）；
+orjson、msgpack、zstandard 为可选依赖，未安装时不能选用
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+from typing import Any, BinaryIO, Iterator
+
+from .figma_node_record import json_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 已提示过未安装的可选依赖（每个保存器都会调用 from_env，只提示一次）
+_warned_unavailable = set()
+
+# 序列化后端
+FORMAT_JSON = "json"
+FORMAT_ORJSON = "orjson"
+FORMAT_MSGPACK = "msgpack"
+FORMATS = (FORMAT_JSON, FORMAT_ORJSON, FORMAT_MSGPACK)
+
+# 压缩方式
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSIONS = (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD)
+
+# 各压缩方式的默认级别（偏向写入速度）
+DEFAULT_COMPRESSION_LEVELS = {COMPRESSION_GZIP: 6, COMPRESSION_ZSTD: 3}
+
+_FORMAT_EXTENSIONS = {FORMAT_JSON: ".json", FORMAT_ORJSON: ".json", FORMAT_MSGPACK: ".msgpack"}
+_COMPRESSION_EXTENSIONS = {COMPRESSION_NONE: "", COMPRESSION_GZIP: ".gz", COMPRESSION_ZSTD: ".zst"}
+# 各后端和压缩方式依赖的可选模块
+_REQUIRED_MODULES = {
+    FORMAT_ORJSON: ("orjson", lambda: orjson),
+    FORMAT_MSGPACK: ("msgpack", lambda: msgpack),
+    COMPRESSION_ZSTD: ("zstandard", lambda: zstandard),
+}
+
+
+def is_available(name: str) -> bool:
+    """序列化后端或压缩方式是否可用（所需的可选依赖已安装）"""
+    if name not in FORMATS and name not in COMPRESSIONS:
+        return False
+    required = _REQUIRED_MODULES.get(name)
+    return required is None or required[1]() is not None
+
+
+class FigmaSerializer:
+    def __init__(self, format: str = FORMAT_JSON, compression: str = COMPRESSION_NONE,
+                 pretty: bool = True, compression_level: int = None):
+        """
+        初始化序列化器
+
+        Args:
+            format: 序列化后端：json（标准库）、orjson、msgpack（二进制）
+            compression: 压缩方式：none、gzip、zstd
+            pretty: JSON 是否缩进（indent=2），msgpack 忽略该选项
+            compression_level: 压缩级别，为None时使用默认级别
+
+        Raises:
+            ValueError: 后端或压缩方式无效，或者所需的可选依赖未安装
+        """
+        if format not in FORMATS:
+            raise ValueError(f"无效的序列化格式: {format}，可选: {', '.join(FORMATS)}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"无效的压缩方式: {compression}，可选: {', '.join(COMPRESSIONS)}")
+        for name in (format, compression):
+            if not is_available(name):
+                raise ValueError(f"{name} 需要安装 {_REQUIRED_MODULES[name][0]}: pip install {_REQUIRED_MODULES[name][0]}")
+
+        self.format = format
+        self.compression = compression
+        self.pretty = pretty
+        self.compression_level = compression_level or DEFAULT_COMPRESSION_LEVELS.get(compression)
+
+    @classmethod
+    def from_env(cls) -> "FigmaSerializer":
+        """
+        根据环境变量创建序列化器，所需的可选依赖未安装时回退到标准库 json / 不压缩
+
+        支持的环境变量:
+            FIGMA_OUTPUT_FORMAT, FIGMA_OUTPUT_COMPRESSION, FIGMA_OUTPUT_PRETTY
+        """
+        format = os.getenv("FIGMA_OUTPUT_FORMAT", FORMAT_JSON).strip().lower() or FORMAT_JSON
+        compression = os.getenv("FIGMA_OUTPUT_COMPRESSION", COMPRESSION_NONE).strip().lower() or COMPRESSION_NONE
+        pretty = os.getenv("FIGMA_OUTPUT_PRETTY", "1").strip().lower() not in ("0", "false", "no")
+
+        if format in FORMATS and not is_available(format):
+            if format not in _warned_unavailable:
+                _warned_unavailable.add(format)
+                logger.warning(f"{format} is not installed, saving files with the standard json encoder")
+            format = FORMAT_JSON
+        if compression in COMPRESSIONS and not is_available(compression):
+            if compression not in _warned_unavailable:
+                _warned_unavailable.add(compression)
+                logger.warning(f"{compression} is not installed, saving files uncompressed")
+            compression = COMPRESSION_NONE
+        return cls(format, compression, pretty)
+
+    @property
+    def extension(self) -> str:
+        """保存文件的扩展名，例如 .json、.json.gz、.msgpack.zst"""
+        return _FORMAT_EXTENSIONS[self.format] + _COMPRESSION_EXTENSIONS[self.compression]
+
+    def filename(self, filename: str) -> str:
+        """把调用方给出的 .json 文件名换成当前格式的扩展名"""
+        base, ext = os.path.splitext(filename)
+        return (base if ext == ".json" else filename) + self.extension
+
+    def dumps(self, data: Any) -> bytes:
+        """序列化为字节（不压缩）"""
+        buffer = io.BytesIO()
+        self._dump(data, buffer)
+        return buffer.getvalue()
+
+    def write(self, data: Any, file_path: str) -> str:
+        """
+        序列化并写入文件（按压缩方式压缩）
+
+        Args:
+            data: 要保存的数据，可以包含节点记录
+            file_path: 文件完整路径（扩展名由调用方通过 filename 决定）
+
+        Returns:
+            写入的文件路径
+        """
+        with open(file_path, 'wb') as f, self._compressed(f) as output:
+            self._dump(data, output)
+        return file_path
+
+    def _dump(self, data: Any, output: BinaryIO) -> None:
+        if self.format == FORMAT_MSGPACK:
+            output.write(msgpack.packb(data, default=json_default, use_bin_type=True))
+            return
+
+        if self.format == FORMAT_ORJSON:
+            try:
+                output.write(orjson.dumps(data, default=json_default,
+                                          option=orjson.OPT_INDENT_2 if self.pretty else 0))
+                return
+            except orjson.JSONEncodeError as e:
+                # orjson 最多支持 254 层嵌套，更深的树用标准库编码
+                logger.warning(f"orjson could not encode data ({e}), falling back to the standard json encoder")
+
+        # 一次性编码比 json.dump 逐块写入快得多（紧凑格式还会走 C 编码器）
+        if self.pretty:
+            text = json.dumps(data, indent=2, ensure_ascii=False, default=json_default)
+        else:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        output.write(text.encode("utf-8"))
+
+    @contextlib.contextmanager
+    def _compressed(self, f: BinaryIO) -> Iterator[BinaryIO]:
+        if self.compression == COMPRESSION_GZIP:
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=self.compression_level) as output:
+                yield output
+        elif self.compression == COMPRESSION_ZSTD:
+            compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            with compressor.stream_writer(f, closefd=False) as output:
+                yield output
+        else:
+            yield f
+
+
+def load_file(file_path: str) -> Any:
+    """
+    读取 FigmaSerializer 保存的文件，按扩展名判断格式和压缩方式
+
+    Raises:
+        ValueError: 所需的可选依赖未安装
+    """
+    base, ext = os.path.splitext(file_path)
+    if ext == ".gz":
+        with gzip.open(file_path, 'rb') as f:
+            raw = f.read()
+    elif ext == ".zst":
+        if zstandard is None:
+            raise ValueError(f"读取 {file_path} 需要安装 zstandard: pip install zstandard")
+        with open(file_path, 'rb') as f:
+            raw = zstandard.ZstdDecompressor().stream_reader(f).read()
+    else:
+        base = file_path
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+    if base.endswith(".msgpack"):
+        if msgpack is None:
+            raise ValueError(f"读取 {file_path} 需要安装 msgpack: pip install msgpack")
+        return msgpack.unpackb(raw, raw=False)
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson 限制嵌套深度，超深的树用标准库解析
+            pass
+    return json.loads(raw)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Figma 文档流式解析器
+逐个 token 增量解析 /v1/files 响应，边解析边产出节点记录，
+超出深度的子树和不需要的属性直接跳过而不构建 Python 对象，
+内存占用取决于输出大小而不是文档大小
+"""
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+from typing import BinaryIO, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+# 默认每次读取的字节数
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+_SKIP_PLAIN = re.compile(r'[^"{}\[\]]*')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_LITERALS = {"t": ("true", True), "f": ("false", False), "n": ("null", None)}
+_STRUCTURAL = "{}[]:,"
+
+# 无论是否在 fields 中，都需要读取的节点属性
+_REQUIRED_FIELDS = ("id", "name", "type")
+
+
+class JSONStreamReader:
+    def __init__(self, fp: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        增量 JSON 词法分析器
+
+        Args:
+            fp: 以二进制模式打开的文件对象
+            chunk_size: 每次读取的字节数
+        """
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """丢弃已消费的内容并读入下一块，已到文件末尾时返回False"""
+        if self._eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b"", final=True)
+        else:
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return bool(chunk)
+
+    def _peek(self) -> str:
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def next_token(self) -> Tuple[str, Any]:
+        """
+        读取下一个 token
+
+        Returns:
+            (类型, 值)：类型为结构字符之一 {}[]:, 或 "s"（字符串）、"v"（数字/布尔/null）
+        """
+        char = self._peek()
+        if not char:
+            raise ValueError("JSON 意外结束")
+        if char in _STRUCTURAL:
+            self._pos += 1
+            return char, None
+        if char == '"':
+            return "s", self._read_string()
+        return "v", self._read_scalar(char)
+
+    def _read_string(self) -> str:
+        while True:
+            try:
+                value, self._pos = scanstring(self._buffer, self._pos + 1, True)
+                return value
+            except json.JSONDecodeError:
+                # 字符串跨越了块边界，读入更多数据后重新扫描
+                if not self._fill():
+                    raise
+
+    def _read_scalar(self, char: str) -> Any:
+        if char in _LITERALS:
+            literal, value = _LITERALS[char]
+            while len(self._buffer) - self._pos < len(literal) and self._fill():
+                pass
+            if not self._buffer.startswith(literal, self._pos):
+                raise ValueError(f"无效的 JSON 字面量，位置 {self._pos}")
+            self._pos += len(literal)
+            return value
+
+        # 数字可能被块边界截断，先确保整个数字都在缓冲区中
+        while _NUMBER_CHARS.match(self._buffer, self._pos).end() == len(self._buffer) and self._fill():
+            pass
+        match = _NUMBER.match(self._buffer, self._pos)
+        if not match:
+            raise ValueError(f"无效的 JSON 值，位置 {self._pos}")
+        self._pos = match.end()
+        text = match.group()
+        if "." in text or "e" in text or "E" in text:
+            return float(text)
+        return int(text)
+
+    def expect(self, expected: str) -> None:
+        """读取下一个 token 并确认是指定的结构字符"""
+        token, _ = self.next_token()
+        if token != expected:
+            raise ValueError(f"JSON 格式错误: 期望 {expected!r}，实际为 {token!r}")
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """在已读取 '{' 之后，依次产出对象的键；调用方必须消费每个键对应的值"""
+        token, value = self.next_token()
+        if token == "}":
+            return
+        while True:
+            if token != "s":
+                raise ValueError(f"JSON 格式错误: 期望对象键，实际为 {token!r}")
+            self.expect(":")
+            yield value
+            token, _ = self.next_token()
+            if token == "}":
+                return
+            if token != ",":
+                raise ValueError(f"JSON 格式错误: 期望 ',' 或 '}}'，实际为 {token!r}")
+            token, value = self.next_token()
+
+    def iter_array_items(self) -> Iterator[Tuple[str, Any]]:
+        """在已读取 '[' 之后，依次产出每个元素的首个 token；调用方必须消费完整元素"""
+        token, value = self.next_token()
+        if token == "]":
+            return
+        while True:
+            yield token, value
+            token, _ = self.next_token()
+            if token == "]":
+                return
+            if token != ",":
+                raise ValueError(f"JSON 格式错误: 期望 ',' 或 ']'，实际为 {token!r}")
+            token, value = self.next_token()
+
+    def read_value(self, token: str = None, value: Any = None) -> Any:
+        """读取并构建一个完整的 JSON 值"""
+        if token is None:
+            token, value = self.next_token()
+        if token == "{":
+            return {key: self.read_value() for key in self.iter_object_keys()}
+        if token == "[":
+            return [self.read_value(item_token, item_value) for item_token, item_value in self.iter_array_items()]
+        if token in ("s", "v"):
+            return value
+        raise ValueError(f"JSON 格式错误: 意外的 {token!r}")
+
+    def skip_value(self, token: str = None) -> None:
+        """跳过一个完整的 JSON 值而不构建对象（容器按字符块扫描，不逐个解析 token）"""
+        if token is None:
+            token, _ = self.next_token()
+        if token not in "{[":
+            return
+        depth = 1
+        while depth:
+            self._pos = _SKIP_PLAIN.match(self._buffer, self._pos).end()
+            if self._pos >= len(self._buffer):
+                if not self._fill():
+                    raise ValueError("JSON 意外结束")
+                continue
+            char = self._buffer[self._pos]
+            if char == '"':
+                match = _STRING_BODY.match(self._buffer, self._pos + 1)
+                if match is None:
+                    # 字符串跨越了块边界
+                    if not self._fill():
+                        raise ValueError("JSON 意外结束")
+                    continue
+                self._pos = match.end()
+            else:
+                self._pos += 1
+                depth += 1 if char in "{[" else -1
+
+
+class FigmaDocumentScanner:
+    def __init__(self, max_depth: int = None, node_types: Iterable[str] = None,
+                 fields: Iterable[str] = None, root_key: str = "document",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Figma 文档节点扫描器
+
+        Args:
+            max_depth: 产出节点的最大深度（包含），更深的子树被跳过；为None表示不限
+            node_types: 只产出这些类型的节点（其子节点仍会被遍历）；为None表示全部类型
+            fields: 节点记录中保留的属性，id/name/type 始终保留；为None表示保留除 children 外的全部属性
+            root_key: 顶层对象中根节点所在的键
+            chunk_size: 每次读取的字节数
+        """
+        self.max_depth = max_depth
+        self.node_types = set(node_types) if node_types else None
+        self.fields = set(fields) | set(_REQUIRED_FIELDS) if fields is not None else None
+        self.root_key = root_key
+        self.chunk_size = chunk_size
+        self.metadata: Dict[str, Any] = {}
+        self.found_root = False
+        self._counter = 0
+
+    def iter_nodes(self, fp: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        边解析边产出节点记录（子树解析完成时产出，即后序；
+        父节点的 id 位于 children 之后时，其子节点的记录推迟到父节点结束时产出）
+
+        每条记录包含保留的属性以及 depth 和 parent_id。
+        顶层的标量字段（name、lastModified、version 等）在解析结束后存放于 self.metadata
+        """
+        for _, record in self._iter_ordered(fp):
+            yield record
+
+    def scan(self, fp: BinaryIO) -> List[Dict[str, Any]]:
+        """解析整个文档，按先序（与递归遍历相同的顺序）返回节点记录"""
+        ordered = list(self._iter_ordered(fp))
+        ordered.sort(key=lambda item: item[0])
+        return [record for _, record in ordered]
+
+    def _iter_ordered(self, fp: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        reader = JSONStreamReader(fp, self.chunk_size)
+        self.metadata = {}
+        self.found_root = False
+        self._counter = 0
+
+        reader.expect("{")
+        for key in reader.iter_object_keys():
+            token, value = reader.next_token()
+            if key == self.root_key and token == "{":
+                self.found_root = True
+                yield from self._walk_node(reader)
+            elif token in ("s", "v"):
+                self.metadata[key] = value
+            else:
+                reader.skip_value(token)
+
+    def _walk_node(self, reader: JSONStreamReader) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        在已读取根节点的 '{' 之后解析整棵树（显式栈，嵌套深度不受递归上限限制）
+
+        父节点的 id 可能出现在 children 之后，子节点的 parent_id 在父节点的 id 读到后才确定：
+        此前完成的子节点记录暂存在父节点上，父节点结束时再产出
+        """
+        fields = self.fields
+        stack = [self._open_node(reader, 0)]
+        while stack:
+            frame = stack[-1]
+            if frame.items is not None:
+                # 继续遍历 children 数组，遇到子节点时先把它压栈
+                for item_token, _ in frame.items:
+                    if item_token == "{":
+                        stack.append(self._open_node(reader, frame.depth + 1))
+                        break
+                    reader.skip_value(item_token)
+                else:
+                    frame.items = None
+                continue
+
+            props = frame.props
+            for key in frame.keys:
+                if key == "children":
+                    token, _ = reader.next_token()
+                    if token == "[" and (self.max_depth is None or frame.depth < self.max_depth):
+                        frame.items = reader.iter_array_items()
+                        break
+                    reader.skip_value(token)
+                elif fields is None or key in fields:
+                    props[key] = reader.read_value()
+                else:
+                    reader.skip_value()
+            else:
+                stack.pop()
+                yield from self._close_node(frame, stack[-1] if stack else None)
+
+    def _open_node(self, reader: JSONStreamReader, depth: int) -> "_NodeFrame":
+        frame = _NodeFrame(self._counter, depth, reader.iter_object_keys())
+        self._counter += 1
+        return frame
+
+    def _close_node(self, frame: "_NodeFrame",
+                    parent: Optional["_NodeFrame"]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """节点对象结束：产出等待本节点 id 的子节点记录，再产出（或暂存）本节点的记录"""
+        node_id = frame.props.get("id")
+        for order, record in frame.waiting:
+            record["parent_id"] = node_id
+            yield order, record
+
+        if self.node_types is None or frame.props.get("type") in self.node_types:
+            record = dict(frame.props)
+            record["depth"] = frame.depth
+            if parent is None:
+                record["parent_id"] = None
+            elif "id" not in parent.props:
+                parent.waiting.append((frame.order, record))
+                return
+            else:
+                record["parent_id"] = parent.props["id"]
+            yield frame.order, record
+
+
+class _NodeFrame:
+    """解析栈中的一个节点"""
+    __slots__ = ("order", "depth", "keys", "items", "props", "waiting")
+
+    def __init__(self, order: int, depth: int, keys: Iterator[str]):
+        self.order = order
+        self.depth = depth
+        self.keys = keys
+        # 正在遍历的 children 数组，不在数组中时为None
+        self.items: Optional[Iterator[Tuple[str, Any]]] = None
+        self.props: Dict[str, Any] = {}
+        # 在本节点 id 读到之前完成的子节点记录
+        self.waiting: List[Tuple[int, Dict[str, Any]]] = []
+
+
+def scan_document_file(path: str, max_depth: int = None, node_types: Iterable[str] = None,
+                       fields: Iterable[str] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]], bool]:
+    """
+    流式扫描磁盘上的 Figma 文件 JSON
+
+    Returns:
+        (顶层元数据, 先序排列的节点记录, 是否找到 document 根节点)
+    """
+    scanner = FigmaDocumentScanner(max_depth=max_depth, node_types=node_types, fields=fields)
+    with open(path, 'rb') as f:
+        nodes = scanner.scan(f)
+    return scanner.metadata, nodes, scanner.found_root
+
+
+def read_file_metadata(path: str) -> Dict[str, Any]:
+    """
+    只读取磁盘上 Figma 响应 JSON 的顶层标量字段（name、lastModified、version 等），
+    document、nodes 等容器按字符块跳过而不解析节点
+
+    Returns:
+        顶层元数据
+    """
+    metadata: Dict[str, Any] = {}
+    with open(path, 'rb') as f:
+        reader = JSONStreamReader(f)
+        reader.expect("{")
+        for key in reader.iter_object_keys():
+            token, value = reader.next_token()
+            if token in ("s", "v"):
+                metadata[key] = value
+            else:
+                reader.skip_value(token)
+    return metadata
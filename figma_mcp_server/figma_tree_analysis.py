@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Figma 节点树统计
+一次遍历同时得到节点总数、各类型数量、各类型节点列表和深度分布，
+供树结构提取等工具复用，避免对同一棵树反复遍历
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from .figma_tree_walker import walk_nodes
+
+
+class TreeAnalysis:
+    def __init__(self):
+        """空的统计结果，通过 add 逐个加入节点或通过 from_tree 一次性构建"""
+        self.total_nodes = 0
+        self.node_counts: Dict[str, int] = {}
+        self.depth_histogram: Dict[int, int] = {}
+        # 节点类型 -> (节点列表, 深度列表)，按先序排列；只保存引用，不为每个节点创建新对象
+        self._nodes_by_type: Dict[str, Tuple[List[Dict[str, Any]], List[int]]] = {}
+
+    @classmethod
+    def from_tree(cls, root: Dict[str, Any], max_depth: int = None, start_depth: int = 0) -> "TreeAnalysis":
+        """遍历一次节点树并返回统计结果"""
+        analysis = cls()
+        for node, depth, _ in walk_nodes(root, max_depth=max_depth, start_depth=start_depth):
+            analysis.add(node, depth)
+        return analysis
+
+    def add(self, node: Dict[str, Any], depth: int) -> None:
+        """加入一个节点"""
+        node_type = node.get("type", "UNKNOWN")
+        self.total_nodes += 1
+        counts = self.node_counts
+        counts[node_type] = counts.get(node_type, 0) + 1
+        histogram = self.depth_histogram
+        histogram[depth] = histogram.get(depth, 0) + 1
+
+        entries = self._nodes_by_type.get(node_type)
+        if entries is None:
+            entries = self._nodes_by_type[node_type] = ([], [])
+        entries[0].append(node)
+        entries[1].append(depth)
+
+    def merge(self, other: "TreeAnalysis") -> "TreeAnalysis":
+        """把另一棵树的统计合并进来（节点列表追加在后），返回自身"""
+        self.total_nodes += other.total_nodes
+        for node_type, count in other.node_counts.items():
+            self.node_counts[node_type] = self.node_counts.get(node_type, 0) + count
+        for depth, count in other.depth_histogram.items():
+            self.depth_histogram[depth] = self.depth_histogram.get(depth, 0) + count
+        for node_type, (nodes, depths) in other._nodes_by_type.items():
+            entries = self._nodes_by_type.setdefault(node_type, ([], []))
+            entries[0].extend(nodes)
+            entries[1].extend(depths)
+        return self
+
+    def find(self, node_type: str, limit: int = None) -> List[Dict[str, Any]]:
+        """返回某类型的节点（id、name、depth），limit 限制返回的数量（数量本身见 node_counts）"""
+        nodes, depths = self._nodes_by_type.get(node_type, ([], []))
+        if limit is not None:
+            nodes, depths = nodes[:limit], depths[:limit]
+        return [
+            {"id": node.get("id"), "name": node.get("name"), "depth": depth}
+            for node, depth in zip(nodes, depths)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可序列化的统计摘要"""
+        return {
+            "total_nodes": self.total_nodes,
+            "node_counts": dict(self.node_counts),
+            "depth_histogram": {str(depth): count for depth, count in sorted(self.depth_histogram.items())}
+        }
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Figma 树结构差异
+保存每个文件、每个版本提取过的树结构快照，按节点ID比较两个快照：
+新增、删除和属性变化的节点，以及子树发生变化、需要重新渲染的目标节点；
+快照可保存在磁盘上，进程重启（例如每次运行的批量导出命令）后仍能作为比较基准
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .figma_query_planner import FigmaQuery
+from .figma_tree_walker import walk_nodes
+
+logger = logging.getLogger(__name__)
+
+# 默认配置
+DEFAULT_MAX_FILES = 8
+DEFAULT_MAX_VERSIONS = 4
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "figma-mcp-tools", "snapshots")
+
+# 不参与属性比较的记录字段（深度由父节点决定，子节点单独比较）
+_STRUCTURE_FIELDS = ("depth", "children")
+
+
+def _properties(node: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in node.items() if key not in _STRUCTURE_FIELDS}
+
+
+class TreeSnapshot:
+    def __init__(self, file_key: str, version: str, node_ids: List[str], depth: int,
+                 metadata: Dict[str, Any] = None):
+        """
+        一次树结构提取的快照
+
+        Args:
+            file_key: Figma文件键
+            version: 提取时的文档版本
+            node_ids: 目标节点ID（按请求顺序）
+            depth: 提取的树深度
+            metadata: 生成快照时的附加信息（例如导出图片的格式和缩放比例）
+        """
+        self.file_key = file_key
+        self.version = version
+        self.node_ids = node_ids
+        self.depth = depth
+        self.metadata = metadata or {}
+        # 节点ID -> (父节点ID, 节点记录, 子节点ID)，同一节点出现在多个目标下时只保留第一次
+        self.nodes: Dict[str, Tuple[Optional[str], Dict[str, Any], Tuple[str, ...]]] = {}
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], depth: int, metadata: Dict[str, Any] = None) -> "TreeSnapshot":
+        """从 FigmaTreeExtractor.extract_tree 的结果构建快照（引用结果中的节点记录，不复制）"""
+        snapshot = cls(result["file_key"], result.get("version", ""),
+                       FigmaQuery.parse_ids(result["target_nodes"]), depth, metadata)
+        nodes = snapshot.nodes
+        for node_id in snapshot.node_ids:
+            entry = result["nodes"].get(node_id)
+            if not entry:
+                continue
+            for node, _, parent in walk_nodes(entry["tree_structure"]):
+                parent_id = parent["id"] if parent is not None else None
+                recorded = nodes.get(node["id"])
+                if recorded is None:
+                    child_ids = tuple(child["id"] for child in node.get("children") or ())
+                    nodes[node["id"]] = (parent_id, node, child_ids)
+                elif recorded[0] is None and parent_id is not None:
+                    # 先请求的目标节点位于后面目标的子树中：补上父节点，变化才能传到外层目标
+                    nodes[node["id"]] = (parent_id,) + recorded[1:]
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可保存为 JSON 的形式（节点记录去掉嵌套的 children，子节点只记录ID）"""
+        return {
+            "file_key": self.file_key,
+            "version": self.version,
+            "node_ids": self.node_ids,
+            "depth": self.depth,
+            "metadata": self.metadata,
+            "nodes": [[node_id, parent_id, {key: value for key, value in node.items() if key != "children"},
+                       list(child_ids)]
+                      for node_id, (parent_id, node, child_ids) in self.nodes.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TreeSnapshot":
+        """从 to_dict 的结果恢复快照"""
+        snapshot = cls(data["file_key"], data["version"], list(data["node_ids"]), data["depth"], data.get("metadata"))
+        for node_id, parent_id, node, child_ids in data["nodes"]:
+            snapshot.nodes[node_id] = (parent_id, node, tuple(child_ids))
+        return snapshot
+
+    @property
+    def key(self) -> Tuple[Tuple[str, ...], int]:
+        """同一组目标节点、同一深度的快照才能比较"""
+        return tuple(self.node_ids), self.depth
+
+    def ancestors(self, node_id: str) -> Iterable[str]:
+        """节点自身及其祖先（到目标节点为止）"""
+        seen = set()
+        while node_id is not None and node_id not in seen:
+            seen.add(node_id)
+            yield node_id
+            entry = self.nodes.get(node_id)
+            node_id = entry[0] if entry else None
+
+
+class TreeDiff:
+    def __init__(self, old: TreeSnapshot, new: TreeSnapshot):
+        """
+        两个快照之间的结构差异（由 diff_snapshots 计算）
+
+        Args:
+            old: 较早的快照
+            new: 较新的快照
+        """
+        self.file_key = new.file_key
+        self.from_version = old.version
+        self.to_version = new.version
+        self.added: List[Dict[str, Any]] = []
+        self.removed: List[Dict[str, Any]] = []
+        # 节点ID -> {"name", "type", "changes": {属性: {"old", "new"}}}
+        self.changed: Dict[str, Dict[str, Any]] = {}
+        # 子树有变化的目标节点（按请求顺序），需要重新渲染
+        self.changed_targets: List[str] = []
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file_key": self.file_key,
+            "from_version": self.from_version,
+            "to_version": self.to_version,
+            "summary": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "changed": len(self.changed)
+            },
+            "changed_targets": self.changed_targets,
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed
+        }
+
+
+def _summary(node_id: str, snapshot: TreeSnapshot) -> Dict[str, Any]:
+    parent_id, node, _ = snapshot.nodes[node_id]
+    return {"id": node_id, "name": node.get("name", ""), "type": node.get("type", ""), "parent_id": parent_id}
+
+
+def diff_snapshots(old: TreeSnapshot, new: TreeSnapshot) -> TreeDiff:
+    """
+    按节点ID比较两个快照
+
+    只能看到提取深度以内的变化；父节点或子节点顺序的变化记为 parent / children 属性变化
+
+    Args:
+        old: 较早的快照
+        new: 较新的快照
+
+    Returns:
+        结构差异，节点按新快照（删除的节点按旧快照）的先序排列
+    """
+    diff = TreeDiff(old, new)
+    # 变化节点及其祖先，用于找出需要重新渲染的目标节点
+    touched = set()
+
+    for node_id, (parent_id, node, child_ids) in new.nodes.items():
+        previous = old.nodes.get(node_id)
+        if previous is None:
+            diff.added.append(_summary(node_id, new))
+            touched.update(new.ancestors(node_id))
+            continue
+
+        old_parent_id, old_node, old_child_ids = previous
+        old_properties = _properties(old_node)
+        new_properties = _properties(node)
+        changes = {
+            key: {"old": old_properties.get(key), "new": new_properties.get(key)}
+            for key in old_properties.keys() | new_properties.keys()
+            if old_properties.get(key) != new_properties.get(key)
+        }
+        if old_parent_id != parent_id:
+            changes["parent"] = {"old": old_parent_id, "new": parent_id}
+        if old_child_ids != child_ids:
+            changes["children"] = {"old": list(old_child_ids), "new": list(child_ids)}
+        if changes:
+            diff.changed[node_id] = {"name": node.get("name", ""), "type": node.get("type", ""), "changes": changes}
+            touched.update(new.ancestors(node_id))
+            touched.update(old.ancestors(node_id))
+
+    for node_id in old.nodes:
+        if node_id not in new.nodes:
+            diff.removed.append(_summary(node_id, old))
+            touched.update(old.ancestors(node_id))
+
+    diff.changed_targets = [node_id for node_id in new.node_ids if node_id in touched]
+    return diff
+
+
+class FigmaTreeHistory:
+    def __init__(self, max_files: int = DEFAULT_MAX_FILES, max_versions: int = DEFAULT_MAX_VERSIONS,
+                 history_dir: str = None):
+        """
+        树结构快照历史：内存中保留最近使用的文件，可选同时保存在磁盘上
+
+        Args:
+            max_files: 在内存中保留快照的文件数量，超出后丢弃最久未使用的文件
+            max_versions: 每个文件、每组目标节点保留的版本数量
+            history_dir: 快照保存目录（每个文件、每组目标节点和深度一个文件），为None时只保存在内存中
+        """
+        self.max_files = max(1, max_files)
+        self.max_versions = max(1, max_versions)
+        self.history_dir = history_dir
+        # 文件键 -> {快照键 -> 按记录顺序排列的快照（最新的在最后）}
+        self._files: "OrderedDict[str, Dict[Tuple, List[TreeSnapshot]]]" = OrderedDict()
+        # load 和 save 在线程中执行，与事件循环上的 latest / record 共用这把锁
+        self._lock = threading.RLock()
+        # 已经从磁盘读取过的 (文件键, 快照键)
+        self._loaded = set()
+
+    @classmethod
+    def from_env(cls) -> "FigmaTreeHistory":
+        """
+        根据环境变量创建快照历史；FIGMA_TREE_HISTORY_DIR 设为空字符串时只保存在内存中
+
+        支持的环境变量:
+            FIGMA_TREE_HISTORY_MAX_FILES, FIGMA_TREE_HISTORY_VERSIONS, FIGMA_TREE_HISTORY_DIR
+        """
+        return cls(
+            max_files=int(os.getenv("FIGMA_TREE_HISTORY_MAX_FILES", DEFAULT_MAX_FILES)),
+            max_versions=int(os.getenv("FIGMA_TREE_HISTORY_VERSIONS", DEFAULT_MAX_VERSIONS)),
+            history_dir=os.getenv("FIGMA_TREE_HISTORY_DIR", DEFAULT_HISTORY_DIR) or None
+        )
+
+    def _path(self, file_key: str, key: Tuple[Tuple[str, ...], int]) -> str:
+        raw = json.dumps([file_key, list(key[0]), key[1]], ensure_ascii=False)
+        return os.path.join(self.history_dir, f"{hashlib.sha256(raw.encode('utf-8')).hexdigest()}.json")
+
+    def load(self, file_key: str, node_ids: Iterable[str], depth: int) -> None:
+        """
+        把磁盘上这组目标节点的快照读入内存（阻塞的文件操作，可放在线程中执行；每组只读取一次）
+        """
+        key = (tuple(node_ids), depth)
+        with self._lock:
+            if self.history_dir is None or (file_key, key) in self._loaded:
+                return
+            self._loaded.add((file_key, key))
+        try:
+            with open(self._path(file_key, key), 'r', encoding='utf-8') as f:
+                stored = [TreeSnapshot.from_dict(data) for data in json.load(f)]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Failed to load tree snapshots of {file_key}: {e}")
+            return
+
+        with self._lock:
+            snapshots = self._files.setdefault(file_key, {}).setdefault(key, [])
+            # 内存中已有的（读取之前记录的）快照更新，排在后面
+            snapshots[:0] = [snapshot for snapshot in stored
+                             if not any(recorded.version == snapshot.version and recorded.metadata == snapshot.metadata
+                                        for recorded in snapshots)]
+            del snapshots[:-self.max_versions]
+            self._evict()
+
+    def save(self, file_key: str, node_ids: Iterable[str], depth: int) -> None:
+        """把内存中这组目标节点的快照写入磁盘（阻塞的文件操作，可放在线程中执行；先合并磁盘上已有的快照）"""
+        if self.history_dir is None:
+            return
+        self.load(file_key, node_ids, depth)
+        key = (tuple(node_ids), depth)
+        with self._lock:
+            snapshots = list(self._files.get(file_key, {}).get(key, []))
+            if not snapshots:
+                return
+            # 持有锁写入：同一组快照的两次保存不会交错，旧内容不会覆盖新内容
+            path = self._path(file_key, key)
+            try:
+                os.makedirs(self.history_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=self.history_dir, suffix=".part")
+            except OSError as e:
+                logger.warning(f"Failed to save tree snapshots of {file_key}: {e}")
+                return
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump([snapshot.to_dict() for snapshot in snapshots], f, ensure_ascii=False)
+                os.replace(temp_path, path)
+            except (OSError, TypeError, ValueError) as e:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                logger.warning(f"Failed to save tree snapshots of {file_key}: {e}")
+
+    def latest(self, file_key: str, node_ids: Iterable[str], depth: int, version: str = None,
+               metadata: Dict[str, Any] = None) -> Optional[TreeSnapshot]:
+        """
+        最近记录的快照
+
+        Args:
+            file_key: Figma文件键
+            node_ids: 目标节点ID
+            depth: 树深度
+            version: 只查找该版本的快照，为None表示任意版本
+            metadata: 只查找附加信息与之相同的快照（例如同样格式和缩放比例的图片导出），为None表示不限
+        """
+        with self._lock:
+            snapshots = self._files.get(file_key, {}).get((tuple(node_ids), depth), [])
+            for snapshot in reversed(snapshots):
+                if (version is None or snapshot.version == version) and \
+                        (metadata is None or snapshot.metadata == metadata):
+                    self._files.move_to_end(file_key)
+                    return snapshot
+        return None
+
+    def record(self, snapshot: TreeSnapshot) -> None:
+        """记录快照（同一版本、同样附加信息的旧快照被替换；只在内存中，用 save 写入磁盘）"""
+        with self._lock:
+            snapshots = self._files.setdefault(snapshot.file_key, {}).setdefault(snapshot.key, [])
+            snapshots[:] = [previous for previous in snapshots
+                            if previous.version != snapshot.version or previous.metadata != snapshot.metadata]
+            snapshots.append(snapshot)
+            del snapshots[:-self.max_versions]
+            self._files.move_to_end(snapshot.file_key)
+            self._evict()
+
+    def _evict(self) -> None:
+        """丢弃最久未使用的文件（调用方持有锁；磁盘上的快照保留，之后可重新读取）"""
+        while len(self._files) > self.max_files:
+            file_key, _ = self._files.popitem(last=False)
+            self._loaded = {loaded for loaded in self._loaded if loaded[0] != file_key}
+
+    def stats(self) -> Dict[str, Any]:
+        """历史概况"""
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "snapshots": sum(len(snapshots) for keys in self._files.values() for snapshots in keys.values()),
+                "max_files": self.max_files,
+                "max_versions": self.max_versions,
+                "history_dir": self.history_dir
+            }
@@ -5,111 +5,105 @@ Figma 特定节点树结构提取器类
 获取特定节点的depth=4树结构
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Tuple
+from .figma_api_client import FigmaAPIClient
+from .figma_node_record import TreeNodeRecord
+from .figma_query_planner import FigmaQuery
+from .figma_tree_analysis import TreeAnalysis
+from .figma_tree_walker import map_tree
 from .file_saver import FigmaFileSaver
 
 class FigmaTreeExtractor:
-    def __init__(self, access_token: str = None):
-        """初始化提取器"""
+    def __init__(self, access_token: str = None, client: FigmaAPIClient = None, file_saver: FigmaFileSaver = None):
+        """初始化提取器（client 与 file_saver 可由服务器共享）"""
         self.access_token = access_token or os.getenv("FIGMA_ACCESS_TOKEN")
         if not self.access_token:
             raise ValueError("需要提供 access_token 或设置环境变量 FIGMA_ACCESS_TOKEN")
-        self.file_saver = FigmaFileSaver()
+        self.client = client or FigmaAPIClient(self.access_token)
+        self.file_saver = file_saver or FigmaFileSaver()
     
-    def get_specific_nodes(self, file_key: str, node_ids: str, depth: int = 4) -> Dict[str, Any]:
+    def build_query(self, file_key: str, node_ids: str, depth: int = 4, version: str = None) -> FigmaQuery:
+        """声明数据需求：目标节点及其下 depth 层子树（可指定文件的历史版本）"""
+        return FigmaQuery(file_key, node_ids=FigmaQuery.parse_ids(node_ids), depth=depth,
+                          params={"version": version} if version else None)
+    
+    async def get_specific_nodes(self, file_key: str, node_ids: str, depth: int = 4, version: str = None) -> Dict[str, Any]:
         """获取特定节点信息"""
-        url = f"https://api.figma.com/v1/files/{file_key}/nodes"
-        params = {
-            "ids": node_ids,
-            "depth": depth
-        }
-        headers = {"X-Figma-Token": self.access_token}
-        
         try:
-            response = requests.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self.client.execute(self.build_query(file_key, node_ids, depth, version))
+        except httpx.HTTPError as e:
             print(f"请求错误: {e}")
             return None
     
-    def analyze_node_structure(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 4) -> Dict[str, Any]:
-        """递归分析节点结构"""
-        node_info = {
-            "id": node.get("id"),
-            "name": node.get("name"),
-            "type": node.get("type"),
-            "depth": depth,
-            "absoluteBoundingBox": node.get("absoluteBoundingBox"),
-            "characters": node.get("characters"),  # 文本内容
-            "fills": node.get("fills"),  # 填充
-            "strokes": node.get("strokes"),  # 描边
-            "effects": node.get("effects"),  # 效果
-            "componentId": node.get("componentId"),  # 组件ID
-            "componentProperties": node.get("componentProperties"),  # 组件属性
-            "interactions": node.get("interactions"),  # 交互
-            "layoutMode": node.get("layoutMode"),  # 布局模式
-            "cornerRadius": node.get("cornerRadius"),  # 圆角
-            "strokeWeight": node.get("strokeWeight"),  # 描边宽度
-            "opacity": node.get("opacity"),  # 透明度
-            "blendMode": node.get("blendMode"),  # 混合模式
-            "children": []  # 子节点
-        }
-        
-        # 如果达到最大深度，停止递归
-        if depth >= max_depth:
-            return node_info
-        
-        # 递归处理子节点
-        children = node.get("children", [])
-        for child in children:
-            child_info = self.analyze_node_structure(child, depth + 1, max_depth)
-            node_info["children"].append(child_info)
-        
-        return node_info
+    def create_node_info(self, node: Dict[str, Any], depth: int, fields: Tuple[str, ...] = None) -> TreeNodeRecord:
+        """
+        提取单个节点的结构信息（只保留存在的属性，见 TREE_NODE_FIELDS）
+        
+        Args:
+            node: Figma 节点
+            depth: 节点深度
+            fields: 只复制这些属性（由 TreeNodeRecord.project_fields 得到），为None表示全部
+        """
+        return TreeNodeRecord(node, depth, fields)
+    
+    def analyze_node_structure(self, node: Dict[str, Any], depth: int = 0, max_depth: int = 4,
+                               analysis: TreeAnalysis = None, fields: Tuple[str, ...] = None) -> TreeNodeRecord:
+        """
+        分析节点结构：截取到 max_depth 层（包含）并保持嵌套
+        
+        Args:
+            node: 起始节点
+            depth: 起始节点的深度
+            max_depth: 保留的最大深度
+            analysis: 如果提供，在同一次遍历中把每个保留的节点加入统计
+            fields: 每个节点只复制这些属性，为None表示全部
+        """
+        if analysis is None:
+            def create(current: Dict[str, Any], current_depth: int) -> TreeNodeRecord:
+                return self.create_node_info(current, current_depth, fields)
+        else:
+            def create(current: Dict[str, Any], current_depth: int) -> TreeNodeRecord:
+                analysis.add(current, current_depth)
+                return self.create_node_info(current, current_depth, fields)
+        
+        return map_tree(node, create, max_depth=max_depth, start_depth=depth)
     
     def count_nodes_by_type(self, node: Dict[str, Any]) -> Dict[str, int]:
         """统计各类型节点数量"""
-        counts = {}
-        
-        def count_recursive(n):
-            node_type = n.get("type", "UNKNOWN")
-            counts[node_type] = counts.get(node_type, 0) + 1
-            
-            for child in n.get("children", []):
-                count_recursive(child)
-        
-        count_recursive(node)
-        return counts
+        return TreeAnalysis.from_tree(node).node_counts
     
     def find_nodes_by_type(self, node: Dict[str, Any], target_type: str) -> List[Dict[str, Any]]:
         """查找特定类型的节点"""
-        results = []
-        
-        def search_recursive(n):
-            if n.get("type") == target_type:
-                results.append({
-                    "id": n.get("id"),
-                    "name": n.get("name"),
-                    "depth": n.get("depth", 0)
-                })
-            
-            for child in n.get("children", []):
-                search_recursive(child)
-        
-        search_recursive(node)
-        return results
+        return TreeAnalysis.from_tree(node).find(target_type)
     
-    def extract_tree(self, file_key: str, node_ids: str, depth: int = 4) -> Dict[str, Any]:
-        """提取节点树结构"""
+    async def extract_tree(self, file_key: str, node_ids: str, depth: int = 4,
+                           fields: Iterable[str] = None, version: str = None) -> Dict[str, Any]:
+        """
+        提取节点树结构
+        
+        Args:
+            file_key: Figma文件键
+            node_ids: 目标节点ID，逗号分隔
+            depth: 树结构深度
+            fields: 每个节点输出的属性（id/name/type/depth/children 始终保留），为None或空表示全部
+            version: 文件的历史版本ID，为None表示当前版本
+        
+        Raises:
+            ValueError: fields 包含不支持的属性
+        """
+        projection = TreeNodeRecord.project_fields(fields)
+        
         print(f"正在获取文件 {file_key} 的特定节点树结构 (depth={depth})...")
         print(f"目标节点: {node_ids}")
+        if projection:
+            print(f"输出属性: {', '.join(projection)}")
         
         # 获取特定节点信息
-        nodes_data = self.get_specific_nodes(file_key, node_ids, depth)
+        nodes_data = await self.get_specific_nodes(file_key, node_ids, depth, version)
         if not nodes_data:
             return None
         
@@ -128,28 +122,29 @@ class FigmaTreeExtractor:
             "target_nodes": node_ids,
             "nodes": {}
         }
+        if projection:
+            result["fields"] = list(projection)
         
-        total_nodes = 0
-        all_node_counts = {}
+        # 所有目标节点的合并统计
+        total_analysis = TreeAnalysis()
         
-        # 处理每个目标节点
-        for node_id in node_ids.split(","):
-            if node_id in nodes_data.get("nodes", {}):
-                node_data = nodes_data["nodes"][node_id]["document"]
+        # 处理每个目标节点（无法获取的节点在响应中为null）
+        for node_id in FigmaQuery.parse_ids(node_ids):
+            node_entry = (nodes_data.get("nodes") or {}).get(node_id)
+            if node_entry and node_entry.get("document"):
+                node_data = node_entry["document"]
                 
                 print(f"\n分析节点: {node_data.get('name', 'Unknown')} (ID: {node_id})")
                 
-                # 分析节点结构
-                tree_structure = self.analyze_node_structure(node_data, depth=0, max_depth=depth)
-                
-                # 统计节点信息
-                node_counts = self.count_nodes_by_type(tree_structure)
-                node_total = sum(node_counts.values())
-                total_nodes += node_total
+                # 分析节点结构，同一次遍历完成统计
+                node_analysis = TreeAnalysis()
+                tree_structure = self.analyze_node_structure(node_data, depth=0, max_depth=depth,
+                                                             analysis=node_analysis, fields=projection)
+                node_counts = node_analysis.node_counts
+                node_total = node_analysis.total_nodes
                 
                 # 合并统计
-                for node_type, count in node_counts.items():
-                    all_node_counts[node_type] = all_node_counts.get(node_type, 0) + count
+                total_analysis.merge(node_analysis)
                 
                 print(f"节点 {node_id} 统计:")
                 print(f"  总节点数: {node_total}")
@@ -164,10 +159,14 @@ class FigmaTreeExtractor:
                     "tree_structure": tree_structure
                 }
         
+        if nodes_data.get("failed_ids"):
+            result["failed_nodes"] = nodes_data["failed_ids"]
+            print(f"\n⚠️ 以下节点所在批次请求失败: {', '.join(nodes_data['failed_ids'])}")
+        
         print(f"\n=== 总体统计 (depth={depth}) ===")
-        print(f"总节点数: {total_nodes}")
+        print(f"总节点数: {total_analysis.total_nodes}")
         
-        for node_type, count in sorted(all_node_counts.items()):
+        for node_type, count in sorted(total_analysis.node_counts.items()):
             print(f"{node_type}: {count}")
         
         # 查找重要节点类型
@@ -175,22 +174,18 @@ class FigmaTreeExtractor:
         print(f"\n=== 重要节点详情 ===")
         
         for node_type in important_types:
-            if node_type in all_node_counts:
-                all_nodes = []
-                for node_id, node_info in result["nodes"].items():
-                    nodes = self.find_nodes_by_type(node_info["tree_structure"], node_type)
-                    all_nodes.extend(nodes)
+            if node_type in total_analysis.node_counts:
+                type_count = total_analysis.node_counts[node_type]
                 
-                print(f"\n{node_type} 节点 ({len(all_nodes)}个):")
-                for node in all_nodes[:5]:  # 只显示前5个
+                print(f"\n{node_type} 节点 ({type_count}个):")
+                for node in total_analysis.find(node_type, limit=5):  # 只显示前5个
                     print(f"  - {node['name']} (ID: {node['id']}, 深度: {node['depth']})")
-                if len(all_nodes) > 5:
-                    print(f"  ... 还有 {len(all_nodes) - 5} 个")
+                if type_count > 5:
+                    print(f"  ... 还有 {type_count - 5} 个")
         
         # 添加总体分析
         result["analysis"] = {
-            "total_nodes": total_nodes,
-            "node_counts": all_node_counts,
+            **total_analysis.to_dict(),
             "max_depth": depth
         }
         
@@ -221,7 +216,7 @@ def main():
     
     try:
         extractor = FigmaTreeExtractor()
-        result = extractor.extract_tree(file_key, node_ids)
+        result = asyncio.run(extractor.extract_tree(file_key, node_ids))
         
         if result:
             # 使用文件保存器保存树结构
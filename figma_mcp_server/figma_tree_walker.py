@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Figma 节点树遍历器
+用显式栈代替递归，按先序（与递归遍历相同的顺序）逐个产出节点，
+内置深度限制、类型过滤和父节点跟踪；所有提取器共用
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+Node = Dict[str, Any]
+
+
+def walk_nodes(root: Node, max_depth: int = None, node_types: Iterable[str] = None,
+               start_depth: int = 0) -> Iterator[Tuple[Node, int, Optional[Node]]]:
+    """
+    先序遍历节点树
+
+    Args:
+        root: 起始节点
+        max_depth: 产出节点的最大深度（包含），更深的子树不会被访问；为None表示不限
+        node_types: 只产出这些类型的节点（其子节点仍会被遍历）；为None或空表示全部类型
+        start_depth: 起始节点的深度
+
+    Returns:
+        依次产出 (节点, 深度, 父节点) 的迭代器，起始节点的父节点为None
+    """
+    if max_depth is not None and start_depth > max_depth:
+        return
+    types = frozenset(node_types) if node_types else None
+
+    if types is None or root.get("type") in types:
+        yield root, start_depth, None
+    children = root.get("children")
+    if not children or (max_depth is not None and start_depth >= max_depth):
+        return
+
+    # 每层只保存 (父节点, 子节点迭代器)，栈的高度等于当前深度
+    stack = [(root, iter(children))]
+    while stack:
+        parent, siblings = stack[-1]
+        node = next(siblings, None)
+        if node is None:
+            stack.pop()
+            continue
+
+        depth = start_depth + len(stack)
+        if types is None or node.get("type") in types:
+            yield node, depth, parent
+
+        if max_depth is None or depth < max_depth:
+            children = node.get("children")
+            if children:
+                stack.append((node, iter(children)))
+
+
+def map_tree(root: Node, transform: Callable[[Node, int], Node], max_depth: int = None,
+             start_depth: int = 0) -> Node:
+    """
+    按 max_depth 截取节点树并逐个转换节点，保持原有的嵌套结构
+
+    Args:
+        root: 起始节点
+        transform: 把 (原节点, 深度) 转换为新节点的函数，新节点必须包含 children 列表
+        max_depth: 保留的最大深度（包含）
+        start_depth: 起始节点的深度
+
+    Returns:
+        转换后的根节点
+    """
+    converted: Dict[int, Node] = {}
+    result = None
+    for node, depth, parent in walk_nodes(root, max_depth=max_depth, start_depth=start_depth):
+        info = transform(node, depth)
+        if parent is None:
+            result = info
+        else:
+            converted[id(parent)]["children"].append(info)
+        if node.get("children"):
+            converted[id(node)] = info
+    return result
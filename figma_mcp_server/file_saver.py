@@ -2,25 +2,76 @@
 """
 Figma 文件保存工具类
 统一管理所有Figma工具的文件保存逻辑
+
+可选后台写入（write-behind）：save_* 立即返回文件路径，序列化和写盘在有界线程池中完成，
+不阻塞事件循环；需要文件已落盘时用 wait_for 等待
 """
 
-import json
+import asyncio
+import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Dict, Any, Callable, Iterable, List, Optional
+from .figma_serializer import FigmaSerializer
+
+logger = logging.getLogger(__name__)
+
+# 后台写入的默认线程数
+DEFAULT_WRITE_WORKERS = 2
+# 保留的未被 wait_for 取走的写入错误数量（已记录日志，超出后丢弃最早的）
+MAX_UNCLAIMED_ERRORS = 32
 
 class FigmaFileSaver:
-    def __init__(self, base_dir: str = None):
+    def __init__(self, base_dir: str = None, serializer: FigmaSerializer = None,
+                 write_behind: bool = False, max_workers: int = DEFAULT_WRITE_WORKERS):
         """
         初始化文件保存器
         
         Args:
             base_dir: 基础目录，如果为None则使用当前工作目录
+            serializer: 序列化后端与压缩方式，如果为None则根据环境变量创建（默认缩进的标准库 json）
+            write_behind: 是否后台写入；开启后保存的数据在写完之前不能再修改
+            max_workers: 后台写入的线程数上限
         """
         self.base_dir = base_dir or os.getcwd()
+        self.serializer = serializer or FigmaSerializer.from_env()
+        self.write_behind = write_behind
+        self.max_workers = max(1, max_workers)
+        self.writes = 0
+        self.superseded_writes = 0
+        self.write_errors = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 文件路径 -> 尚未完成的全部写入（按提交顺序）；同一文件的旧写入被新写入取代时直接跳过
+        self._pending: Dict[str, List[Future]] = {}
+        self._generations: Dict[str, int] = {}
+        # 文件路径 -> 写入锁，同一文件的写入依次进行，旧数据不会覆盖新数据
+        self._path_locks: Dict[str, threading.Lock] = {}
+        # 文件路径 -> 尚未被 wait_for 取走的写入错误（同一文件再次写入时清除，数量有上限）
+        self._errors: "OrderedDict[str, BaseException]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls, base_dir: str = None) -> "FigmaFileSaver":
+        """
+        根据环境变量创建文件保存器（默认后台写入）
+        
+        支持的环境变量:
+            FIGMA_WRITE_BEHIND, FIGMA_WRITE_WORKERS
+        """
+        return cls(
+            base_dir,
+            write_behind=os.getenv("FIGMA_WRITE_BEHIND", "1").strip().lower() not in ("0", "false", "no"),
+            max_workers=int(os.getenv("FIGMA_WRITE_WORKERS", DEFAULT_WRITE_WORKERS))
+        )
     
     def create_output_dir(self, dir_name: str) -> str:
         """
-        创建输出目录
+        创建输出目录（后台写入时目录由写入线程在写第一个文件时创建，不阻塞调用方）
         
         Args:
             dir_name: 目录名称
@@ -29,12 +80,20 @@ class FigmaFileSaver:
             创建的目录的完整路径
         """
         output_dir = os.path.join(self.base_dir, dir_name)
-        os.makedirs(output_dir, exist_ok=True)
+        if not self.write_behind:
+            os.makedirs(output_dir, exist_ok=True)
         return output_dir
     
+    async def make_dirs(self, path: str) -> None:
+        """在线程池中创建目录（已存在时忽略），供需要目录立即存在的异步调用方使用"""
+        await self.run(partial(os.makedirs, path, exist_ok=True))
+    
     def save_json_file(self, data: Dict[str, Any], filename: str, output_dir: str = None) -> str:
         """
-        保存JSON文件
+        保存JSON文件（按序列化器的格式和压缩方式，扩展名随之改变，如 .json.gz、.msgpack）
+        
+        文件先写入临时文件再替换，读取方不会看到写了一半的文件；
+        后台写入时立即返回路径，文件稍后才出现
         
         Args:
             data: 要保存的数据
@@ -44,18 +103,135 @@ class FigmaFileSaver:
         Returns:
             保存的文件完整路径
         """
+        filename = self.serializer.filename(filename)
         if output_dir:
             file_path = os.path.join(output_dir, filename)
         else:
             file_path = os.path.join(self.base_dir, filename)
         
+        if not self.write_behind:
+            self._write(data, file_path)
+            return file_path
+        
+        with self._lock:
+            generation = self._generations.get(file_path, 0) + 1
+            self._generations[file_path] = generation
+            self._errors.pop(file_path, None)
+            path_lock = self._path_locks.setdefault(file_path, threading.Lock())
+            future = self._get_executor().submit(self._write_latest, data, file_path, generation, path_lock)
+            self._pending.setdefault(file_path, []).append(future)
+        future.add_done_callback(partial(self._on_written, file_path, generation))
+        return file_path
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="figma-file-saver")
+        return self._executor
+    
+    def _write(self, data: Dict[str, Any], file_path: str, is_current: Callable[[], bool] = None) -> bool:
+        """
+        写入临时文件后替换目标文件
+        
+        Args:
+            is_current: 替换前再次确认数据仍是最新的，返回False时丢弃临时文件
+        
+        Returns:
+            是否替换了目标文件
+        """
         # 确保目录存在
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            self.serializer.write(data, temp_path)
+            if is_current is not None and not is_current():
+                os.remove(temp_path)
+                return False
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.writes += 1
+        return True
+    
+    def _write_latest(self, data: Dict[str, Any], file_path: str, generation: int, path_lock: threading.Lock) -> None:
+        """后台写入：持有该文件的写入锁，同一文件已经提交了更新的数据时跳过（序列化期间被取代的也不替换）"""
+        def is_current() -> bool:
+            return self._generations.get(file_path) == generation
+        
+        with path_lock:
+            if not is_current() or not self._write(data, file_path, is_current):
+                self.superseded_writes += 1
+    
+    def _on_written(self, file_path: str, generation: int, future: Future) -> None:
+        with self._lock:
+            superseded = self._generations.get(file_path) != generation
+            futures = self._pending.get(file_path, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._pending.pop(file_path, None)
+                self._generations.pop(file_path, None)
+                self._path_locks.pop(file_path, None)
+        error = future.exception()
+        if error is not None:
+            self.write_errors += 1
+            if not superseded:
+                with self._lock:
+                    # 只有 durable 调用会来取，默认的后台写入没人等待，只保留最近的少量错误
+                    self._errors[file_path] = error
+                    while len(self._errors) > MAX_UNCLAIMED_ERRORS:
+                        self._errors.popitem(last=False)
+            logger.error(f"Failed to write {file_path}: {error}")
+    
+    async def wait_for(self, paths: Iterable[str] = None) -> None:
+        """
+        等待后台写入完成（同一文件尚未完成的每一次写入都会等待）
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        Args:
+            paths: 要等待的文件路径（不在写入中的路径会被忽略），为None表示全部
         
-        return file_path
+        Raises:
+            Exception: 写入失败时抛出最新一次写入的异常（包括等待之前已经失败的写入）
+        """
+        wanted = set(paths) if paths is not None else None
+        with self._lock:
+            futures = [future for path, pending in self._pending.items() if wanted is None or path in wanted
+                       for future in pending]
+        # 异常在写入完成时已记录到 _errors（被取代的写入除外），这里只等待
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+        with self._lock:
+            failed = [path for path in self._errors if wanted is None or path in wanted]
+            errors = [self._errors.pop(path) for path in failed]
+        if errors:
+            raise errors[0]
+    
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在保存器的线程池中执行阻塞的文件操作（如移动文件），不阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), partial(func, *args))
+    
+    def flush(self) -> None:
+        """阻塞等待所有后台写入完成"""
+        with self._lock:
+            futures = [future for pending in self._pending.values() for future in pending]
+        wait(futures)
+    
+    def close(self) -> None:
+        """写完所有待写文件并关闭线程池"""
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """写入统计"""
+        return {
+            "write_behind": self.write_behind,
+            "pending": len(self._pending),
+            "writes": self.writes,
+            "superseded_writes": self.superseded_writes,
+            "write_errors": self.write_errors
+        }
     
     def save_frame_info(self, file_key: str, result: Dict[str, Any], max_depth: int = 2) -> Dict[str, str]:
         """
@@ -158,6 +334,7 @@ class FigmaFileSaver:
             "target_nodes": node_ids,
             "total_nodes": result["analysis"]["total_nodes"],
             "node_counts": result["analysis"]["node_counts"],
+            "depth_histogram": result["analysis"].get("depth_histogram", {}),
             "max_depth": result["analysis"]["max_depth"]
         }
         stats_file = f"specific_nodes_stats_{file_key}.json"
@@ -192,6 +369,51 @@ class FigmaFileSaver:
             "output_dir": output_dir
         }
     
+    def save_tree_diff(self, file_key: str, diff: Dict[str, Any]) -> Dict[str, str]:
+        """
+        保存树结构差异文件
+        
+        Args:
+            file_key: Figma文件键
+            diff: 结构差异（TreeDiff.to_dict）
+            
+        Returns:
+            包含文件路径的字典
+        """
+        # 创建输出目录
+        output_dir = self.create_output_dir(f"tree_diff_{file_key}")
+        
+        # 按比较的两个版本命名
+        diff_file = f"diff_{diff['from_version']}_{diff['to_version']}.json"
+        diff_path = self.save_json_file(diff, diff_file, output_dir)
+        
+        return {
+            "diff_path": diff_path,
+            "output_dir": output_dir
+        }
+    
+    def save_batch_report(self, report: Dict[str, Any]) -> Dict[str, str]:
+        """
+        保存批量导出报告
+        
+        Args:
+            report: 批量导出汇总（BatchExportReport.to_dict）
+            
+        Returns:
+            包含文件路径的字典
+        """
+        # 创建输出目录
+        output_dir = self.create_output_dir("batch_exports")
+        
+        # 按完成时间命名，每次批量导出保留一份报告
+        report_file = f"batch_export_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.json"
+        report_path = self.save_json_file(report, report_file, output_dir)
+        
+        return {
+            "report_path": report_path,
+            "output_dir": output_dir
+        }
+    
     def get_relative_path(self, file_path: str) -> str:
         """
         获取相对于基础目录的路径
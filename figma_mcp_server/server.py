@@ -7,9 +7,13 @@ Figma MCP Server
 import asyncio
 import json
 import os
+import shutil
 import sys
+import tempfile
+import time
 import logging
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # 配置日志
@@ -21,6 +25,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # 导入我们的Figma工具类
+from .figma_api_client import FigmaAPIClient
+from .figma_batch_export import BatchExportJob, BatchExportReport, BatchExportResult, FigmaBatchExporter
+from .figma_cache import FigmaResponseCache, DEFAULT_TTL
+from .figma_image_cache import FigmaImageCache
+from .figma_node_index import FigmaNodeIndex, MATCH_MODES, load_node_index
+from .figma_node_record import FrameNodeRecord, TreeNodeRecord
+from .figma_query_planner import FigmaQuery
+from .figma_result_pages import DEFAULT_PAGE_SIZE, FigmaResultPages, ResultSet
+from .figma_tree_diff import FigmaTreeHistory, TreeSnapshot, diff_snapshots
 from .figma_tree_extractor import FigmaTreeExtractor
 from .figma_image_extractor import FigmaImageExtractor
 from .figma_frame_extractor import FigmaFrameExtractor
@@ -66,6 +79,16 @@ FIGMA_TOOLS = [
                     "type": "integer",
                     "description": "Tree structure depth, default 4",
                     "default": 4
+                },
+                "fields": {
+                    "type": "string",
+                    "description": "Node properties to include, separated by commas (e.g.: absoluteBoundingBox or characters), leave empty for all. id, name, type, depth and children are always included. Available: " + ", ".join(TreeNodeRecord.SOURCE_FIELDS),
+                    "default": ""
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
                 }
             },
             "required": ["file_key", "node_ids"]
@@ -95,6 +118,11 @@ FIGMA_TOOLS = [
                     "type": "number",
                     "description": "Scale ratio: 0.01-4",
                     "default": 1.0
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
                 }
             },
             "required": ["file_key", "node_ids"]
@@ -129,6 +157,16 @@ FIGMA_TOOLS = [
                     "type": "integer",
                     "description": "Tree structure depth",
                     "default": 4
+                },
+                "incremental": {
+                    "type": "boolean",
+                    "description": "Compare with the last export of the same nodes and only re-render the nodes whose subtree changed (within tree_depth), keeping the other images in the output folder",
+                    "default": False
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
                 }
             },
             "required": ["file_key", "node_ids"]
@@ -137,7 +175,7 @@ FIGMA_TOOLS = [
     {
         "name": "extract_frame_nodes",
         "title": "Extract Frame Nodes",
-        "description": "Extract Frame node information from Figma file",
+        "description": "Extract Frame node information from Figma file. Results are paginated in document order; pass the returned cursor to get the next page",
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -149,6 +187,25 @@ FIGMA_TOOLS = [
                     "type": "integer",
                     "description": "Maximum depth, default 2",
                     "default": 2
+                },
+                "fields": {
+                    "type": "string",
+                    "description": "Frame properties to include, separated by commas (e.g.: absoluteBoundingBox,layoutMode). When set, each frame only lists these properties instead of the full page layout. id, name and type are always included. Available: " + ", ".join(FrameNodeRecord.SOURCE_FIELDS),
+                    "default": ""
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of frames per page, default 200 (0 returns all)",
+                    "default": 200
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Cursor from a previous call to fetch the next page of the same result, other parameters are ignored"
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
                 }
             },
             "required": ["file_key"]
@@ -157,7 +214,7 @@ FIGMA_TOOLS = [
     {
         "name": "list_nodes_depth2",
         "title": "List Nodes",
-        "description": "List all node IDs and names in Figma file (depth limited to 2), help users find needed nodes",
+        "description": "List all node IDs and names in Figma file (depth limited to 2), help users find needed nodes. Results are paginated in document order; pass the returned cursor to get the next page",
         "inputSchema": {
             "type": "object",
             "properties": {
@@ -169,10 +226,162 @@ FIGMA_TOOLS = [
                     "type": "string",
                     "description": "Node types to include, separated by commas (e.g.: FRAME,COMPONENT,TEXT), leave empty for all types",
                     "default": ""
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of nodes per page, default 200 (0 returns all)",
+                    "default": 200
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Cursor from a previous call to fetch the next page of the same result, other parameters are ignored"
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
+                }
+            },
+            "required": ["file_key"]
+        }
+    },
+    {
+        "name": "search_nodes",
+        "title": "Search Nodes",
+        "description": "Search nodes of a Figma file by name, type and ancestor (e.g. TEXT nodes whose name contains 'Checkout' under a page). Uses an index kept in memory per file, so repeated searches don't re-fetch the file. Prefer this over list_nodes_depth2 when you know roughly what you are looking for",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "file_key": {
+                    "type": "string",
+                    "description": "Unique identifier of the Figma file"
+                },
+                "query": {
+                    "type": "string",
+                    "description": "Text to match against node names (case-insensitive), leave empty to match any name",
+                    "default": ""
+                },
+                "match": {
+                    "type": "string",
+                    "description": "How query matches names: contains, prefix or exact",
+                    "enum": list(MATCH_MODES),
+                    "default": "contains"
+                },
+                "node_types": {
+                    "type": "string",
+                    "description": "Node types to include, separated by commas (e.g.: TEXT,INSTANCE), leave empty for all types",
+                    "default": ""
+                },
+                "under": {
+                    "type": "string",
+                    "description": "Only return descendants of this node ID (e.g. a page or frame)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results, default 50",
+                    "default": 50
+                },
+                "depth": {
+                    "type": "integer",
+                    "description": "Only index the document down to this depth (faster on huge files), leave empty for the whole document"
                 }
             },
             "required": ["file_key"]
         }
+    },
+    {
+        "name": "diff_figma_tree",
+        "title": "Diff Figma Tree",
+        "description": "Compare the current tree of Figma nodes with an earlier extraction (or an older file version) by node ID: added, removed and changed nodes, and which of the requested nodes need re-rendering. The first call for a set of nodes records a baseline",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "file_key": {
+                    "type": "string",
+                    "description": "Unique identifier of the Figma file"
+                },
+                "node_ids": {
+                    "type": "string",
+                    "description": "Node IDs, separated by commas. Use list_nodes_depth2 tool to get node IDs"
+                },
+                "depth": {
+                    "type": "integer",
+                    "description": "Tree structure depth, default 4. Changes below this depth are not seen",
+                    "default": 4
+                },
+                "from_version": {
+                    "type": "string",
+                    "description": "Figma version ID to compare against, leave empty for the last extraction of the same nodes and depth"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of changed nodes listed in the response, default 50 (the saved diff file has all of them)",
+                    "default": 50
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files are written to disk before responding. By default files are written in the background right after the response",
+                    "default": False
+                }
+            },
+            "required": ["file_key", "node_ids"]
+        }
+    },
+    {
+        "name": "batch_export",
+        "title": "Batch Export",
+        "description": "Export complete node data (same output as get_complete_node_data) for many Figma files in one call. All files share one concurrency and rate budget: at most max_concurrent_files files are exported at a time, and every fetch, render and download goes through the same rate limiter, connection pool and image download limit. Reports the result of every file and the overall throughput, and saves a JSON report",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "exports": {
+                    "type": "array",
+                    "description": "Files to export, each with its node selection. Options not given fall back to the defaults below",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "file_key": {"type": "string", "description": "Unique identifier of the Figma file"},
+                            "node_ids": {"type": "string", "description": "Node IDs, separated by commas"},
+                            "image_format": {"type": "string", "description": "Image format: png, jpg, svg, pdf"},
+                            "image_scale": {"type": "number", "description": "Image scale ratio: 0.01-4"},
+                            "tree_depth": {"type": "integer", "description": "Tree structure depth"},
+                            "incremental": {"type": "boolean", "description": "Only re-render nodes whose subtree changed since the last export"}
+                        },
+                        "required": ["file_key", "node_ids"]
+                    }
+                },
+                "image_format": {
+                    "type": "string",
+                    "description": "Default image format: png, jpg, svg, pdf",
+                    "default": "png"
+                },
+                "image_scale": {
+                    "type": "number",
+                    "description": "Default image scale ratio: 0.01-4",
+                    "default": 1.0
+                },
+                "tree_depth": {
+                    "type": "integer",
+                    "description": "Default tree structure depth",
+                    "default": 4
+                },
+                "incremental": {
+                    "type": "boolean",
+                    "description": "Default for incremental exports",
+                    "default": False
+                },
+                "max_concurrent_files": {
+                    "type": "integer",
+                    "description": "Files exported at the same time. Defaults to FIGMA_BATCH_CONCURRENCY (4)"
+                },
+                "durable": {
+                    "type": "boolean",
+                    "description": "Wait until the saved files of every export are written to disk before responding",
+                    "default": False
+                }
+            },
+            "required": ["exports"]
+        }
     }
 ]
 
@@ -185,11 +394,39 @@ class FigmaMCPServer:
         if not self.access_token:
             print("Warning: FIGMA_ACCESS_TOKEN environment variable not set")
         
-        self.tree_extractor = FigmaTreeExtractor(self.access_token) if self.access_token else None
-        self.image_extractor = FigmaImageExtractor(self.access_token) if self.access_token else None
-        self.frame_extractor = FigmaFrameExtractor(self.access_token) if self.access_token else None
-        self.node_lister = FigmaNodeLister(self.access_token) if self.access_token else None
-        self.file_saver = FigmaFileSaver()
+        # All extractors share one async client (and its keep-alive connection pool)
+        # so tool calls never block the event loop or reopen TLS connections
+        self.response_cache = FigmaResponseCache.from_env() if self.access_token else None
+        self.api_client = FigmaAPIClient.from_env(self.access_token, self.response_cache) if self.access_token else None
+        # One saver for every tool: result files are serialized and written by its bounded
+        # worker pool after the tool returns (write-behind), unless a call asks for durability
+        self.file_saver = FigmaFileSaver.from_env()
+        # Rendered images by file version, node, format and scale: hits skip both render and download
+        self.image_cache = FigmaImageCache.from_env() if self.access_token else None
+        self.tree_extractor = FigmaTreeExtractor(self.access_token, self.api_client, self.file_saver) if self.access_token else None
+        self.image_extractor = FigmaImageExtractor(
+            self.access_token,
+            self.api_client,
+            max_concurrent_downloads=int(os.getenv("FIGMA_IMAGE_DOWNLOAD_CONCURRENCY", 8)),
+            file_saver=self.file_saver,
+            image_cache=self.image_cache
+        ) if self.access_token else None
+        # Streaming parse keeps memory bounded by output size on very large files
+        streaming = os.getenv("FIGMA_STREAM_PARSE", "").lower() in ("1", "true", "yes")
+        self.streaming = streaming
+        self.frame_extractor = FigmaFrameExtractor(self.access_token, self.api_client, streaming=streaming,
+                                                   file_saver=self.file_saver) if self.access_token else None
+        self.node_lister = FigmaNodeLister(self.access_token, self.api_client, streaming=streaming,
+                                           file_saver=self.file_saver) if self.access_token else None
+        # Warm per-file node indexes for search_nodes, least recently used first
+        self.node_indexes: "OrderedDict[str, FigmaNodeIndex]" = OrderedDict()
+        self.max_node_indexes = int(os.getenv("FIGMA_NODE_INDEX_MAX_FILES", 8))
+        # Full results of paginated tools, served page by page through cursors
+        self.result_pages = FigmaResultPages.from_env()
+        # Earlier tree extractions per file and version, for diffs and incremental exports
+        self.tree_history = FigmaTreeHistory.from_env()
+        # Batch exports run several files at a time through the shared client and download slots
+        self.batch_exporter = FigmaBatchExporter.from_env(self.export_batch_job, self.api_stats)
     
     def setup_environment(self):
         """Setup environment, including virtual environment path"""
@@ -212,48 +449,280 @@ class FigmaMCPServer:
         if script_dir not in sys.path:
             sys.path.insert(0, script_dir)
     
-    def get_node_name(self, tree_data: Dict[str, Any], node_id: str) -> str:
-        """Get node name from tree structure data"""
+    async def get_node_index(self, file_key: str, depth: Optional[int] = None) -> Optional[FigmaNodeIndex]:
+        """Return a warm node index for the file, rebuilding it only when the document changed"""
+        index = self.node_indexes.get(file_key)
+        # An index built from a shallower fetch can't answer deeper queries
+        if index is not None and (index.depth is None or (depth is not None and index.depth >= depth)):
+            ttl = self.response_cache.ttl if self.response_cache else DEFAULT_TTL
+            if time.time() - index.built_at > ttl:
+                # Cheap version probe; keep the index if the probe fails or the version is unchanged
+                current_version = await self.api_client.get_file_version(file_key)
+                if current_version and current_version != index.version:
+                    index = None
+                else:
+                    index.built_at = time.time()
+            if index is not None:
+                self.node_indexes.move_to_end(file_key)
+                return index
+        
+        index = await self.api_client.single_flight(
+            ("node_index", file_key, depth),
+            lambda: load_node_index(self.api_client, file_key, depth, streaming=self.streaming)
+        )
+        if index is not None:
+            self.node_indexes[file_key] = index
+            self.node_indexes.move_to_end(file_key)
+            while len(self.node_indexes) > self.max_node_indexes:
+                self.node_indexes.popitem(last=False)
+        return index
+    
+    def api_stats(self) -> Optional[Dict[str, Any]]:
+        """Rate limiting (queue depth, wait times, 429s), request coalescing and cache hits of the shared client since start"""
+        if not self.api_client:
+            return None
+        stats = self.api_client.stats()
+        stats["image_cache"] = self.image_cache.stats() if self.image_cache else None
+        return stats
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool and save pending cache indexes"""
+        if self.api_client:
+            logger.info(f"Figma API: {format_api_stats(self.api_stats())}")
+            await self.api_client.aclose()
+        if self.image_cache:
+            await asyncio.to_thread(self.image_cache.flush)
+        # Don't lose result files still queued for writing
+        await asyncio.to_thread(self.file_saver.close)
+    
+    def get_node_name(self, tree_data: Dict[str, Any], node_id: str, snapshot: TreeSnapshot = None) -> str:
+        """Get node name from tree structure data, or from an earlier snapshot when the tree is missing"""
         try:
             if "nodes" in tree_data and node_id in tree_data["nodes"]:
                 node_name = tree_data["nodes"][node_id].get("name", "")
-                return node_name.replace(':', '_').replace('/', '_').replace('\\', '_').strip() or f"node_{node_id.replace(':', '_')}"
-            return f"node_{node_id.replace(':', '_')}"
+            elif snapshot is not None and node_id in snapshot.nodes:
+                node_name = snapshot.nodes[node_id][1].get("name", "")
+            else:
+                return f"node_{node_id.replace(':', '_')}"
+            return node_name.replace(':', '_').replace('/', '_').replace('\\', '_').strip() or f"node_{node_id.replace(':', '_')}"
         except Exception:
             return f"node_{node_id.replace(':', '_')}"
     
-    def organize_files(self, file_key: str, node_ids: str, node_name: str, tree_result: Dict, image_result: Dict) -> Dict[str, Any]:
-        """Organize files to specified folder"""
-        import shutil
+    async def load_tree_history(self, file_key: str, target_ids: List[str], depth: int) -> None:
+        """Read earlier snapshots of these nodes from disk (once per set of nodes, off the event loop)"""
+        await self.file_saver.run(self.tree_history.load, file_key, target_ids, depth)
+    
+    async def record_snapshot(self, snapshot: TreeSnapshot) -> None:
+        """Record a snapshot and save the history of its nodes, so later processes can diff against it"""
+        self.tree_history.record(snapshot)
+        await self.file_saver.run(self.tree_history.save, snapshot.file_key, snapshot.node_ids, snapshot.depth)
+    
+    def get_target_dir(self, file_key: str, node_ids: str, node_name: str) -> str:
+        """Output folder of get_complete_node_data (the file key keeps same-named nodes of different files apart)"""
+        first_node_id = node_ids.split(",")[0]
+        return f"{node_name}_{first_node_id}_{file_key}"
+    
+    def organize_files(self, file_key: str, node_ids: str, node_name: str, tree_result: Dict, image_result: Dict,
+                       kept_ids: List[str] = None) -> Dict[str, Any]:
+        """
+        Finish the export folder and write a manifest of every file in it.
         
+        Images are already written by the image stage, either straight into the target folder or into a
+        staging folder next to it (when the folder name wasn't known yet); staged images are renamed in
+        place, which on the same filesystem never copies data.
+        """
         # Create target folder
-        first_node_id = node_ids.split(",")[0]
-        target_dir = f"{node_name}_{first_node_id}"
+        target_dir = self.get_target_dir(file_key, node_ids, node_name)
         os.makedirs(target_dir, exist_ok=True)
         
         result = {
             "target_dir": target_dir,
-            "files": {}
+            "files": {
+                "images": {}
+            }
+        }
+        manifest = {
+            "file_key": file_key,
+            "version": (tree_result or image_result or {}).get("version", ""),
+            "node_ids": FigmaQuery.parse_ids(node_ids),
+            "files": [],
+            "failed_images": []
         }
         
-        # Save tree structure file
-        tree_file = f"{target_dir}/nodesinfo.json"
-        with open(tree_file, 'w', encoding='utf-8') as f:
-            json.dump(tree_result, f, indent=2, ensure_ascii=False)
-        result["files"]["nodesinfo"] = tree_file
+        # Save tree structure file (format and compression follow the file saver's serializer)
+        if tree_result:
+            tree_file = self.file_saver.save_json_file(tree_result, "nodesinfo.json", target_dir)
+            result["files"]["nodesinfo"] = tree_file
+            manifest["files"].append({"path": os.path.basename(tree_file), "type": "nodesinfo"})
         
         # Process image files
-        if image_result and "images" in image_result:
+        image_format = (image_result or {}).get("format", "png")
+        if image_result:
+            manifest["format"] = image_format
+            manifest["scale"] = image_result.get("scale")
             for node_id, image_info in image_result["images"].items():
-                if image_info.get("status") == "success" and image_info.get("filename"):
-                    # Move image file to target directory
-                    old_path = image_info["filename"]
-                    new_path = f"{target_dir}/{node_id}.{image_result.get('format', 'png')}"
-                    if os.path.exists(old_path):
-                        shutil.move(old_path, new_path)
-                        result["files"]["image"] = new_path
+                path = os.path.join(target_dir, f"{node_id}.{image_format}")
+                if image_info.get("status") != "success" or not image_info.get("filename"):
+                    manifest["failed_images"].append(node_id)
+                    continue
+                if os.path.abspath(image_info["filename"]) != os.path.abspath(path):
+                    os.replace(image_info["filename"], path)
+                result["files"]["images"][node_id] = path
+                manifest["files"].append({
+                    "path": os.path.basename(path),
+                    "type": "image",
+                    "node_id": node_id,
+                    "bytes": os.path.getsize(path),
+                    "source": "cache" if image_info.get("cached") else "rendered"
+                })
         
+        # Images of an incremental export that didn't need re-rendering
+        for node_id in kept_ids or []:
+            path = os.path.join(target_dir, f"{node_id}.{image_format}")
+            if node_id not in result["files"]["images"] and os.path.exists(path):
+                result["files"]["images"][node_id] = path
+                manifest["files"].append({
+                    "path": os.path.basename(path),
+                    "type": "image",
+                    "node_id": node_id,
+                    "bytes": os.path.getsize(path),
+                    "source": "kept"
+                })
+        
+        result["files"]["manifest"] = self.file_saver.save_json_file(manifest, "manifest.json", target_dir)
+        result["manifest"] = manifest
         return result
+    
+    async def export_complete_data(self, file_key: str, node_ids: str, image_format: str = "png",
+                                   image_scale: float = 1.0, tree_depth: int = 4, incremental: bool = False,
+                                   durable: bool = False) -> Dict[str, Any]:
+        """
+        Export the tree structure and images of nodes into one folder (get_complete_node_data, batch_export).
+        
+        Returns the stage results, the per-stage errors, the organized folder (None when both stages
+        failed), the incremental diff, the shared client's API stats and, in durable mode, the error of
+        saving node data if any.
+        """
+        target_ids = FigmaQuery.parse_ids(node_ids)
+        # Images exported from an earlier snapshot can be kept when the same format and scale were used
+        metadata = {"image_format": image_format, "image_scale": image_scale}
+        await self.load_tree_history(file_key, target_ids, tree_depth)
+        previous = self.tree_history.latest(file_key, target_ids, tree_depth, metadata=metadata) if incremental else None
+        errors: Dict[str, str] = {}
+        export = {"tree_result": None, "image_result": None, "organize_result": None, "errors": errors,
+                  "diff": None, "target_ids": target_ids, "render_ids": target_ids, "save_error": None,
+                  "api_stats": None}
+        
+        async def download_images(render_ids: List[str], output_dir: str) -> Optional[Dict[str, Any]]:
+            if not render_ids:
+                return {"format": image_format, "scale": image_scale, "images": {}}
+            return await self.image_extractor.extract_images(file_key, ",".join(render_ids), image_format, image_scale,
+                                                             output_dir=output_dir)
+        
+        def stage_result(stage: str, outcome: Any) -> Any:
+            # A failed stage is reported next to whatever the other stage produced
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                logger.error(f"{stage} failed: {outcome}")
+                errors[stage] = str(outcome) or type(outcome).__name__
+                return None
+            if not outcome:
+                errors[stage] = "no data returned"
+            return outcome
+        
+        # Step 1: Get tree structure and download images at the same time (independent API calls);
+        # an incremental export with an earlier baseline needs the tree diff before it knows what to render
+        # The output folder is named after the first node, so concurrently downloaded images are staged
+        # next to it (same filesystem) and renamed into place once the tree is known
+        staging_dir = None
+        stages = [self.tree_extractor.extract_tree(file_key, node_ids, tree_depth)]
+        if previous is None:
+            staging_dir = tempfile.mkdtemp(prefix=f".{file_key}_export_", dir=".")
+            stages.append(download_images(target_ids, staging_dir))
+        outcomes = await asyncio.gather(*stages, return_exceptions=True)
+        tree_result = export["tree_result"] = stage_result("Tree structure", outcomes[0])
+        snapshot = TreeSnapshot.from_result(tree_result, tree_depth, metadata) if tree_result else None
+        
+        # Step 2: Get node name (from the last snapshot of these nodes when the tree stage failed,
+        # so the folder doesn't change name with the outcome of the tree stage)
+        first_node_id = node_ids.split(",")[0]
+        node_name = self.get_node_name(tree_result or {}, first_node_id,
+                                       previous or self.tree_history.latest(file_key, target_ids, tree_depth))
+        
+        render_ids = target_ids
+        if previous is not None:
+            target_dir = self.get_target_dir(file_key, node_ids, node_name)
+            if snapshot is not None:
+                diff = export["diff"] = diff_snapshots(previous, snapshot)
+                existing = await self.file_saver.run(
+                    lambda: {node_id for node_id in target_ids
+                             if os.path.exists(os.path.join(target_dir, f"{node_id}.{image_format}"))}
+                )
+                render_ids = export["render_ids"] = [
+                    node_id for node_id in target_ids
+                    if node_id in diff.changed_targets or node_id not in existing
+                ]
+            # Step 3: Download images (without the new tree there is no diff, so everything is rendered)
+            outcomes = await asyncio.gather(download_images(render_ids, target_dir), return_exceptions=True)
+            image_result = stage_result("Images", outcomes[0])
+        else:
+            image_result = stage_result("Images", outcomes[1])
+        export["image_result"] = image_result
+        
+        export["api_stats"] = self.api_stats()
+        if not tree_result and not image_result:
+            if staging_dir:
+                await self.file_saver.run(shutil.rmtree, staging_dir, True)
+            return export
+        
+        # Only a fully rendered export becomes the baseline, so failed images are retried next time
+        if snapshot is not None and image_result and \
+                all(image_result["images"].get(node_id, {}).get("status") == "success" for node_id in render_ids):
+            await self.record_snapshot(snapshot)
+        
+        # Step 4: Organize files (renaming staged images is blocking file I/O, keep it off the event loop)
+        kept_ids = [node_id for node_id in target_ids if node_id not in render_ids]
+        try:
+            organize_result = export["organize_result"] = await self.file_saver.run(
+                self.organize_files, file_key, node_ids, node_name, tree_result, image_result, kept_ids
+            )
+        finally:
+            if staging_dir:
+                await self.file_saver.run(shutil.rmtree, staging_dir, True)
+        if durable:
+            try:
+                await self.file_saver.wait_for([organize_result["files"].get("nodesinfo"), organize_result["files"]["manifest"]])
+            except Exception as e:
+                logger.error(f"Failed to save node data: {e}")
+                export["save_error"] = str(e) or type(e).__name__
+        return export
+    
+    async def export_batch_job(self, job: BatchExportJob) -> Dict[str, Any]:
+        """Export one file of a batch and summarize it for the batch report"""
+        export = await self.export_complete_data(job.file_key, job.node_ids, job.image_format, job.image_scale,
+                                                 job.tree_depth, job.incremental, job.durable)
+        errors = dict(export["errors"])
+        organize_result = export["organize_result"]
+        if organize_result is None:
+            # Both stages failed: no folder, the batch marks the file as failed
+            return {"errors": errors}
+        if export["save_error"]:
+            errors["Saving node data"] = export["save_error"]
+        
+        manifest = organize_result["manifest"]
+        images = [entry for entry in manifest["files"] if entry["type"] == "image"]
+        tree_result = export["tree_result"]
+        return {
+            "target_dir": organize_result["target_dir"],
+            "version": manifest["version"],
+            "nodes": tree_result["analysis"]["total_nodes"] if tree_result else 0,
+            "images": len(images),
+            "cached_images": sum(1 for entry in images if entry["source"] == "cache"),
+            "failed_images": len(manifest["failed_images"]),
+            "image_bytes": sum(entry["bytes"] for entry in images),
+            "errors": errors
+        }
 
 # 创建Figma MCP服务器实例（延迟初始化）
 figma_server = None
@@ -292,6 +761,12 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> list[TextCon
             return await handle_extract_frames(arguments)
         elif name == "list_nodes_depth2":
             return await handle_list_nodes(arguments)
+        elif name == "search_nodes":
+            return await handle_search_nodes(arguments)
+        elif name == "diff_figma_tree":
+            return await handle_diff_tree(arguments)
+        elif name == "batch_export":
+            return await handle_batch_export(arguments)
         else:
             logger.warning(f"Unknown tool: {name}")
             return [TextContent(type="text", text=f"Unknown tool: {name}")]
@@ -304,24 +779,36 @@ async def handle_extract_tree(arguments: Dict[str, Any]) -> list[TextContent]:
     file_key = arguments["file_key"]
     node_ids = arguments["node_ids"]
     depth = arguments.get("depth", 4)
+    fields = [f.strip() for f in arguments.get("fields", "").split(",") if f.strip()]
+    durable = arguments.get("durable", False)
     
     figma_server = get_figma_server()
     if not figma_server.tree_extractor:
         return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
     
-    result = figma_server.tree_extractor.extract_tree(file_key, node_ids, depth)
+    try:
+        result = await figma_server.tree_extractor.extract_tree(file_key, node_ids, depth, fields)
+    except ValueError as e:
+        return [TextContent(type="text", text=f"Error: {e}")]
     if not result:
         return [TextContent(type="text", text="Failed to extract tree structure")]
+    # Full-property extractions are baselines for later diffs
+    if not fields:
+        await figma_server.record_snapshot(TreeSnapshot.from_result(result, depth))
     
     # 使用文件保存器保存树结构
     try:
         save_result = figma_server.file_saver.save_tree_structure(file_key, result, node_ids)
         tree_path = save_result["tree_path"]
         stats_path = save_result["stats_path"]
+        if durable:
+            await figma_server.file_saver.wait_for([tree_path, stats_path])
+        # Batches that failed upstream don't fail the whole call, but are reported
+        failed_note = f"\n⚠️ Failed to fetch nodes: {', '.join(result['failed_nodes'])}" if result.get("failed_nodes") else ""
         return [
             TextContent(
                 type="text", 
-                text=f"✅ Tree structure extraction successful!\n\n📁 Tree file: {tree_path}\n📊 Stats file: {stats_path}\n📊 Total nodes: {result['analysis']['total_nodes']}\n📋 Node type statistics: {json.dumps(result['analysis']['node_counts'], ensure_ascii=False, indent=2)}"
+                text=f"✅ Tree structure extraction successful!\n\n📁 Tree file: {tree_path}\n📊 Stats file: {stats_path}\n📊 Total nodes: {result['analysis']['total_nodes']}\n📋 Node type statistics: {json.dumps(result['analysis']['node_counts'], ensure_ascii=False, indent=2)}{failed_note}"
             )
         ]
     except Exception as e:
@@ -339,22 +826,37 @@ async def handle_download_images(arguments: Dict[str, Any]) -> list[TextContent]
     node_ids = arguments["node_ids"]
     format = arguments.get("format", "png")
     scale = arguments.get("scale", 1.0)
+    durable = arguments.get("durable", False)
     
     figma_server = get_figma_server()
     if not figma_server.image_extractor:
         return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
     
-    result = figma_server.image_extractor.extract_images(file_key, node_ids, format, scale)
+    result = await figma_server.image_extractor.extract_images(file_key, node_ids, format, scale)
     if not result:
         return [TextContent(type="text", text="Failed to download images")]
     
+    # Image files are already on disk, only this call's images_info.json may still be queued
+    if durable:
+        try:
+            await figma_server.file_saver.wait_for([result["info_path"]])
+        except Exception as e:
+            logger.error(f"Failed to save image info: {e}")
+            return [TextContent(type="text", text=f"⚠️ Images downloaded but saving image info failed: {e}")]
+    
     success_count = sum(1 for img in result["images"].values() if img.get("status") == "success")
     total_count = len(result["images"])
+    cached_count = sum(1 for img in result["images"].values() if img.get("cached"))
+    
+    cache_note = ""
+    if figma_server.image_cache:
+        cache_stats = figma_server.image_cache.stats()
+        cache_note = f"\n♻️ From image cache: {cached_count}/{total_count} (overall hit rate {cache_stats['hit_rate']:.0%})"
     
     return [
         TextContent(
             type="text", 
-            text=f"✅ Image download completed!\n\nSuccessfully downloaded: {success_count}/{total_count} images\nFormat: {format}\nScale: {scale}\nImages saved in: images_{file_key}/"
+            text=f"✅ Image download completed!\n\nSuccessfully downloaded: {success_count}/{total_count} images\nFormat: {format}\nScale: {scale}\nImages saved in: images_{file_key}/{cache_note}"
         )
     ]
 
@@ -365,64 +867,143 @@ async def handle_complete_data(arguments: Dict[str, Any]) -> list[TextContent]:
     image_format = arguments.get("image_format", "png")
     image_scale = arguments.get("image_scale", 1.0)
     tree_depth = arguments.get("tree_depth", 4)
+    incremental = arguments.get("incremental", False)
+    durable = arguments.get("durable", False)
     
     figma_server = get_figma_server()
     if not figma_server.tree_extractor or not figma_server.image_extractor:
         return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
     
-    # Step 1: Get tree structure
-    tree_result = figma_server.tree_extractor.extract_tree(file_key, node_ids, tree_depth)
-    if not tree_result:
-        return [TextContent(type="text", text="Failed to get tree structure")]
+    export = await figma_server.export_complete_data(file_key, node_ids, image_format, image_scale, tree_depth,
+                                                     incremental, durable)
+    tree_result = export["tree_result"]
+    image_result = export["image_result"]
+    organize_result = export["organize_result"]
+    errors = export["errors"]
+    diff = export["diff"]
+    render_ids = export["render_ids"]
     
-    # Step 2: Get node name
-    first_node_id = node_ids.split(",")[0]
-    node_name = figma_server.get_node_name(tree_result, first_node_id)
+    if organize_result is None:
+        return [TextContent(type="text", text="Failed to get tree structure and images\n\n" + "\n".join(f"❌ {stage}: {error}" for stage, error in errors.items()))]
+    if export["save_error"]:
+        return [TextContent(type="text", text=f"⚠️ Images organized in {organize_result['target_dir']} but saving node data failed: {export['save_error']}")]
     
-    # Step 3: Download images
-    image_result = figma_server.image_extractor.extract_images(file_key, node_ids, image_format, image_scale)
-    if not image_result:
-        return [TextContent(type="text", text="Failed to download images")]
+    output_lines = ["⚠️ Complete data retrieval partially successful!\n" if errors else "✅ Complete data retrieval successful!\n"]
+    output_lines.append(f"📁 Output folder: {organize_result['target_dir']}")
+    if tree_result:
+        output_lines.append(f"📊 Total nodes: {tree_result['analysis']['total_nodes']}")
+    output_lines.append(f"🖼️ Image format: {image_format}")
+    output_lines.append(f"📏 Scale ratio: {image_scale}")
+    if image_result:
+        success_count = sum(1 for image in image_result["images"].values() if image.get("status") == "success")
+        if success_count < len(render_ids):
+            output_lines.append(f"⚠️ Images downloaded: {success_count}/{len(render_ids)}")
+    for stage, error in errors.items():
+        output_lines.append(f"❌ {stage} failed: {error}")
+    
+    if incremental:
+        if diff is None:
+            output_lines.append("🔁 Incremental: no earlier export to compare with, rendered all images")
+        else:
+            output_lines.append(f"🔁 Incremental since version {diff.from_version}: {len(diff.added)} added, {len(diff.removed)} removed, "
+                                f"{len(diff.changed)} changed nodes; re-rendered {len(render_ids)}/{len(export['target_ids'])} images")
     
-    # Step 4: Organize files
-    organize_result = figma_server.organize_files(file_key, node_ids, node_name, tree_result, image_result)
+    if export["api_stats"]:
+        output_lines.append(f"📡 Figma API since start: {format_api_stats(export['api_stats'])}")
+    
+    output_lines.append("\nIncluded files:")
+    if tree_result:
+        output_lines.append(f"- {os.path.basename(organize_result['files']['nodesinfo'])} (node details)")
+    output_lines.append(f"- {os.path.basename(organize_result['files']['manifest'])} (every file of this export)")
+    output_lines.append(f"- {len(organize_result['files']['images'])} image files")
     
     return [
         TextContent(
             type="text", 
-            text=f"✅ Complete data retrieval successful!\n\n📁 Output folder: {organize_result['target_dir']}\n📊 Total nodes: {tree_result['analysis']['total_nodes']}\n🖼️ Image format: {image_format}\n📏 Scale ratio: {image_scale}\n\nIncluded files:\n- nodesinfo.json (node details)\n- nodesstatus.json (node statistics)\n- image.json (image information)\n- summary.json (summary information)\n- Image files"
+            text="\n".join(output_lines)
         )
     ]
 
+def resolve_cursor(tool: str, file_key: str, cursor: str) -> Tuple[Optional[ResultSet], int, Optional[str]]:
+    """Look up the stored result a cursor points into, returning (result_set, offset, error)"""
+    try:
+        result_set, offset = get_figma_server().result_pages.resolve(cursor)
+    except ValueError as e:
+        return None, 0, f"Error: {e}"
+    except KeyError:
+        return None, 0, "Error: cursor expired or unknown, call again without cursor to start over"
+    if result_set.metadata.get("tool") != tool or result_set.metadata.get("file_key") != file_key:
+        return None, 0, f"Error: cursor does not belong to {tool} on file {file_key}"
+    return result_set, offset, None
+
+def page_header(offset: int, count: int, total: int) -> str:
+    """Describe which slice of the stored result a page holds"""
+    return f"{offset + 1}-{offset + count} of {total}" if count else f"none left of {total}"
+
 async def handle_extract_frames(arguments: Dict[str, Any]) -> list[TextContent]:
     """Handle Frame node extraction"""
     file_key = arguments["file_key"]
     max_depth = arguments.get("max_depth", 2)
+    fields = [f.strip() for f in arguments.get("fields", "").split(",") if f.strip()]
+    limit = arguments.get("limit", DEFAULT_PAGE_SIZE)
+    cursor = arguments.get("cursor")
+    durable = arguments.get("durable", False)
     
     figma_server = get_figma_server()
     if not figma_server.frame_extractor:
         return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
     
-    result = figma_server.frame_extractor.extract_frames(file_key, max_depth)
-    if not result:
-        return [TextContent(type="text", text="Failed to extract Frame nodes")]
+    if cursor:
+        # Later pages come from the stored result without re-fetching the file
+        result_set, offset, error = resolve_cursor("extract_frame_nodes", file_key, cursor)
+        if error:
+            return [TextContent(type="text", text=error)]
+    else:
+        try:
+            result = await figma_server.frame_extractor.extract_frames(file_key, max_depth, fields)
+        except ValueError as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+        if not result:
+            return [TextContent(type="text", text="Failed to extract Frame nodes")]
+        
+        # 使用文件保存器保存Frame信息
+        try:
+            save_result = figma_server.file_saver.save_frame_info(file_key, result, max_depth)
+            output_path = save_result["detailed_path"]
+            simple_output_path = save_result["simple_path"]
+            if durable:
+                await figma_server.file_saver.wait_for([output_path, simple_output_path])
+        except Exception as e:
+            logger.error(f"Failed to save frame files: {e}")
+            output_path = "failed_to_save"
+            simple_output_path = "failed_to_save"
+        
+        result_set = figma_server.result_pages.store(result["pages"], {
+            "tool": "extract_frame_nodes",
+            "file_key": file_key,
+            "max_depth": max_depth,
+            "output_path": output_path,
+            "simple_output_path": simple_output_path
+        })
+        offset = 0
     
-    frame_count = len(result["pages"])
+    pages, next_cursor = figma_server.result_pages.page(result_set, offset, limit)
+    metadata = result_set.metadata
     
-    # 使用文件保存器保存Frame信息
-    try:
-        save_result = figma_server.file_saver.save_frame_info(file_key, result, max_depth)
-        output_path = save_result["detailed_path"]
-        simple_output_path = save_result["simple_path"]
-    except Exception as e:
-        logger.error(f"Failed to save frame files: {e}")
-        output_path = "failed_to_save"
-        simple_output_path = "failed_to_save"
+    output_lines = ["✅ Frame node extraction successful!\n"]
+    output_lines.append(f"📋 Found {result_set.total} Frame nodes (depth={metadata['max_depth']}), showing {page_header(offset, len(pages), result_set.total)}:")
+    for page in pages:
+        output_lines.append(f"- {page['pageInfo']['name']} (ID: {page['pageInfo']['frameId']})")
+    if next_cursor:
+        output_lines.append(f"\n➡️ More frames available, call again with cursor: {next_cursor}")
+    
+    output_lines.append(f"\n📁 Detailed result saved to: {metadata['output_path']}")
+    output_lines.append(f"📁 Simplified result saved to: {metadata['simple_output_path']}")
     
     return [
         TextContent(
             type="text", 
-            text=f"✅ Frame node extraction successful!\n\n📋 Found {frame_count} Frame nodes (depth={max_depth}):\n" + "\n".join([f"- {page['pageInfo']['name']} (ID: {page['pageInfo']['frameId']})" for page in result["pages"]]) + f"\n\n📁 Detailed result saved to: {output_path}\n📁 Simplified result saved to: {simple_output_path}"
+            text="\n".join(output_lines)
         )
     ]
 
@@ -430,44 +1011,71 @@ async def handle_list_nodes(arguments: Dict[str, Any]) -> list[TextContent]:
     """Handle node list retrieval"""
     file_key = arguments["file_key"]
     node_types = arguments.get("node_types", "")
+    limit = arguments.get("limit", DEFAULT_PAGE_SIZE)
+    cursor = arguments.get("cursor")
+    durable = arguments.get("durable", False)
     
     figma_server = get_figma_server()
     if not figma_server.node_lister:
         return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
     
-    result = figma_server.node_lister.list_nodes(file_key, node_types, max_depth=2)
-    if not result:
-        return [TextContent(type="text", text="Failed to get node list")]
+    if cursor:
+        # Later pages come from the stored result without re-fetching the file
+        result_set, offset, error = resolve_cursor("list_nodes_depth2", file_key, cursor)
+        if error:
+            return [TextContent(type="text", text=error)]
+    else:
+        result = await figma_server.node_lister.list_nodes(file_key, node_types, max_depth=2)
+        if not result:
+            return [TextContent(type="text", text="Failed to get node list")]
+        
+        # 使用文件保存器保存节点列表
+        try:
+            save_result = figma_server.file_saver.save_node_list(file_key, result, 2)
+            output_path = save_result["detailed_path"]
+            simple_output_path = save_result["simple_path"]
+            if durable:
+                await figma_server.file_saver.wait_for([output_path, simple_output_path])
+        except Exception as e:
+            logger.error(f"Failed to save node list files: {e}")
+            output_path = "failed_to_save"
+            simple_output_path = "failed_to_save"
+        
+        # Document order is stable across pages, the per-type grouping is summarised in counts
+        result_set = figma_server.result_pages.store(result["node_list"], {
+            "tool": "list_nodes_depth2",
+            "file_key": file_key,
+            "file_name": result["file_name"],
+            "node_types": node_types,
+            "node_counts": {node_type: len(nodes) for node_type, nodes in result["nodes_by_type"].items()},
+            "output_path": output_path,
+            "simple_output_path": simple_output_path
+        })
+        offset = 0
     
-    # 使用文件保存器保存节点列表
-    try:
-        save_result = figma_server.file_saver.save_node_list(file_key, result, 2)
-        output_path = save_result["detailed_path"]
-        simple_output_path = save_result["simple_path"]
-    except Exception as e:
-        logger.error(f"Failed to save node list files: {e}")
-        output_path = "failed_to_save"
-        simple_output_path = "failed_to_save"
+    nodes, next_cursor = figma_server.result_pages.page(result_set, offset, limit)
+    metadata = result_set.metadata
     
     # Build output text
-    output_lines = [f"✅ Node list retrieval successful!\n"]
-    output_lines.append(f"File: {result['file_name']}")
-    output_lines.append(f"Total nodes: {result['total_nodes']} (depth=2)")
+    output_lines = ["✅ Node list retrieval successful!\n"]
+    output_lines.append(f"File: {metadata['file_name']}")
+    output_lines.append(f"Total nodes: {result_set.total} (depth=2)")
     
-    if node_types:
-        output_lines.append(f"Filtered types: {node_types}")
+    if metadata["node_types"]:
+        output_lines.append(f"Filtered types: {metadata['node_types']}")
     
-    output_lines.append("\n📋 Node list:")
+    if offset == 0:
+        output_lines.append("Node types: " + ", ".join(f"{node_type} {count}" for node_type, count in metadata["node_counts"].items()))
     
-    # Output nodes by type
-    for node_type, nodes in result["nodes_by_type"].items():
-        output_lines.append(f"\n📁 {node_type} ({len(nodes)} items):")
-        for node in nodes:
-            indent = "  " * node["depth"]
-            output_lines.append(f"{indent}- {node['name']} (ID: {node['id']})")
+    output_lines.append(f"\n📋 Node list ({page_header(offset, len(nodes), result_set.total)}):")
+    for node in nodes:
+        indent = "  " * node["depth"]
+        output_lines.append(f"{indent}- {node['name']} (ID: {node['id']}, {node['type']})")
+    if next_cursor:
+        output_lines.append(f"\n➡️ More nodes available, call again with cursor: {next_cursor}")
     
-    output_lines.append(f"\n📁 Detailed result saved to: {output_path}")
-    output_lines.append(f"📁 Simplified result saved to: {simple_output_path}")
+    output_lines.append(f"\n📁 Detailed result saved to: {metadata['output_path']}")
+    output_lines.append(f"📁 Simplified result saved to: {metadata['simple_output_path']}")
     
     return [
         TextContent(
@@ -476,6 +1084,195 @@ async def handle_list_nodes(arguments: Dict[str, Any]) -> list[TextContent]:
         )
     ]
 
+async def handle_search_nodes(arguments: Dict[str, Any]) -> list[TextContent]:
+    """Handle node search"""
+    file_key = arguments["file_key"]
+    query = arguments.get("query", "")
+    match = arguments.get("match", "contains")
+    node_types = [t.strip() for t in arguments.get("node_types", "").split(",") if t.strip()]
+    under = arguments.get("under") or None
+    limit = arguments.get("limit", 50)
+    depth = arguments.get("depth")
+    
+    figma_server = get_figma_server()
+    if not figma_server.api_client:
+        return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
+    
+    index = await figma_server.get_node_index(file_key, depth)
+    if index is None:
+        return [TextContent(type="text", text="Failed to load file for search")]
+    
+    start = time.perf_counter()
+    try:
+        results, has_more = index.search(query, match=match, node_types=node_types, under=under, limit=limit)
+    except KeyError:
+        return [TextContent(type="text", text=f"Node not found: {under}")]
+    except ValueError as e:
+        return [TextContent(type="text", text=f"Error: {e}")]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    found = f"{len(results)}+" if has_more else str(len(results))
+    output_lines = [f"✅ Found {found} matching nodes (index of {len(index)} nodes, searched in {elapsed_ms:.2f} ms)"]
+    if under:
+        output_lines.append(f"Under: {index.path(under)} (ID: {under})")
+    output_lines.append("")
+    for node in results:
+        output_lines.append(f"- {node['name']} (ID: {node['id']}, {node['type']})\n  {node['path']}")
+    if has_more:
+        output_lines.append("\n... more matches available, raise limit or narrow the query")
+    
+    return [
+        TextContent(
+            type="text",
+            text="\n".join(output_lines)
+        )
+    ]
+
+async def handle_diff_tree(arguments: Dict[str, Any]) -> list[TextContent]:
+    """Handle tree diff against an earlier extraction or file version"""
+    file_key = arguments["file_key"]
+    node_ids = arguments["node_ids"]
+    depth = arguments.get("depth", 4)
+    from_version = arguments.get("from_version") or None
+    limit = arguments.get("limit", 50)
+    durable = arguments.get("durable", False)
+    
+    figma_server = get_figma_server()
+    if not figma_server.tree_extractor:
+        return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
+    
+    target_ids = FigmaQuery.parse_ids(node_ids)
+    await figma_server.load_tree_history(file_key, target_ids, depth)
+    baseline = figma_server.tree_history.latest(file_key, target_ids, depth, from_version)
+    if baseline is None and from_version:
+        # Not extracted before, fetch that version from Figma
+        old_result = await figma_server.tree_extractor.extract_tree(file_key, node_ids, depth, version=from_version)
+        if not old_result:
+            return [TextContent(type="text", text=f"Failed to get tree structure of version {from_version}")]
+        baseline = TreeSnapshot.from_result(old_result, depth)
+        await figma_server.record_snapshot(baseline)
+    
+    result = await figma_server.tree_extractor.extract_tree(file_key, node_ids, depth)
+    if not result:
+        return [TextContent(type="text", text="Failed to extract tree structure")]
+    current = TreeSnapshot.from_result(result, depth)
+    await figma_server.record_snapshot(current)
+    
+    if baseline is None:
+        return [
+            TextContent(
+                type="text",
+                text=f"📌 No earlier extraction of these nodes (depth={depth}) is recorded, version {current.version} saved as the baseline.\nCall again after the file changes, or pass from_version to compare with an older Figma version"
+            )
+        ]
+    
+    diff = diff_snapshots(baseline, current)
+    if diff.is_empty():
+        return [TextContent(type="text", text=f"✅ No changes between version {diff.from_version} and {diff.to_version} (depth={depth})")]
+    
+    try:
+        save_result = figma_server.file_saver.save_tree_diff(file_key, diff.to_dict())
+        diff_path = save_result["diff_path"]
+        if durable:
+            await figma_server.file_saver.wait_for([diff_path])
+    except Exception as e:
+        logger.error(f"Failed to save tree diff: {e}")
+        diff_path = "failed_to_save"
+    
+    output_lines = [f"✅ Tree diff from version {diff.from_version} to {diff.to_version} (depth={depth})\n"]
+    output_lines.append(f"📊 Added: {len(diff.added)}, Removed: {len(diff.removed)}, Changed: {len(diff.changed)}")
+    output_lines.append(f"🖼️ Nodes to re-render: {', '.join(diff.changed_targets) or 'none'}")
+    
+    lines = [f"+ {node['name']} (ID: {node['id']}, {node['type']})" for node in diff.added]
+    lines += [f"- {node['name']} (ID: {node['id']}, {node['type']})" for node in diff.removed]
+    lines += [f"~ {node['name']} (ID: {node_id}, {node['type']}): {', '.join(sorted(node['changes']))}"
+              for node_id, node in diff.changed.items()]
+    output_lines.append("")
+    output_lines.extend(lines[:limit])
+    if len(lines) > limit:
+        output_lines.append(f"... {len(lines) - limit} more, see the diff file")
+    
+    output_lines.append(f"\n📁 Diff saved to: {diff_path}")
+    
+    return [
+        TextContent(
+            type="text",
+            text="\n".join(output_lines)
+        )
+    ]
+
+async def handle_batch_export(arguments: Dict[str, Any]) -> list[TextContent]:
+    """Handle batch export of many files"""
+    defaults = {
+        "image_format": arguments.get("image_format", "png"),
+        "image_scale": arguments.get("image_scale", 1.0),
+        "tree_depth": arguments.get("tree_depth", 4),
+        "incremental": arguments.get("incremental", False),
+        "durable": arguments.get("durable", False)
+    }
+    
+    figma_server = get_figma_server()
+    if not figma_server.tree_extractor or not figma_server.image_extractor:
+        return [TextContent(type="text", text="Error: FIGMA_ACCESS_TOKEN not set")]
+    
+    try:
+        jobs = [BatchExportJob.from_dict(spec, defaults) for spec in arguments.get("exports") or []]
+    except ValueError as e:
+        return [TextContent(type="text", text=f"Error: {e}")]
+    if not jobs:
+        return [TextContent(type="text", text="Error: exports is empty")]
+    
+    def on_progress(result: BatchExportResult, completed: int, total: int) -> None:
+        logger.info(f"Batch export {completed}/{total}: {result.job.file_key} {result.status} in {result.elapsed:.1f}s")
+    
+    report = await figma_server.batch_exporter.run(jobs, arguments.get("max_concurrent_files"), on_progress)
+    report_path = figma_server.file_saver.save_batch_report(report.to_dict())["report_path"]
+    if defaults["durable"]:
+        await figma_server.file_saver.wait_for([report_path])
+    
+    return [TextContent(type="text", text=format_batch_report(report, report_path))]
+
+def format_batch_report(report: BatchExportReport, report_path: str) -> str:
+    """Per-file results and overall throughput of a batch export"""
+    totals = report.totals()
+    icons = {"success": "✅", "partial": "⚠️", "failed": "❌"}
+    lines = [f"{'✅' if totals['failed'] == 0 and totals['partial'] == 0 else '⚠️'} Batch export finished: "
+             f"{totals['succeeded']}/{totals['files']} files complete, {totals['partial']} partial, {totals['failed']} failed\n"]
+    for result in report.results:
+        line = f"{icons[result.status]} [{result.index}/{totals['files']}] {result.job.file_key} ({result.job.node_ids})"
+        if result.target_dir:
+            line += (f" -> {result.target_dir}: {result.nodes} nodes, {result.images} images "
+                     f"({result.cached_images} cached, {result.image_bytes / 1024:.1f} KB)")
+            if result.failed_images:
+                line += f", {result.failed_images} failed images"
+        line += f", {result.elapsed:.1f}s"
+        lines.append(line)
+        for stage, error in result.errors.items():
+            lines.append(f"    ❌ {stage}: {error}")
+    
+    lines.append(f"\n⏱️ Total time: {totals['elapsed']:.1f}s for {totals['file_seconds']:.1f}s of file exports "
+                 f"(up to {totals['max_concurrent_files']} files at a time)")
+    lines.append(f"🚀 Throughput: {totals['files_per_minute']:.1f} files/min, {totals['images_per_second']:.1f} images/s, "
+                 f"{totals['megabytes_per_second']:.2f} MB/s")
+    lines.append(f"📊 Totals: {totals['nodes']} nodes, {totals['images']} images ({totals['cached_images']} from cache), "
+                 f"{totals['image_bytes'] / 1024 / 1024:.1f} MB")
+    if report.api_stats:
+        lines.append(f"📡 Figma API since start: {format_api_stats(report.api_stats)}")
+    lines.append(f"📄 Report: {report_path}")
+    return "\n".join(lines)
+
+def format_api_stats(stats: Dict[str, Any]) -> str:
+    """One line of rate limiting, coalescing and cache stats (FigmaMCPServer.api_stats)"""
+    rate_limit = stats["rate_limit"]
+    line = (f"{rate_limit['requests']} requests, {rate_limit['throttled']} rate limited (429), "
+            f"queue up to {rate_limit['max_queue_depth']}, waited {rate_limit['avg_wait']:.2f}s avg / "
+            f"{rate_limit['max_wait']:.2f}s max, {stats['coalesced_requests']} coalesced")
+    for label, key in (("response cache", "cache"), ("image cache", "image_cache")):
+        cache = stats.get(key)
+        if cache:
+            line += f"; {label} {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})"
+    return line
+
 async def main():
     """Main function"""
     logger.info("Figma MCP server starting")
@@ -501,6 +1298,9 @@ async def main():
     except Exception as e:
         logger.error(f"Server error: {e}")
         raise
+    finally:
+        if figma_server is not None:
+            await figma_server.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
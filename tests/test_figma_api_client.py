@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+figma_api_client 的测试：相同请求合并、429 重试、分批请求部分失败
+使用 benchmarks/fake_figma_api.py 在本机提供的 Figma API 替身
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server.figma_api_client import FigmaAPIClient
+from figma_mcp_server.figma_query_planner import FigmaQuery, FigmaQueryPlanner
+from figma_mcp_server.figma_rate_limiter import FigmaRateLimiter
+
+
+@pytest.fixture
+def fake_api():
+    """按配置启动替身，测试结束时关闭"""
+    started = []
+
+    def start(**options):
+        api = FakeFigmaAPI(FakeFigmaConfig(nodes=200, **options)).start()
+        started.append(api)
+        return api
+
+    yield start
+    for api in started:
+        api.stop()
+
+
+def make_client(api, **options):
+    # 不主动限速，只处理替身返回的 429
+    return FigmaAPIClient("token", base_url=api.base_url,
+                          rate_limiter=FigmaRateLimiter(requests_per_minute=0, max_retries=5), **options)
+
+
+def run(client, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_identical_requests_are_coalesced(fake_api):
+    api = fake_api(api_latency=0.1)
+    client = make_client(api)
+
+    async def fetch_all():
+        return await asyncio.gather(*(client.get_json("/v1/files/K", {"depth": 1}) for _ in range(5)))
+
+    results = run(client, fetch_all())
+    assert api.stats["requests"]["files"] == 1
+    assert client.coalesced_requests == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_different_requests_are_not_coalesced(fake_api):
+    api = fake_api(api_latency=0.05)
+    client = make_client(api)
+
+    async def fetch_both():
+        return await asyncio.gather(client.get_json("/v1/files/K", {"depth": 1}),
+                                    client.get_json("/v1/files/K", {"depth": 2}))
+
+    run(client, fetch_both())
+    assert api.stats["requests"]["files"] == 2
+    assert client.coalesced_requests == 0
+
+
+def test_rate_limited_request_is_retried_after_retry_after(fake_api):
+    api = fake_api(rate_limit=1, rate_window=0.2, retry_after=0.3)
+    client = make_client(api)
+
+    async def fetch_twice():
+        await client.get_json("/v1/files/K", {"depth": 1})
+        return await client.get_json("/v1/files/K", {"depth": 2})
+
+    data = run(client, fetch_twice())
+    assert data["version"]
+    assert api.stats["status"][429] == 1
+    assert client.rate_limiter.throttled == 1
+    assert client.stats()["rate_limit"]["throttled"] == 1
+    # 重试前等待了 Retry-After 指定的时间
+    assert client.rate_limiter.max_wait >= 0.25
+
+
+@pytest.mark.parametrize("render", (False, True))
+def test_failed_batch_keeps_other_batches(fake_api, render):
+    api = fake_api()
+    node_ids = api.document("K").top_frame_ids(6)
+    # 每批两个节点，包含 node_ids[2] 的第二批总是返回 500
+    api.config.fail_ids = {node_ids[2]}
+    client = make_client(api, planner=FigmaQueryPlanner(max_ids_per_request=2))
+
+    result = run(client, client.execute(FigmaQuery("K", node_ids=node_ids, depth=1, render=render)))
+    key = "images" if render else "nodes"
+    assert result["failed_ids"] == node_ids[2:4]
+    assert list(result[key]) == node_ids
+    assert all(result[key][node_id] is None for node_id in node_ids[2:4])
+    assert all(result[key][node_id] for node_id in node_ids[:2] + node_ids[4:])
+    assert api.stats["requests"][key] == 3
+
+
+def test_all_batches_failing_raises(fake_api):
+    api = fake_api(failure_rate=1.0)
+    client = make_client(api, planner=FigmaQueryPlanner(max_ids_per_request=1))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(client, client.execute(FigmaQuery("K", node_ids=["1:1", "1:2"])))
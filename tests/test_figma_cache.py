@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+figma_cache 的测试：LRU 淘汰顺序、索引持久化、ttl 过期后的版本探测
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server import figma_api_client
+from figma_mcp_server.figma_api_client import FigmaAPIClient
+from figma_mcp_server.figma_cache import FigmaResponseCache
+from figma_mcp_server.figma_rate_limiter import FigmaRateLimiter
+
+
+def body(name):
+    """约 100 字节的响应体"""
+    return json.dumps({"name": name, "padding": "x" * 80}).encode("utf-8")
+
+
+def put(cache, name, version="1"):
+    cache.put("K", "nodes", {"ids": name}, body(name), version)
+
+
+def cached_names(cache, names):
+    return [name for name in names if cache.get("K", "nodes", {"ids": name}, "1") is not None]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FigmaResponseCache(str(tmp_path), max_bytes=250)
+    put(cache, "a")
+    put(cache, "b")
+    put(cache, "c")
+    # 超出容量时淘汰最早写入的 a
+    assert cache.stats()["evictions"] == 1
+    assert cache.peek("K", "nodes", {"ids": "a"}) is None
+
+    # 读取 b 使其成为最近使用，再写入 d 时淘汰 c
+    assert cache.get("K", "nodes", {"ids": "b"}, "1")["name"] == "b"
+    put(cache, "d")
+    assert cache.peek("K", "nodes", {"ids": "c"}) is None
+    assert cached_names(cache, "abcd") == ["b", "d"]
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_entry_larger_than_cache_is_not_stored(tmp_path):
+    cache = FigmaResponseCache(str(tmp_path), max_bytes=50)
+    put(cache, "a")
+    assert cache.stats()["entries"] == 0
+
+
+def test_index_keeps_lru_order_across_instances(tmp_path):
+    cache = FigmaResponseCache(str(tmp_path), max_bytes=250)
+    put(cache, "a")
+    put(cache, "b")
+    cache.get("K", "nodes", {"ids": "a"}, "1")
+    cache.flush()
+
+    reloaded = FigmaResponseCache(str(tmp_path), max_bytes=250)
+    assert reloaded.stats()["entries"] == 2
+    # 重新加载后 b 仍是最久未使用的条目
+    put(reloaded, "c")
+    assert cached_names(reloaded, "abc") == ["a", "c"]
+
+
+def test_versions_are_cached_separately(tmp_path):
+    cache = FigmaResponseCache(str(tmp_path))
+    put(cache, "a", version="1")
+    put(cache, "a", version="2")
+    assert cache.get("K", "nodes", {"ids": "a"}, "1") is not None
+    assert cache.peek("K", "nodes", {"ids": "a"})["version"] == "2"
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeFigmaAPI(FakeFigmaConfig(nodes=200)).start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture(autouse=True)
+def no_probe_reuse(monkeypatch):
+    # 每次都重新探测版本，测试中修改文件后立即可见
+    monkeypatch.setattr(figma_api_client, "VERSION_PROBE_INTERVAL", 0.0)
+
+
+def fetch_nodes(fake_api, cache, node_id, times=1):
+    client = FigmaAPIClient("token", base_url=fake_api.base_url, cache=cache,
+                            rate_limiter=FigmaRateLimiter(requests_per_minute=0))
+
+    async def main():
+        try:
+            return [await client.get_cached_json("K", "nodes", "/v1/files/K/nodes", {"ids": node_id})
+                    for _ in range(times)]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+def test_fresh_entry_is_reused_without_probe(fake_api, tmp_path):
+    cache = FigmaResponseCache(str(tmp_path), ttl=60)
+    node_id = fake_api.document("K").top_frame_ids(1)[0]
+    first, second = fetch_nodes(fake_api, cache, node_id, times=2)
+    assert first == second
+    assert fake_api.stats["requests"]["nodes"] == 1
+    assert fake_api.stats["requests"]["files"] == 0
+
+
+def test_expired_entry_is_revalidated_by_version_probe(fake_api, tmp_path):
+    cache = FigmaResponseCache(str(tmp_path), ttl=0)
+    node_id = fake_api.document("K").top_frame_ids(1)[0]
+    fetch_nodes(fake_api, cache, node_id)
+
+    # 版本未变：只发送 depth=1 的版本探测，复用缓存
+    fetch_nodes(fake_api, cache, node_id)
+    assert fake_api.stats["requests"]["nodes"] == 1
+    assert fake_api.stats["requests"]["files"] == 1
+    assert cache.stats()["revalidations"] == 1
+
+    # 文件被修改：探测到新版本后重新请求
+    fake_api.touch("K")
+    data = fetch_nodes(fake_api, cache, node_id)[0]
+    assert fake_api.stats["requests"]["nodes"] == 2
+    assert data["version"] == str(fake_api.document("K").version)
+    assert cache.peek("K", "nodes", {"ids": node_id})["version"] == data["version"]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+figma_node_index 的测试：索引搜索与逐个检查全部节点的结果一致，
+索引由 Figma API 替身提供的文档构建（完整解析和流式解析两种方式）
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server.figma_api_client import FigmaAPIClient
+from figma_mcp_server.figma_node_index import FigmaNodeIndex, load_node_index
+from figma_mcp_server.figma_rate_limiter import FigmaRateLimiter
+
+
+@pytest.fixture(scope="module")
+def fake_api():
+    api = FakeFigmaAPI(FakeFigmaConfig(nodes=800, depth=5)).start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture(scope="module", params=(False, True), ids=("parsed", "streamed"))
+def index(fake_api, request):
+    client = FigmaAPIClient("token", base_url=fake_api.base_url, rate_limiter=FigmaRateLimiter(requests_per_minute=0))
+
+    async def main():
+        try:
+            return await load_node_index(client, "K", streaming=request.param)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+def preorder(fake_api):
+    """替身文档的全部节点（先序），带祖先ID，作为搜索的参照"""
+    nodes = []
+    stack = [(fake_api.document("K").document, 0, ())]
+    while stack:
+        node, depth, ancestors = stack.pop()
+        nodes.append({"id": node["id"], "name": node["name"], "type": node["type"], "depth": depth,
+                      "ancestors": ancestors})
+        for child in reversed(node.get("children", ())):
+            stack.append((child, depth + 1, ancestors + (node["id"],)))
+    return nodes
+
+
+def matches(node, query, match, node_types, under):
+    name = node["name"].lower()
+    query = query.lower()
+    if node_types and node["type"] not in node_types:
+        return False
+    if under and under not in node["ancestors"]:
+        return False
+    if match == "contains":
+        return query in name
+    if match == "prefix":
+        return name.startswith(query)
+    return name == query
+
+
+def test_index_covers_document(fake_api, index):
+    nodes = preorder(fake_api)
+    assert len(index) == len(nodes) == 800
+    assert index.version == str(fake_api.document("K").version)
+    first_frame = fake_api.document("K").top_frame_ids(1)[0]
+    assert index.parent(first_frame)["id"] == "0:1"
+    assert index.path(first_frame) == f"Document / Page 1 / {index.get(first_frame)['name']}"
+
+
+@pytest.mark.parametrize("query, match", [
+    ("", "contains"), ("text", "contains"), ("1", "contains"), ("xt 5", "contains"), ("oup 2", "contains"),
+    ("12", "contains"), ("frame 1", "prefix"), ("gr", "prefix"), ("page", "prefix"), ("Text 561", "exact"),
+    ("Group 61", "exact"), ("nothing", "contains"),
+])
+@pytest.mark.parametrize("node_types", [None, ["TEXT"], ["GROUP", "INSTANCE"]])
+@pytest.mark.parametrize("under", [None, "0:1", "0:2"])
+def test_search_matches_brute_force(fake_api, index, query, match, node_types, under):
+    expected = [node["id"] for node in preorder(fake_api) if matches(node, query, match, node_types, under)]
+    results, more = index.search(query, match, node_types, under, limit=None)
+    assert [result["id"] for result in results] == expected
+    assert not more
+
+    limited, more = index.search(query, match, node_types, under, limit=5)
+    assert [result["id"] for result in limited] == expected[:5]
+    assert more == (len(expected) > 5)
+
+
+def test_search_rejects_bad_arguments(index):
+    with pytest.raises(ValueError):
+        index.search("a", match="fuzzy")
+    with pytest.raises(KeyError):
+        index.search("a", under="missing")
+
+
+def test_nodes_added_in_preorder():
+    index = FigmaNodeIndex("K")
+    index.add("0:0", "Document", "DOCUMENT", 0)
+    index.add("0:1", "Page", "CANVAS", 1, "0:0")
+    index.add("1:1", "Card", "FRAME", 2, "0:1")
+    index.add("1:2", "Card title", "TEXT", 3, "1:1")
+    index.add("0:2", "Other page", "CANVAS", 1, "0:0")
+    index.add("2:1", "Card", "FRAME", 2, "0:2")
+    index.finish()
+    assert [node["id"] for node in index.search("card", under="0:1", limit=None)[0]] == ["1:1", "1:2"]
+    assert [node["id"] for node in index.search("card", "exact", limit=None)[0]] == ["1:1", "2:1"]
+    assert index.node_types() == {"DOCUMENT": 1, "CANVAS": 2, "FRAME": 2, "TEXT": 1}
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+figma_result_pages 的测试：游标往返、无效与过期的游标、结果集淘汰，
+以及 list_nodes_depth2 通过 Figma API 替身分页时不再重新获取文件
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server import server
+from figma_mcp_server.figma_result_pages import FigmaResultPages
+
+
+def read_all(pages, result_set, limit):
+    """从头按游标逐页读取，返回 (全部结果, 经过的游标)"""
+    items, next_cursor = pages.page(result_set, 0, limit)
+    cursors = []
+    while next_cursor:
+        cursors.append(next_cursor)
+        resolved, offset = pages.resolve(next_cursor)
+        assert resolved is result_set
+        page, next_cursor = pages.page(resolved, offset, limit)
+        assert page
+        items.extend(page)
+    return items, cursors
+
+
+@pytest.mark.parametrize("limit", (1, 3, 10, 11, 0))
+def test_cursor_round_trip(limit):
+    pages = FigmaResultPages()
+    result_set = pages.store(list(range(10)), {"tool": "t"})
+    items, cursors = read_all(pages, result_set, limit)
+    assert items == list(range(10))
+    expected_pages = 1 if limit <= 0 else -(-10 // limit)
+    assert len(cursors) == expected_pages - 1
+
+
+def test_empty_result_has_no_cursor():
+    pages = FigmaResultPages()
+    assert pages.page(pages.store([]), 0, 5) == ([], None)
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "abc:", ":3", "abc:-1", "abc:x"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        FigmaResultPages().resolve(cursor)
+
+
+def test_unknown_and_expired_cursor():
+    pages = FigmaResultPages(ttl=60)
+    result_set = pages.store([1, 2, 3])
+    with pytest.raises(KeyError):
+        pages.resolve("missing:0")
+
+    result_set.last_used -= 61
+    with pytest.raises(KeyError):
+        pages.resolve(result_set.cursor(1))
+    assert pages.stats()["result_sets"] == 0
+
+
+def test_least_recently_used_result_set_is_evicted():
+    pages = FigmaResultPages(max_result_sets=2)
+    first = pages.store([1])
+    second = pages.store([2])
+    # 读取 first 后，再保存新的结果集时淘汰 second
+    pages.resolve(first.cursor(0))
+    pages.store([3])
+    assert pages.resolve(first.cursor(0))[0] is first
+    with pytest.raises(KeyError):
+        pages.resolve(second.cursor(0))
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeFigmaAPI(FakeFigmaConfig(nodes=300)).start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def figma_server(fake_api, tmp_path, monkeypatch):
+    """连接替身的服务器实例，缓存和输出都放在临时目录中"""
+    monkeypatch.setenv("FIGMA_ACCESS_TOKEN", "token")
+    monkeypatch.setenv("FIGMA_API_BASE_URL", fake_api.base_url)
+    # 不缓存响应，每次从头调用工具都会请求替身
+    monkeypatch.setenv("FIGMA_CACHE_MAX_MB", "0")
+    monkeypatch.setenv("FIGMA_IMAGE_CACHE_DIR", str(tmp_path / "image-cache"))
+    monkeypatch.setenv("FIGMA_TREE_HISTORY_DIR", "")
+    monkeypatch.setenv("FIGMA_RATE_LIMIT_PER_MINUTE", "0")
+    monkeypatch.chdir(tmp_path)
+    instance = server.FigmaMCPServer()
+    monkeypatch.setattr(server, "figma_server", instance)
+    return instance
+
+
+def listed_ids(text):
+    return re.findall(r"\(ID: ([^,]+), ", text)
+
+
+def next_cursor(text):
+    match = re.search(r"call again with cursor: (\S+)", text)
+    return match.group(1) if match else None
+
+
+def test_list_nodes_pages_through_stored_result(figma_server, fake_api):
+    async def main():
+        try:
+            everything = (await server.handle_list_nodes({"file_key": "K", "limit": 0}))[0].text
+            requests = dict(fake_api.stats["requests"])
+
+            ids = []
+            text = (await server.handle_list_nodes({"file_key": "K", "limit": 1}))[0].text
+            first_cursor = next_cursor(text)
+            while True:
+                ids.extend(listed_ids(text))
+                cursor = next_cursor(text)
+                if not cursor:
+                    break
+                text = (await server.handle_list_nodes({"file_key": "K", "limit": 1, "cursor": cursor}))[0].text
+            # 只有第一页请求了文件，之后的页都来自保存的结果
+            assert fake_api.stats["requests"]["files"] == requests["files"] + 1
+
+            wrong_tool = await server.handle_extract_frames({"file_key": "K", "cursor": first_cursor})
+            return everything, ids, wrong_tool[0].text
+        finally:
+            await figma_server.aclose()
+
+    everything, ids, wrong_tool = asyncio.run(main())
+    assert len(ids) == 3
+    assert ids == listed_ids(everything)
+    assert next_cursor(everything) is None
+    assert wrong_tool == "Error: cursor does not belong to extract_frame_nodes on file K"
+
+
+def test_cursor_from_another_file_is_rejected(figma_server):
+    async def main():
+        try:
+            text = (await server.handle_list_nodes({"file_key": "K", "limit": 1}))[0].text
+            return (await server.handle_list_nodes({"file_key": "OTHER", "cursor": next_cursor(text)}))[0].text
+        finally:
+            await figma_server.aclose()
+
+    assert asyncio.run(main()) == "Error: cursor does not belong to list_nodes_depth2 on file OTHER"
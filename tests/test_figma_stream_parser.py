@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+figma_stream_parser 的测试：手写的增量 JSON 词法分析器与文档节点扫描器
+"""
+
+import io
+import json
+
+import pytest
+
+from figma_mcp_server.figma_stream_parser import FigmaDocumentScanner, JSONStreamReader, read_file_metadata, scan_document_file
+
+# 很小的块让字符串、数字和多字节字符跨越块边界
+CHUNK_SIZES = (1, 2, 3, 7, 4096)
+
+
+def read(data, chunk_size=4096):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return JSONStreamReader(io.BytesIO(data), chunk_size=chunk_size).read_value()
+
+
+def scan(document, chunk_size=4096, **options):
+    """扫描 JSON 文本形式的文件，返回 (扫描器, 先序记录)"""
+    scanner = FigmaDocumentScanner(chunk_size=chunk_size, **options)
+    return scanner, scanner.scan(io.BytesIO(document.encode("utf-8")))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    r'"quote \" backslash \\ slash \/"',
+    r'"\b\f\n\r\t"',
+    r'"\u00e9\u4e2d\u6587 \u00E9"',
+    r'"\ud83d\ude00 surrogate pair"',
+    r'"\\u0041 is not an escape"',
+    '""',
+])
+def test_string_escapes(text, chunk_size):
+    assert read(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_raw_unicode_split_across_chunks(chunk_size):
+    value = {"名称": "中文 héllo 😀", "emoji": ["🎨", "👩‍💻"], "ключ": "значение"}
+    assert read(json.dumps(value, ensure_ascii=False), chunk_size) == value
+
+
+def test_invalid_utf8_is_rejected():
+    with pytest.raises(UnicodeDecodeError):
+        read(b'"\xff\xfe"')
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    "0", "-0", "7", "-42", "12345678901234567890",
+    "0.5", "-0.25", "3.0", "1e3", "1E+2", "-2.5e-3", "6.02E23",
+])
+def test_numbers(text, chunk_size):
+    value = read(f"[{text}, {text}]", chunk_size)
+    assert value == json.loads(f"[{text}, {text}]")
+    assert type(value[0]) is type(json.loads(text))
+
+
+@pytest.mark.parametrize("text", ["01", "1.", ".5", "+1", "-", "tru", "nul"])
+def test_invalid_scalars(text):
+    with pytest.raises(ValueError):
+        read(f"[{text}]")
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_literals_and_nesting(chunk_size):
+    value = {"a": [True, False, None, {}, [], [[{"b": None}]]], "c": {"d": {"e": -1.5}}}
+    for indent in (None, 2):
+        assert read(json.dumps(value, indent=indent), chunk_size) == value
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_skip_value_ignores_brackets_in_strings(chunk_size):
+    text = '{"skip": {"s": "} ] \\" [ {", "n": [1, {"x": "\\\\"}]}, "keep": "ok"}'
+    reader = JSONStreamReader(io.BytesIO(text.encode()), chunk_size=chunk_size)
+    reader.expect("{")
+    kept = {}
+    for key in reader.iter_object_keys():
+        if key == "skip":
+            reader.skip_value()
+        else:
+            kept[key] = reader.read_value()
+    assert kept == {"keep": "ok"}
+
+
+def test_unexpected_end():
+    with pytest.raises(ValueError):
+        read('{"a": [1, 2')
+    with pytest.raises(ValueError):
+        read('"unterminated')
+
+
+def make_document(id_last=False):
+    """两层子节点的文档；id_last 为 True 时每个节点的 id 写在 children 之后"""
+    def node(node_id, node_type, children=()):
+        fields = {"name": f"Node {node_id}", "type": node_type}
+        if children:
+            fields["children"] = list(children)
+        fields["absoluteBoundingBox"] = {"x": 0, "y": 0}
+        if id_last:
+            return {**fields, "id": node_id}
+        return {"id": node_id, **fields}
+
+    document = node("0:0", "DOCUMENT", [
+        node("0:1", "CANVAS", [
+            node("1:1", "FRAME", [node("1:2", "TEXT"), node("1:3", "RECTANGLE")]),
+            node("1:4", "FRAME"),
+        ]),
+    ])
+    return json.dumps({"name": "File", "document": document, "version": "42", "components": {"c": {}}})
+
+
+EXPECTED = [
+    ("0:0", "DOCUMENT", 0, None),
+    ("0:1", "CANVAS", 1, "0:0"),
+    ("1:1", "FRAME", 2, "0:1"),
+    ("1:2", "TEXT", 3, "1:1"),
+    ("1:3", "RECTANGLE", 3, "1:1"),
+    ("1:4", "FRAME", 2, "0:1"),
+]
+
+
+def summarize(records):
+    return [(record["id"], record["type"], record["depth"], record["parent_id"]) for record in records]
+
+
+@pytest.mark.parametrize("chunk_size", (1, 5, 4096))
+@pytest.mark.parametrize("id_last", (False, True))
+def test_scan_key_order(id_last, chunk_size):
+    scanner, records = scan(make_document(id_last), chunk_size)
+    assert summarize(records) == EXPECTED
+    assert scanner.found_root
+    assert scanner.metadata == {"name": "File", "version": "42"}
+    assert records[2]["absoluteBoundingBox"] == {"x": 0, "y": 0}
+
+
+@pytest.mark.parametrize("id_last", (False, True))
+def test_iter_nodes_is_post_order(id_last):
+    scanner = FigmaDocumentScanner()
+    records = list(scanner.iter_nodes(io.BytesIO(make_document(id_last).encode())))
+    position = {record["id"]: index for index, record in enumerate(records)}
+    assert sorted(position) == sorted(expected[0] for expected in EXPECTED)
+    for node_id, _, _, parent_id in EXPECTED:
+        if parent_id is not None:
+            assert position[node_id] < position[parent_id]
+
+
+@pytest.mark.parametrize("id_last", (False, True))
+def test_scan_filters(id_last):
+    _, records = scan(make_document(id_last), max_depth=2, node_types=["FRAME", "CANVAS"], fields=["name"])
+    assert summarize(records) == [("0:1", "CANVAS", 1, "0:0"), ("1:1", "FRAME", 2, "0:1"), ("1:4", "FRAME", 2, "0:1")]
+    assert set(records[0]) == {"id", "name", "type", "depth", "parent_id"}
+
+
+def test_scan_without_root():
+    scanner, records = scan('{"name": "File", "nodes": {}}')
+    assert records == [] and not scanner.found_root
+
+
+@pytest.mark.parametrize("id_last", (False, True))
+def test_deeply_nested_document(id_last):
+    # json.dumps 本身无法序列化这么深的对象，直接拼接文本
+    depth = 3000
+    text = ""
+    for level in range(depth, -1, -1):
+        node_id = f'"id": "1:{level}"'
+        body = f'"type": "FRAME", "children": [{text}]' if level < depth else '"type": "FRAME"'
+        text = f'{{{body}, {node_id}}}' if id_last else f'{{{node_id}, {body}}}'
+    _, records = scan(f'{{"document": {text}}}', fields=["id", "type"])
+    assert len(records) == depth + 1
+    assert records[-1]["depth"] == depth
+    assert all(record["parent_id"] == (f"1:{index - 1}" if index else None) for index, record in enumerate(records))
+
+
+def test_scan_document_file(tmp_path):
+    path = tmp_path / "file.json"
+    path.write_text(make_document(id_last=True), encoding="utf-8")
+    metadata, records, found_root = scan_document_file(str(path), max_depth=1)
+    assert found_root and metadata["version"] == "42"
+    assert summarize(records) == EXPECTED[:2]
+
+
+def test_read_file_metadata(tmp_path):
+    path = tmp_path / "file.json"
+    path.write_text(make_document(id_last=True), encoding="utf-8")
+    assert read_file_metadata(str(path)) == {"name": "File", "version": "42"}
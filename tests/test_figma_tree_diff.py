@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+figma_tree_diff 的测试：新增、删除、属性变化的节点与需要重新渲染的目标节点，
+快照的保存与恢复，以及 Figma API 替身中的文件被修改后的差异
+"""
+
+import asyncio
+import copy
+
+import pytest
+
+from benchmarks.fake_figma_api import FakeFigmaAPI, FakeFigmaConfig
+from figma_mcp_server.figma_api_client import FigmaAPIClient
+from figma_mcp_server.figma_rate_limiter import FigmaRateLimiter
+from figma_mcp_server.figma_tree_diff import FigmaTreeHistory, TreeSnapshot, diff_snapshots
+from figma_mcp_server.figma_tree_extractor import FigmaTreeExtractor
+from figma_mcp_server.file_saver import FigmaFileSaver
+
+
+def node(node_id, node_type="FRAME", children=(), **properties):
+    record = {"id": node_id, "name": f"Node {node_id}", "type": node_type, **properties}
+    if children:
+        record["children"] = list(children)
+    return record
+
+
+def tree_result(version, trees):
+    """与 FigmaTreeExtractor.extract_tree 结果结构相同的最小结果"""
+    return {
+        "file_key": "K",
+        "version": version,
+        "target_nodes": ",".join(tree["id"] for tree in trees),
+        "nodes": {tree["id"]: {"tree_structure": tree} for tree in trees}
+    }
+
+
+def base_trees():
+    return [
+        node("1:1", children=[node("1:2", "TEXT", characters="Hello"), node("1:3", "RECTANGLE")]),
+        node("2:1", children=[node("2:2", "TEXT")]),
+    ]
+
+
+def snapshot(version, trees, depth=4):
+    return TreeSnapshot.from_result(tree_result(version, trees), depth)
+
+
+def test_identical_snapshots_have_no_diff():
+    diff = diff_snapshots(snapshot("1", base_trees()), snapshot("2", base_trees()))
+    assert diff.is_empty()
+    assert diff.changed_targets == []
+    assert diff.to_dict()["summary"] == {"added": 0, "removed": 0, "changed": 0}
+
+
+def test_added_removed_and_changed_nodes():
+    new_trees = base_trees()
+    first = new_trees[0]
+    # 1:2 的文字被修改，1:3 被删除，新增 1:4
+    first["children"][0]["characters"] = "Hi"
+    first["children"] = [first["children"][0], node("1:4", "ELLIPSE")]
+
+    diff = diff_snapshots(snapshot("1", base_trees()), snapshot("2", new_trees))
+    assert (diff.from_version, diff.to_version) == ("1", "2")
+    assert diff.added == [{"id": "1:4", "name": "Node 1:4", "type": "ELLIPSE", "parent_id": "1:1"}]
+    assert diff.removed == [{"id": "1:3", "name": "Node 1:3", "type": "RECTANGLE", "parent_id": "1:1"}]
+    assert diff.changed["1:2"]["changes"] == {"characters": {"old": "Hello", "new": "Hi"}}
+    assert diff.changed["1:1"]["changes"] == {"children": {"old": ["1:2", "1:3"], "new": ["1:2", "1:4"]}}
+    assert set(diff.changed) == {"1:1", "1:2"}
+    # 只有 1:1 的子树变化，2:1 不需要重新渲染
+    assert diff.changed_targets == ["1:1"]
+
+
+def test_moved_node_changes_both_targets():
+    new_trees = base_trees()
+    moved = new_trees[0]["children"].pop()
+    new_trees[1]["children"].append(moved)
+
+    diff = diff_snapshots(snapshot("1", base_trees()), snapshot("2", new_trees))
+    assert not diff.added and not diff.removed
+    assert diff.changed["1:3"]["changes"] == {"parent": {"old": "1:1", "new": "2:1"}}
+    assert diff.changed_targets == ["1:1", "2:1"]
+
+
+def test_nested_targets_propagate_to_outer_target():
+    inner = node("1:2", "TEXT", characters="Hello")
+    outer = node("1:1", children=[copy.deepcopy(inner)])
+    changed_inner = node("1:2", "TEXT", characters="Hi")
+    changed_outer = node("1:1", children=[copy.deepcopy(changed_inner)])
+    # 内层目标先于外层目标请求
+    diff = diff_snapshots(snapshot("1", [inner, outer]), snapshot("2", [changed_inner, changed_outer]))
+    assert diff.changed_targets == ["1:2", "1:1"]
+
+
+def test_snapshot_round_trip_through_dict():
+    original = snapshot("1", base_trees())
+    restored = TreeSnapshot.from_dict(original.to_dict())
+    assert restored.key == original.key
+    assert restored.nodes.keys() == original.nodes.keys()
+    assert diff_snapshots(original, restored).is_empty()
+
+
+def test_history_persists_across_instances(tmp_path):
+    history = FigmaTreeHistory(max_versions=2, history_dir=str(tmp_path))
+    for version in ("1", "2", "3"):
+        history.record(snapshot(version, base_trees()))
+    history.save("K", ["1:1", "2:1"], 4)
+
+    reloaded = FigmaTreeHistory(history_dir=str(tmp_path))
+    assert reloaded.latest("K", ["1:1", "2:1"], 4) is None
+    reloaded.load("K", ["1:1", "2:1"], 4)
+    assert reloaded.latest("K", ["1:1", "2:1"], 4).version == "3"
+    assert reloaded.latest("K", ["1:1", "2:1"], 4, version="2") is not None
+    # 超出 max_versions 的旧版本没有保存
+    assert reloaded.latest("K", ["1:1", "2:1"], 4, version="1") is None
+    # 不同深度是不同的快照组
+    assert reloaded.latest("K", ["1:1", "2:1"], 3) is None
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeFigmaAPI(FakeFigmaConfig(nodes=300, depth=4)).start()
+    yield api
+    api.stop()
+
+
+def test_diff_after_file_is_modified(fake_api, tmp_path):
+    target_ids = fake_api.document("K").top_frame_ids(4)
+    client = FigmaAPIClient("token", base_url=fake_api.base_url, rate_limiter=FigmaRateLimiter(requests_per_minute=0))
+    extractor = FigmaTreeExtractor("token", client, FigmaFileSaver(str(tmp_path)))
+
+    async def extract():
+        return await extractor.extract_tree("K", ",".join(target_ids), depth=10)
+
+    async def main():
+        try:
+            old = TreeSnapshot.from_result(await extract(), 10)
+            touched = fake_api.touch("K", 20)
+            new = TreeSnapshot.from_result(await extract(), 10)
+            return old, new, touched
+        finally:
+            await client.aclose()
+
+    old, new, touched = asyncio.run(main())
+    diff = diff_snapshots(old, new)
+    expected = {node_id for node_id in touched if node_id in old.nodes}
+    assert expected
+    assert set(diff.changed) == expected
+    assert all(set(change["changes"]) == {"name"} for change in diff.changed.values())
+    assert not diff.added and not diff.removed
+    # 需要重新渲染的正是包含被修改节点的目标
+    assert diff.changed_targets == [target_id for target_id in target_ids
+                                    if any(target_id in new.ancestors(node_id) for node_id in expected)]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+file_saver 的测试：后台写入同一文件时的顺序、wait_for 与写入错误
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from figma_mcp_server.figma_serializer import FigmaSerializer
+from figma_mcp_server.file_saver import FigmaFileSaver
+
+
+class GatedSerializer(FigmaSerializer):
+    """数据中带 gate 的写入要等 gate 打开后才完成，用来制造慢写入"""
+
+    def write(self, data, file_path):
+        gate = data.pop("gate", None)
+        if gate is not None:
+            assert gate.wait(5)
+        return super().write(data, file_path)
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = FigmaFileSaver(str(tmp_path), serializer=GatedSerializer(), write_behind=True, max_workers=2)
+    yield saver
+    saver.close()
+
+
+def test_slow_older_write_does_not_overwrite_newer(saver):
+    async def main():
+        gate = threading.Event()
+        path = saver.save_json_file({"gen": 1, "gate": gate}, "same.json")
+        # 第一次写入正在序列化时提交第二次写入
+        await asyncio.sleep(0.05)
+        assert saver.save_json_file({"gen": 2}, "same.json") == path
+        waiting = asyncio.ensure_future(saver.wait_for([path]))
+        await asyncio.sleep(0.05)
+        # 第一次写入还没完成，wait_for 不能提前返回
+        assert not waiting.done()
+        gate.set()
+        await waiting
+        return path
+
+    path = asyncio.run(main())
+    assert read_json(path) == {"gen": 2}
+    assert saver.stats()["superseded_writes"] == 1
+    assert saver.stats()["pending"] == 0
+
+
+def test_many_writes_to_one_path_keep_the_last(saver):
+    async def main():
+        for generation in range(50):
+            path = saver.save_json_file({"gen": generation}, "many.json", os.path.join(saver.base_dir, "sub"))
+        await saver.wait_for([path])
+        return path
+
+    assert read_json(asyncio.run(main())) == {"gen": 49}
+
+
+def test_wait_for_raises_write_error(saver, tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("not a directory")
+
+    async def main():
+        path = saver.save_json_file({"a": 1}, "x.json", str(blocker / "sub"))
+        with pytest.raises(OSError):
+            await saver.wait_for([path])
+        # 错误只报告一次
+        await saver.wait_for([path])
+
+    asyncio.run(main())
+    assert saver.stats()["write_errors"] == 1
+
+
+def test_create_output_dir_is_created_by_the_write(saver):
+    output_dir = saver.create_output_dir("later")
+    path = saver.save_json_file({"a": 1}, "a.json", output_dir)
+    saver.flush()
+    assert read_json(path) == {"a": 1}